@@ -0,0 +1,249 @@
+"""
+Minimal asyncio HTTP/1.1 client used by the load and benchmark tooling.
+
+It only needs the standard library, opens one connection per request
+(`Connection: close`) and understands Content-Length, chunked and
+read-until-close bodies, which covers both the Supabase edge runtime and the
+local stand-ins.
+
+Like `requests`, every address the host resolves to is tried in turn, and
+HTTP_PROXY / HTTPS_PROXY / NO_PROXY are honoured: plain http goes through the
+proxy with an absolute URL, https through a CONNECT tunnel. Only http://
+proxies are supported.
+"""
+
+import asyncio
+import base64
+import json
+import socket
+import ssl
+import time
+from urllib.parse import unquote, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+
+class HttpError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.timings = {}
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+    @property
+    def status_code(self):
+        # requests.Response spelling, so the debug scripts can use either
+        return self.status
+
+    @property
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def _target(url):
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise HttpError(f"Unsupported URL scheme: {url}")
+    secure = parts.scheme == "https"
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return parts.hostname, port, secure, path, parts.netloc
+
+
+def _encode_request(method, host_header, path, headers, body):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host_header}"]
+    merged = {"Connection": "close", "Accept-Encoding": "identity"}
+    merged.update(headers or {})
+    if body is not None:
+        merged["Content-Length"] = str(len(body))
+    lines.extend(f"{key}: {value}" for key, value in merged.items())
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    return head + (body or b"")
+
+
+async def _read_head(reader, timings, start):
+    status_line = await reader.readline()
+    # The status line arrives in the first packet, close enough to first byte
+    timings["first_byte"] = time.perf_counter() - start
+    if not status_line:
+        raise HttpError("Connection closed before response")
+    parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise HttpError(f"Malformed status line: {status_line!r}")
+    status = int(parts[1])
+    reason = parts[2] if len(parts) > 2 else ""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    timings["headers"] = time.perf_counter() - start
+    return status, reason, headers
+
+
+async def iter_body(reader, headers, chunk_size=16 * 1024):
+    """Yields the response body as it arrives."""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Trailers, then the blank line that ends the message
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return
+            data = await reader.readexactly(size)
+            await reader.readline()
+            yield data
+    elif "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            data = await reader.read(min(chunk_size, remaining))
+            if not data:
+                raise HttpError("Connection closed mid-body")
+            remaining -= len(data)
+            yield data
+    else:
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+
+def _proxy(secure, host):
+    """urlsplit() of the proxy for this host, None for a direct connection."""
+    proxy = getproxies().get("https" if secure else "http")
+    if not proxy or proxy_bypass(host):
+        return None
+    parts = urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    if parts.scheme != "http":
+        raise HttpError(f"Unsupported proxy scheme: {proxy}")
+    return parts
+
+
+def _proxy_headers(proxy):
+    if not proxy.username:
+        return {}
+    credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    token = base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+    return {"Proxy-Authorization": f"Basic {token}"}
+
+
+async def _open(host, port, timings, start):
+    """Connects to the first address of host that accepts, like requests."""
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    timings["dns"] = time.perf_counter() - start
+    error = None
+    for family, _, proto, _, address in infos:
+        try:
+            return await asyncio.open_connection(
+                address[0], address[1], family=family, proto=proto
+            )
+        except OSError as e:
+            error = e
+    raise error or HttpError(f"No addresses for {host}")
+
+
+async def _tunnel(reader, writer, host, port, proxy):
+    """CONNECT host:port through an http proxy."""
+    lines = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}"]
+    lines += [f"{k}: {v}" for k, v in _proxy_headers(proxy).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    status_line = await reader.readline()
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    parts = status_line.decode("latin-1").split(" ", 2)
+    if len(parts) < 2 or parts[1] != "200":
+        raise HttpError(f"Proxy refused CONNECT {host}:{port}: {status_line!r}")
+
+
+async def _connect(host, port, secure, timings, start, proxy=None):
+    if proxy is None:
+        reader, writer = await _open(host, port, timings, start)
+    else:
+        reader, writer = await _open(proxy.hostname, proxy.port or 80, timings, start)
+        if secure:
+            try:
+                await _tunnel(reader, writer, host, port, proxy)
+            except BaseException:
+                writer.close()
+                raise
+    timings["connect"] = time.perf_counter() - start
+    if secure:
+        await writer.start_tls(ssl.create_default_context(), server_hostname=host)
+        timings["tls"] = time.perf_counter() - start
+    return reader, writer
+
+
+async def _request(method, url, headers, body, on_chunk, keep_body=True):
+    host, port, secure, path, netloc = _target(url)
+    proxy = _proxy(secure, host)
+    if proxy is not None and not secure:
+        # Plain http through a proxy: absolute URL, credentials per request
+        path = url.split("#", 1)[0]
+        headers = {**_proxy_headers(proxy), **(headers or {})}
+    timings = {}
+    start = time.perf_counter()
+    reader, writer = await _connect(host, port, secure, timings, start, proxy)
+    try:
+        writer.write(_encode_request(method, netloc, path, headers, body))
+        await writer.drain()
+        timings["sent"] = time.perf_counter() - start
+        status, reason, response_headers = await _read_head(reader, timings, start)
+        chunks = []
+        first = True
+        async for chunk in iter_body(reader, response_headers):
+            if first:
+                timings["first_body_byte"] = time.perf_counter() - start
+                first = False
+            if keep_body:
+                chunks.append(chunk)
+            if on_chunk:
+                on_chunk(chunk, time.perf_counter() - start)
+        timings["last_byte"] = time.perf_counter() - start
+        response = Response(status, reason, response_headers, b"".join(chunks))
+        response.timings = timings
+        return response
+    finally:
+        writer.close()
+
+
+async def request(
+    method, url, headers=None, body=None, timeout=None, on_chunk=None, keep_body=True
+):
+    """Sends one request.
+
+    `on_chunk(data, elapsed)` is called for every body chunk as it arrives;
+    with `keep_body=False` the chunks are not collected and `body` is empty.
+    The returned response carries `timings`: seconds from the start of the
+    call to each phase (dns, connect, tls, sent, first_byte, headers,
+    first_body_byte, last_byte).
+    """
+    return await asyncio.wait_for(
+        _request(method, url, headers, body, on_chunk, keep_body), timeout
+    )
+
+
+async def post_json(url, payload, headers=None, timeout=None, on_chunk=None):
+    merged = {"Content-Type": "application/json"}
+    merged.update(headers or {})
+    body = json.dumps(payload).encode("utf-8")
+    return await request("POST", url, merged, body, timeout, on_chunk)
@@ -0,0 +1,226 @@
+"""
+Batch generate_roadmap runs over synthetic profiles for quality audits.
+
+Profiles come from a CSV (columns as in payloads.PROFILE_FIELDS) or from a
+grid of comma-separated values, one option per field. Requests run with
+bounded concurrency behind a token bucket, retry 429/5xx/timeouts with
+jittered exponential backoff, and every finished item is checkpointed to
+`<out>/<item id>.json`, so an interrupted run picks up where it stopped.
+
+    python batch_roadmaps.py --csv profiles.csv --out roadmaps/
+    python batch_roadmaps.py --weight 70,90,110 --target-weight 65,80 \\
+        --duration-weeks 8,12 --diet-preference Balanced,Vegetarian \\
+        --concurrency 4 --rate 0.5 --out roadmaps/
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import metrics
+from async_http import post_json
+from payloads import FUNCTION_URL, PROFILE_FIELDS, profile_roadmap_payload
+from rate_limit import TokenBucket, backoff_delay, retry_after, should_retry
+
+DEFAULT_PROFILE = {
+    "age": 30,
+    "height": 175,
+    "weight": 80,
+    "target_weight": 75,
+    "duration_weeks": 8,
+    "dietPreference": "Balanced",
+    "activityLevel": "Moderate",
+}
+NUMERIC_FIELDS = {"age", "height", "weight", "target_weight", "duration_weeks"}
+
+
+def _typed(field, value):
+    if field in NUMERIC_FIELDS:
+        number = float(value)
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def profiles_from_csv(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            profile = dict(DEFAULT_PROFILE)
+            for field in PROFILE_FIELDS:
+                if row.get(field) not in (None, ""):
+                    profile[field] = _typed(field, row[field])
+            yield profile
+
+
+def profiles_from_grid(options):
+    axes = [
+        (
+            [_typed(field, v.strip()) for v in options[field].split(",")]
+            if options.get(field)
+            else [DEFAULT_PROFILE[field]]
+        )
+        for field in PROFILE_FIELDS
+    ]
+    for values in itertools.product(*axes):
+        profile = dict(zip(PROFILE_FIELDS, values))
+        if profile["target_weight"] != profile["weight"]:
+            yield profile
+
+
+def item_id(profile):
+    canonical = json.dumps(profile, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def write_checkpoint(directory, name, record):
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(temp_path, os.path.join(directory, f"{name}.json"))
+
+
+class BatchRunner:
+    def __init__(self, url, headers, out_dir, concurrency, bucket, retries, timeout):
+        self.url = url
+        self.headers = headers
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.bucket = bucket
+        self.retries = retries
+        self.timeout = timeout
+        self.counts = {"done": 0, "skipped": 0, "failed": 0, "retries": 0}
+
+    def _finished(self, name):
+        return os.path.exists(os.path.join(self.out_dir, f"{name}.json"))
+
+    async def _generate(self, profile):
+        payload = profile_roadmap_payload(profile, goal_id=f"batch-{item_id(profile)}")
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.counts["retries"] += 1
+            await self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                resp = await post_json(
+                    self.url, payload, headers=self.headers, timeout=self.timeout
+                )
+            except (asyncio.TimeoutError, OSError) as e:
+                last_error = f"{type(e).__name__}: {e}"
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            elapsed = time.perf_counter() - start
+            metrics.observe_response(
+                "generate_roadmap", resp, source="batch", attempt=attempt
+            )
+            if resp.status == 200:
+                return {"status": 200, "elapsed": elapsed, "response": resp.json()}
+            last_error = f"HTTP {resp.status}: {resp.text[:200]}"
+            if not should_retry(resp.status):
+                break
+            wait = retry_after(resp.headers)
+            await asyncio.sleep(wait if wait is not None else backoff_delay(attempt))
+        raise RuntimeError(last_error)
+
+    async def _worker(self, queue, total):
+        while True:
+            profile = await queue.get()
+            if profile is None:
+                return
+            name = item_id(profile)
+            try:
+                result = await self._generate(profile)
+                write_checkpoint(self.out_dir, name, {"profile": profile, **result})
+                self.counts["done"] += 1
+                print(
+                    f"   [{self._progress()}/{total}] {name} "
+                    f"{profile['weight']}->{profile['target_weight']}kg "
+                    f"{profile['duration_weeks']}w in {result['elapsed']:.1f}s"
+                )
+            except Exception as e:
+                self.counts["failed"] += 1
+                print(f"   [{self._progress()}/{total}] {name} ❌ {e}")
+
+    def _progress(self):
+        return sum(self.counts[k] for k in ("done", "skipped", "failed"))
+
+    async def run(self, profiles):
+        os.makedirs(self.out_dir, exist_ok=True)
+        pending = []
+        for profile in profiles:
+            if self._finished(item_id(profile)):
+                self.counts["skipped"] += 1
+            else:
+                pending.append(profile)
+        total = len(pending) + self.counts["skipped"]
+        print(
+            f"{total} profiles, {self.counts['skipped']} already checkpointed, "
+            f"{len(pending)} to generate"
+        )
+
+        queue = asyncio.Queue()
+        for profile in pending:
+            queue.put_nowait(profile)
+        for _ in range(self.concurrency):
+            queue.put_nowait(None)
+        await asyncio.gather(
+            *(self._worker(queue, total) for _ in range(self.concurrency))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch generate_roadmap runner")
+    parser.add_argument("--csv", help="profile CSV, otherwise a grid is built")
+    for field in PROFILE_FIELDS:
+        flag = "--" + "".join(
+            "-" + c.lower() if c.isupper() else c for c in field
+        ).replace("_", "-")
+        parser.add_argument(flag, dest=field, help="comma-separated grid values")
+    parser.add_argument("--out", default="roadmaps", help="checkpoint directory")
+    parser.add_argument("--url", default=os.getenv("CHAT_AGENT_URL", FUNCTION_URL))
+    parser.add_argument("--key", default=os.getenv("EXPO_PUBLIC_SUPABASE_ANON_KEY"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1.0, help="requests per second")
+    parser.add_argument("--burst", type=float, help="token bucket capacity")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    args = parser.parse_args()
+
+    if args.csv:
+        profiles = list(profiles_from_csv(args.csv))
+    else:
+        profiles = list(profiles_from_grid(vars(args)))
+
+    headers = {}
+    if args.key:
+        headers = {"apikey": args.key, "Authorization": f"Bearer {args.key}"}
+
+    runner = BatchRunner(
+        args.url,
+        headers,
+        args.out,
+        args.concurrency,
+        TokenBucket(args.rate, args.burst),
+        args.retries,
+        args.timeout,
+    )
+    start = time.perf_counter()
+    try:
+        asyncio.run(runner.run(profiles))
+    except KeyboardInterrupt:
+        print("\nInterrupted, finished items are checkpointed. Re-run to resume.")
+    counts = runner.counts
+    print(
+        f"\nDone {counts['done']} | skipped {counts['skipped']} | "
+        f"failed {counts['failed']} | retries {counts['retries']} | "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Record/replay store for chat-agent calls.
+
+Set VQ_CASSETTE=record to pass requests through to the edge function and
+store every request/response pair, or VQ_CASSETTE=replay to answer from the
+store without touching the network. Anything else (the default) is a plain,
+traced POST through metrics.post, or through request_policy.post (hedging,
+deadlines, circuit breaker) when VQ_HEDGE is set.
+
+    VQ_CASSETTE=record python test_phase5.py   # once, against the real function
+    VQ_CASSETTE=replay python test_phase5.py    # offline, in milliseconds
+
+A replayed response's trace carries the recorded request time as a
+`replayed` span, so the timings the scripts print are the recorded ones;
+`replayed(response)` tells them apart from live calls.
+
+A cassette is a directory holding `data.bin` (append-only zlib-compressed
+records) and `index.json` (request key -> offset, length). Keys are a hash of
+the normalised request body: mode, message, context and history with
+volatile fields such as userId dropped, so reordered keys or a different test
+user still hit the same recording.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+
+import metrics
+import request_policy
+from payloads import mode_name
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes")
+KEY_FIELDS = ("mode", "message", "context", "history", "attachments")
+VOLATILE_FIELDS = {"userId", "goalId", "date", "hour"}
+
+
+class CassetteMiss(KeyError):
+    pass
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {
+            k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_FIELDS
+        }
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def request_key(payload):
+    body = {k: payload.get(k) for k in KEY_FIELDS if payload.get(k) not in (None, [])}
+    normalized = json.dumps(
+        _strip_volatile(body), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class RecordedResponse:
+    """The subset of `requests.Response` the scripts use."""
+
+    def __init__(self, status_code, text, headers=None, elapsed=0.0):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.elapsed_seconds = elapsed
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 300
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class Cassette:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._data_path = os.path.join(path, "data.bin")
+        self._index_path = os.path.join(path, "index.json")
+        self._index = {}
+        self._cache = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        entry = self._index.get(key)
+        if entry is None:
+            raise CassetteMiss(key)
+        with open(self._data_path, "rb") as f:
+            f.seek(entry["offset"])
+            record = json.loads(zlib.decompress(f.read(entry["length"])))
+        response = RecordedResponse(
+            record["status"], record["body"], record.get("headers"), record["elapsed"]
+        )
+        self._cache[key] = response
+        return response
+
+    def put(self, key, payload, response, elapsed):
+        record = {
+            "mode": payload.get("mode"),
+            "status": response.status_code,
+            "headers": {"content-type": response.headers.get("content-type", "")},
+            "body": response.text,
+            "elapsed": elapsed,
+            "recorded_at": time.time(),
+        }
+        blob = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._data_path, "ab") as f:
+            offset = f.tell()
+            f.write(blob)
+        self._index[key] = {
+            "offset": offset,
+            "length": len(blob),
+            "mode": payload.get("mode"),
+            "status": response.status_code,
+        }
+        self._save_index()
+        self._cache.pop(key, None)
+
+    def _save_index(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self._index_path)
+
+
+_cassettes = {}
+
+
+def _open(path):
+    if path not in _cassettes:
+        _cassettes[path] = Cassette(path)
+    return _cassettes[path]
+
+
+def replayed(response):
+    """True when response came from a cassette rather than the network."""
+    trace = getattr(response, "trace", None)
+    return trace is not None and trace.tags.get("source") == "replay"
+
+
+def post(url, headers=None, json=None, timeout=None):
+    """Drop-in for `requests.post(url, headers=..., json=...)`.
+
+    The response carries a metrics.Trace as `response.trace`.
+    """
+    mode = os.getenv("VQ_CASSETTE", "off").lower()
+    path = os.getenv("VQ_CASSETTE_PATH", DEFAULT_PATH)
+    payload = json or {}
+
+    if mode == "replay":
+        key = request_key(payload)
+        try:
+            response = _open(path).get(key)
+            # Fresh trace per call, decode/validate timings still apply offline
+            response.trace = metrics.Trace(mode_name(payload), source="replay")
+            response.trace.add("replayed", response.elapsed_seconds)
+            response.trace.status = response.status_code
+            return response
+        except CassetteMiss:
+            raise CassetteMiss(
+                f"No recording for mode={payload.get('mode')!r} (key {key[:12]}) in "
+                f"{path}. Run once with VQ_CASSETTE=record."
+            ) from None
+
+    if os.getenv("VQ_HEDGE"):
+        # Hedged, deadline-bound and behind the circuit breaker
+        response = request_policy.post(url, headers=headers, json=payload, timeout=timeout)
+    else:
+        response = metrics.post(url, headers=headers, json=payload, timeout=timeout)
+    if mode == "record":
+        _open(path).put(request_key(payload), payload, response, response.trace.total)
+    return response
@@ -1,15 +1,27 @@
 from google import genai
 
+import metrics
+
 client = genai.Client()
 
+
+def list_models():
+    trace = metrics.Trace("models.list")
+    with trace.span("server"):
+        models = list(client.models.list())
+    trace.status = 200
+    return models
+
+
+# One listing for both actions; `python vq.py models` also caches it on disk
+models = list_models()
+
 print("List of models that support generateContent:\n")
-for m in client.models.list():
-    for action in m.supported_actions:
-        if action == "generateContent":
-            print(m.name)
+for m in models:
+    if "generateContent" in m.supported_actions:
+        print(m.name)
 
 print("List of models that support embedContent:\n")
-for m in client.models.list():
-    for action in m.supported_actions:
-        if action == "embedContent":
-            print(m.name)
+for m in models:
+    if "embedContent" in m.supported_actions:
+        print(m.name)
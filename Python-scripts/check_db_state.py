@@ -1,7 +1,9 @@
-import requests
 import os
+
 from dotenv import load_dotenv
 
+import metrics
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("EXPO_PUBLIC_SUPABASE_URL")
@@ -22,9 +24,10 @@ print("=== Checking Database State ===\n")
 
 # 1. Check health_goals
 print("1. Health Goals:")
-resp = requests.get(
+resp = metrics.get(
     f"{SUPABASE_URL}/rest/v1/health_goals?select=id,goal_type,status,ai_summary&status=eq.active&limit=3",
     headers=headers,
+    mode="rest:health_goals",
 )
 goals = resp.json()
 for g in goals:
@@ -33,9 +36,10 @@ for g in goals:
 
 # 2. Check weekly_plans
 print("\n2. Weekly Plans (first 3):")
-resp = requests.get(
+resp = metrics.get(
     f"{SUPABASE_URL}/rest/v1/weekly_plans?select=id,goal_id,week_number,focus_areas,status&limit=3",
     headers=headers,
+    mode="rest:weekly_plans",
 )
 weeks = resp.json()
 for w in weeks:
@@ -49,9 +53,10 @@ from datetime import date
 
 today_str = date.today().isoformat()
 print(f"\n3. Daily Plans for today ({today_str}):")
-resp = requests.get(
+resp = metrics.get(
     f"{SUPABASE_URL}/rest/v1/daily_plans?select=id,date,summary,calorie_target,weekly_plan_id&date=eq.{today_str}",
     headers=headers,
+    mode="rest:daily_plans",
 )
 days = resp.json()
 if days:
@@ -65,9 +70,10 @@ else:
 
 # 4. Check plan_tasks
 print(f"\n4. Plan Tasks (all):")
-resp = requests.get(
+resp = metrics.get(
     f"{SUPABASE_URL}/rest/v1/plan_tasks?select=id,plan_id,description,task_type,time_slot,is_completed&limit=10",
     headers=headers,
+    mode="rest:plan_tasks",
 )
 tasks = resp.json()
 if isinstance(tasks, list) and tasks:
@@ -0,0 +1,356 @@
+"""
+Local SQLite mirror of the plan and logging tables.
+
+`sync` pulls only rows changed since the last run. Each table keeps a
+(watermark, last id) pair in `_sync_state` and is paged with a keyset filter
+on that pair, so every request is an index range scan and an interrupted
+sync resumes from the last committed page. All tables sync concurrently.
+
+created_at is the time a transaction started, not when it committed, so a
+row can become visible after later rows were already synced. Every sync
+therefore starts LOOKBACK before the watermark and upserts by id; rows that
+come back unchanged are left alone. weight_logs looks back two days because
+goalsStore.logWeight upserts on (user_id, date), so a same-day re-weigh
+changes a row whose created_at is hours old. Every row written or changed
+gets the next `_seq` of its table, a local change counter that
+insights.py follows.
+
+    python db_mirror.py sync                      # incremental
+    python db_mirror.py sync --full --tables plan_tasks
+    python db_mirror.py status
+    python db_mirror.py sql "select date, weight from weight_logs order by date"
+
+Only health_goals has updated_at; the other tables are ordered by
+created_at, so later edits to their rows (plan_tasks.is_completed, ...)
+older than the lookback, and deletes, reach the mirror only with --full.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import metrics
+from async_http import request
+from plan_export import rest_config
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vq_mirror.sqlite")
+
+# table -> (watermark column, columns) as in supabase/migrations
+TABLES = {
+    "health_goals": (
+        "updated_at",
+        (
+            "id", "user_id", "goal_type", "target_value", "target_unit",
+            "start_value", "start_date", "target_date", "duration_weeks",
+            "daily_calorie_target", "protein_target", "carbs_target", "fat_target",
+            "status", "is_realistic", "ai_summary", "created_at", "updated_at",
+        ),
+    ),
+    "weekly_plans": (
+        "created_at",
+        (
+            "id", "goal_id", "user_id", "week_number", "week_start_date",
+            "calorie_target", "focus_areas", "ai_tips", "status", "created_at",
+        ),
+    ),
+    "daily_plans": (
+        "created_at",
+        (
+            "id", "user_id", "date", "summary", "goal_id", "weekly_plan_id",
+            "calorie_target", "calorie_consumed", "calorie_burned",
+            "protein_target", "carbs_target", "fat_target", "created_at",
+        ),
+    ),
+    "plan_tasks": (
+        "created_at",
+        (
+            "id", "plan_id", "description", "is_completed", "xp_reward",
+            "task_type", "metadata", "actual_metadata", "meal_type", "time_slot",
+            "photo_url", "verified_at", "created_at",
+        ),
+    ),
+    "calorie_log": (
+        "created_at",
+        (
+            "id", "user_id", "log_date", "task_id", "log_type", "description",
+            "calories", "protein", "carbs", "fat", "source", "created_at",
+        ),
+    ),
+    "weight_logs": (
+        "created_at",
+        ("id", "user_id", "date", "weight", "created_at"),
+    ),
+}
+# Seconds re-read before the watermark on every sync
+LOOKBACK = {"weight_logs": 2 * 86400}
+DEFAULT_LOOKBACK = 900
+INDEXES = (
+    "weekly_plans(goal_id, week_number)",
+    "daily_plans(user_id, date)",
+    "daily_plans(weekly_plan_id)",
+    "plan_tasks(plan_id)",
+    "calorie_log(user_id, log_date)",
+    "weight_logs(user_id, date)",
+)
+
+
+def connect(path=DEFAULT_DB):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS _sync_state (table_name TEXT PRIMARY KEY, "
+        "watermark TEXT, last_id TEXT, rows INTEGER DEFAULT 0, synced_at REAL, "
+        "seq INTEGER DEFAULT 0)"
+    )
+    if "seq" not in {row[1] for row in db.execute("PRAGMA table_info(_sync_state)")}:
+        db.execute("ALTER TABLE _sync_state ADD COLUMN seq INTEGER DEFAULT 0")
+    for table, (_, columns) in TABLES.items():
+        rest = ", ".join(columns[1:])
+        db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, {rest}, _seq INTEGER)"
+        )
+        existing = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+        if "_seq" not in existing:
+            # Mirrors from before _seq: number the existing rows once
+            db.execute(f"ALTER TABLE {table} ADD COLUMN _seq INTEGER")
+            db.execute(f"UPDATE {table} SET _seq = rowid")
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_seq ON {table}(_seq)")
+    for index in INDEXES:
+        name = "idx_" + index.replace("(", "_").replace(", ", "_").rstrip(")")
+        db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {index}")
+    db.commit()
+    return db
+
+
+def _sql_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _quoted(value):
+    # PostgREST filter value, quoted because timestamps contain ':' and '.'
+    return quote('"' + value.replace('"', '\\"') + '"', safe="")
+
+
+def lookback_start(watermark, seconds):
+    """The watermark moved back by `seconds`, as a PostgREST timestamp."""
+    moment = datetime.fromisoformat(watermark.replace("Z", "+00:00"))
+    return (moment - timedelta(seconds=seconds)).isoformat()
+
+
+def page_url(base_url, table, watermark, last_id, page_size, since=None):
+    """One page after (watermark, last_id), or from `since` on (inclusive)."""
+    column, columns = TABLES[table]
+    url = (
+        f"{base_url}/rest/v1/{table}?select={','.join(columns)}"
+        f"&order={column}.asc,id.asc&limit={page_size}"
+        f"&{column}=not.is.null"
+    )
+    if since is not None:
+        url += f"&{column}=gte.{_quoted(since)}"
+    elif watermark is not None:
+        w = _quoted(watermark)
+        url += f"&or=({column}.gt.{w},and({column}.eq.{w},id.gt.{_quoted(last_id)}))"
+    return url
+
+
+class Mirror:
+    def __init__(self, db, base_url, headers, page_size=1000, timeout=60, lookback=None):
+        self.db = db
+        # table -> seconds, None for the LOOKBACK defaults
+        self.lookback = lookback
+        self.base_url = base_url
+        self.headers = headers
+        self.page_size = page_size
+        self.timeout = timeout
+
+    def state(self, table):
+        row = self.db.execute(
+            "SELECT watermark, last_id FROM _sync_state WHERE table_name = ?", (table,)
+        ).fetchone()
+        return row or (None, None)
+
+    def reset(self, table):
+        # The _seq counter survives, so readers following it see the
+        # refetched rows as changes instead of stopping at an old position
+        with self.db:
+            self.db.execute(
+                "INSERT INTO _sync_state (table_name, seq) VALUES (?, ?) "
+                "ON CONFLICT(table_name) DO UPDATE SET seq = MAX(seq, excluded.seq)",
+                (table, self._seq(table)),
+            )
+            self.db.execute(f"DELETE FROM {table}")
+            self.db.execute(
+                "UPDATE _sync_state SET watermark = NULL, last_id = NULL, rows = 0 "
+                "WHERE table_name = ?",
+                (table,),
+            )
+
+    def _seq(self, table):
+        row = self.db.execute(
+            f"SELECT MAX(COALESCE((SELECT MAX(_seq) FROM {table}), 0), "
+            "COALESCE((SELECT seq FROM _sync_state WHERE table_name = ?), 0))",
+            (table,),
+        ).fetchone()
+        return row[0]
+
+    def _apply(self, table, rows):
+        """Upserts a page; returns how many rows were new or changed."""
+        column, columns = TABLES[table]
+        placeholders = ", ".join("?" for _ in columns)
+        names = ", ".join(columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+        current = ", ".join(f"{table}.{c}" for c in columns[1:])
+        incoming = ", ".join(f"excluded.{c}" for c in columns[1:])
+        last = rows[-1]
+        # Rows and the new watermark commit together, so a crash mid-sync
+        # never skips rows on the next run
+        with self.db:
+            seq = self._seq(table)
+            before = self.db.total_changes
+            self.db.executemany(
+                f"INSERT INTO {table} ({names}, _seq) VALUES ({placeholders}, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}, _seq = excluded._seq "
+                f"WHERE ({current}) IS NOT ({incoming})",
+                [
+                    tuple(_sql_value(r.get(c)) for c in columns) + (seq + i + 1,)
+                    for i, r in enumerate(rows)
+                ],
+            )
+            changed = self.db.total_changes - before
+            self.db.execute(
+                "INSERT INTO _sync_state (table_name, watermark, last_id, rows, "
+                "synced_at, seq) VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(table_name) DO "
+                "UPDATE SET watermark = excluded.watermark, last_id = excluded.last_id,"
+                " rows = rows + excluded.rows, synced_at = excluded.synced_at,"
+                " seq = excluded.seq",
+                (table, last[column], last["id"], changed, time.time(), seq + len(rows)),
+            )
+        return changed
+
+    async def sync_table(self, table):
+        watermark, last_id = self.state(table)
+        since = None
+        if watermark is not None:
+            seconds = (self.lookback or {}).get(
+                table, LOOKBACK.get(table, DEFAULT_LOOKBACK)
+            )
+            since = lookback_start(watermark, seconds)
+        fetched = 0
+        changed = 0
+        pages = 0
+        while True:
+            url = page_url(
+                self.base_url, table, watermark, last_id, self.page_size, since
+            )
+            since = None
+            response = await request("GET", url, self.headers, timeout=self.timeout)
+            metrics.observe_response(f"rest:{table}", response, source="mirror")
+            pages += 1
+            if response.status != 200:
+                raise RuntimeError(f"{table}: HTTP {response.status} {response.text[:200]}")
+            rows = response.json()
+            if rows:
+                changed += self._apply(table, rows)
+                fetched += len(rows)
+                watermark = rows[-1][TABLES[table][0]]
+                last_id = rows[-1]["id"]
+            if len(rows) < self.page_size:
+                return table, fetched, changed, pages
+
+    async def sync(self, tables):
+        results = await asyncio.gather(
+            *(self.sync_table(t) for t in tables), return_exceptions=True
+        )
+        return dict(zip(tables, results))
+
+
+def print_status(db):
+    print(f"{'table':<14}{'rows':>9}  watermark")
+    for table in TABLES:
+        count = db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        watermark, _ = db.execute(
+            "SELECT watermark, last_id FROM _sync_state WHERE table_name = ?", (table,)
+        ).fetchone() or (None, None)
+        print(f"{table:<14}{count:>9}  {watermark or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite mirror of Supabase tables")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    sync = commands.add_parser("sync", help="fetch rows changed since the last sync")
+    sync.add_argument("--tables", default=",".join(TABLES))
+    sync.add_argument("--full", action="store_true", help="drop and refetch tables")
+    sync.add_argument("--page-size", type=int, default=1000)
+    sync.add_argument(
+        "--lookback", type=float,
+        help="seconds re-read before the watermark, default 900 (weight_logs 2 days)",
+    )
+    sync.add_argument("--key", help="JWT to use, defaults to the .env keys")
+    commands.add_parser("status", help="row counts and watermarks")
+    sql = commands.add_parser("sql", help="run a query against the mirror")
+    sql.add_argument("query")
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    if args.command == "status":
+        print_status(db)
+        return
+    if args.command == "sql":
+        start = time.perf_counter()
+        cursor = db.execute(args.query)
+        names = [d[0] for d in cursor.description or ()]
+        if names:
+            print("\t".join(names))
+        for row in cursor:
+            print("\t".join("" if v is None else str(v) for v in row))
+        print(f"({1000 * (time.perf_counter() - start):.1f} ms)", file=sys.stderr)
+        return
+
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)}")
+    base_url, headers = rest_config(args.key)
+    if not base_url:
+        print("ERROR: EXPO_PUBLIC_SUPABASE_URL not found in .env")
+        sys.exit(1)
+
+    lookback = None
+    if args.lookback is not None:
+        lookback = dict.fromkeys(tables, args.lookback)
+    mirror = Mirror(db, base_url, headers, args.page_size, lookback=lookback)
+    if args.full:
+        for table in tables:
+            mirror.reset(table)
+    start = time.perf_counter()
+    results = asyncio.run(mirror.sync(tables))
+    failed = False
+    for table, result in results.items():
+        if isinstance(result, Exception):
+            failed = True
+            print(f"   {table:<14} ❌ {result}")
+        else:
+            _, fetched, changed, pages = result
+            print(
+                f"   {table:<14} {fetched} rows read, {changed} new or changed "
+                f"in {pages} requests"
+            )
+    print(f"Synced in {time.perf_counter() - start:.2f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
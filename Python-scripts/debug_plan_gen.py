@@ -1,6 +1,7 @@
-import requests
 import json
-import time
+
+import cassette
+import metrics
 
 # Use the anon key found in .env
 ANON_KEY = "sb_publishable_zsRFhzOrapI7NscZ6vYGFw_AB3I__GV"
@@ -27,31 +28,30 @@ def test_generate_roadmap():
 
     try:
         print("Sending request...")
-        start_time = time.time()
-        response = requests.post(FUNCTION_URL, headers=HEADERS, json=payload)
-        duration = time.time() - start_time
+        response = cassette.post(FUNCTION_URL, headers=HEADERS, json=payload)
 
         print(f"Response status: {response.status_code}")
 
         if response.status_code == 200:
-            data = response.json()
             # The edge function wraps the AI text in a 'text' property
-            raw_text = data.get("text", "")
+            raw_text = response.json().get("text", "")
             print(f"\nRaw AI Response ({len(raw_text)} chars):")
             print(raw_text)
 
-            try:
-                plan_json = json.loads(raw_text)
+            plan_json, errors = metrics.decode_and_validate(response, "generate_roadmap")
+            if plan_json is None:
+                print(f"\n❌ JSON Decode Error: {errors[0].message}")
+            else:
                 print("\nJSON Parsed Successfully:")
                 print(f"- goal_summary: {plan_json.get('goal_summary')}")
+                for error in errors:
+                    print(f"❌ Schema: {error}")
                 if "day_1_tasks" in plan_json:
                     print("- day_1_tasks found!")
                     print(json.dumps(plan_json["day_1_tasks"], indent=2))
                 else:
                     print("❌ day_1_tasks MISSING in JSON")
-
-            except json.JSONDecodeError as e:
-                print(f"\n❌ JSON Decode Error: {e}")
+            print(f"\nTimings: {response.trace.describe()}")
         else:
             print(f"Error body: {response.text}")
 
@@ -0,0 +1,300 @@
+"""
+Multi-turn chat simulator: payload size and latency as the history grows.
+
+chat.tsx sends the last 30 messages as `history` on every turn, so each
+request carries the whole recent conversation and Gemini re-reads it. This
+replays synthetic conversations turn by turn under different history
+strategies and records request bytes and latency per turn:
+
+    app        last 30 messages, as chat.tsx does today
+    full       every message so far
+    window     last --window messages
+    summary    a rolling summary of older turns plus the messages it does not
+               cover yet (at least --window), refreshed through the existing
+               generate_summary mode once --summary-every turns have left
+               the window
+
+    python history_sim.py --url http://127.0.0.1:8787 --turns 40 --conversations 4
+    python history_sim.py --strategies full,window,summary --window 6 --out turns.jsonl
+
+The report compares each strategy with the first one at several history
+lengths. Summary requests are counted separately because the app can send
+them after the reply has been shown. generate_summary's prompt is written
+for daily task progress and caps the output at about 40 words; here it only
+receives the dropped turns as `tasks`, so expect terse summaries.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+import metrics
+from async_http import post_json
+from latency_stats import summarize
+from payloads import FAKE_USER_ID, FUNCTION_URL, app_chat_payload
+
+APP_HISTORY = 30
+STRATEGIES = ("app", "full", "window", "summary")
+_TOPICS = (
+    "How many calories should I eat on a rest day?",
+    "I skipped my workout yesterday, how do I catch up?",
+    "Is paneer a good protein source for dinner?",
+    "My weight went up 0.5 kg overnight, should I worry?",
+    "Can you suggest a quick high-protein breakfast?",
+    "How much water should I drink when it is hot?",
+    "I had two samosas at work, what should dinner look like now?",
+    "What is a good warm-up before squats?",
+    "I am sleeping badly, does that affect fat loss?",
+    "How do I stop snacking late at night?",
+)
+
+
+def message(role, text):
+    return {"role": role, "parts": [{"text": text}]}
+
+
+class Conversation:
+    """One simulated chat session under one history strategy."""
+
+    def __init__(self, strategy, window, summary_every, rng):
+        self.strategy = strategy
+        self.window = window
+        self.summary_every = summary_every
+        self.rng = rng
+        self.messages = []
+        self.summary = None
+        self.summarized = 0  # messages folded into the summary
+        self._pending_end = 0
+
+    def user_message(self):
+        text = self.rng.choice(_TOPICS)
+        if self.rng.random() < 0.5:
+            text += f" Today I weigh {self.rng.uniform(70, 90):.1f} kg."
+        return text
+
+    def history(self):
+        if self.strategy == "full":
+            return list(self.messages)
+        if self.strategy == "app":
+            return self.messages[-APP_HISTORY:]
+        if self.strategy == "window":
+            return self.messages[-self.window:] if self.window else []
+        # Everything not yet folded into the summary is sent verbatim
+        recent = self.messages[self.summarized:]
+        if not self.summary:
+            return recent
+        return [
+            message("user", f"Summary of our earlier conversation: {self.summary}"),
+            message("model", "Thanks, I have that context."),
+        ] + recent
+
+    def summary_payload(self):
+        """generate_summary request for the turns that left the window, or None."""
+        if self.strategy != "summary":
+            return None
+        end = len(self.messages) - self.window
+        if end - self.summarized < 2 * self.summary_every:
+            return None
+        turns = [
+            {"role": m["role"], "text": m["parts"][0]["text"]}
+            for m in self.messages[self.summarized:end]
+        ]
+        if self.summary:
+            turns.insert(0, {"role": "summary", "text": self.summary})
+        self._pending_end = end
+        return {
+            "mode": "generate_summary",
+            "userId": FAKE_USER_ID,
+            "context": {
+                "userName": "Test User",
+                "hour": 12,
+                "hydration": {},
+                "tasks": turns,
+            },
+        }
+
+    def apply_summary(self, text):
+        self.summary = text
+        self.summarized = self._pending_end
+
+
+async def _post(url, headers, payload, timeout, mode):
+    size = len(json.dumps(payload).encode("utf-8"))
+    start = time.perf_counter()
+    try:
+        response = await post_json(url, payload, headers=headers, timeout=timeout)
+        metrics.observe_response(mode, response, source="history_sim", bytes=size)
+        error = None if response.status == 200 else f"HTTP {response.status}"
+    except asyncio.TimeoutError:
+        response, error = None, "timeout"
+    except Exception as e:
+        response, error = None, type(e).__name__
+    return response, size, time.perf_counter() - start, error
+
+
+async def run_conversation(url, headers, strategy, index, args, records):
+    rng = random.Random(args.seed * 1000 + index)
+    conv = Conversation(strategy, args.window, args.summary_every, rng)
+    for turn in range(1, args.turns + 1):
+        text = conv.user_message()
+        history = conv.history()
+        payload = app_chat_payload(text, history)
+        response, size, latency, error = await _post(
+            url, headers, payload, args.timeout, "chat"
+        )
+        reply = ""
+        if response is not None and error is None:
+            reply = response.json().get("text", "")
+        records.append(
+            {
+                "strategy": strategy,
+                "conversation": index,
+                "turn": turn,
+                "kind": "chat",
+                "history_messages": len(history),
+                "bytes": size,
+                "latency": latency,
+                "error": error,
+            }
+        )
+        conv.messages += [message("user", text), message("model", reply or "...")]
+
+        summary = conv.summary_payload()
+        if summary is None:
+            continue
+        response, size, latency, error = await _post(
+            url, headers, summary, args.timeout, "generate_summary"
+        )
+        if response is not None and error is None:
+            conv.apply_summary(response.json().get("summary", ""))
+        records.append(
+            {
+                "strategy": strategy,
+                "conversation": index,
+                "turn": turn,
+                "kind": "summary",
+                "history_messages": len(summary["context"]["tasks"]),
+                "bytes": size,
+                "latency": latency,
+                "error": error,
+            }
+        )
+
+
+async def simulate(url, headers, strategies, args):
+    records = []
+    # Strategies run one after another so they do not share server load
+    for strategy in strategies:
+        await asyncio.gather(
+            *(
+                run_conversation(url, headers, strategy, i, args, records)
+                for i in range(args.conversations)
+            )
+        )
+    return records
+
+
+def _buckets(turns):
+    """Turn ranges for the report, finer at the start of a conversation."""
+    edges = [1, 5, 10, 15, 20, 30, 40, 60, 80, 100, 150, 200]
+    edges = [e for e in edges if e < turns] + [turns]
+    return list(zip([0] + edges[:-1], edges))
+
+
+def report(records, strategies, turns):
+    chats = [r for r in records if r["kind"] == "chat" and not r["error"]]
+    base = strategies[0]
+    print(f"\n=== Request size and latency by turn (change vs {base}) ===")
+    print(f"{'':>9}" + "".join(f"{s:>24}" for s in strategies))
+    print(f"{'turns':>9}" + f"{'kB':>12}{'p50 s':>12}" * len(strategies))
+    for low, high in _buckets(turns):
+        line = f"{f'{low + 1}-{high}' if high > low + 1 else high:>9}"
+        columns = {}
+        for strategy in strategies:
+            rows = [
+                r for r in chats if r["strategy"] == strategy and low < r["turn"] <= high
+            ]
+            if rows:
+                columns[strategy] = (
+                    sum(r["bytes"] for r in rows) / len(rows) / 1024,
+                    summarize([r["latency"] for r in rows])["p50"],
+                )
+        for strategy in strategies:
+            if strategy not in columns:
+                line += f"{'-':>12}{'-':>12}"
+                continue
+            kb, p50 = columns[strategy]
+            if strategy == base or base not in columns:
+                line += f"{kb:>12.1f}{p50:>12.2f}"
+                continue
+            base_kb, base_p50 = columns[base]
+            line += (
+                f"{kb:>6.1f}{100 * (kb / base_kb - 1):>+5.0f}%"
+                f"{p50:>6.2f}{100 * (p50 / base_p50 - 1):>+5.0f}%"
+            )
+        print(line)
+
+    print(f"\n{'strategy':<10}{'requests':>9}{'errors':>8}{'sent MB':>9}{'chat p50':>10}"
+          f"{'p95':>8}{'summaries':>11}{'sum. MB':>9}{'sum. s':>8}")
+    for strategy in strategies:
+        rows = [r for r in records if r["strategy"] == strategy]
+        chat = [r for r in rows if r["kind"] == "chat"]
+        summaries = [r for r in rows if r["kind"] == "summary"]
+        stats = summarize([r["latency"] for r in chat if not r["error"]])
+        print(
+            f"{strategy:<10}{len(chat):>9}{sum(1 for r in rows if r['error']):>8}"
+            f"{sum(r['bytes'] for r in chat) / 1e6:>9.2f}"
+            f"{stats['p50']:>10.2f}{stats['p95']:>8.2f}{len(summaries):>11}"
+            f"{sum(r['bytes'] for r in summaries) / 1e6:>9.2f}"
+            f"{sum(r['latency'] for r in summaries):>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=os.getenv("CHAT_AGENT_URL", FUNCTION_URL))
+    parser.add_argument("--key", default=os.getenv("EXPO_PUBLIC_SUPABASE_ANON_KEY"))
+    parser.add_argument(
+        "--strategies",
+        default=",".join(STRATEGIES),
+        help="comma-separated subset of: " + ", ".join(STRATEGIES),
+    )
+    parser.add_argument("--turns", type=int, default=40, help="user messages per conversation")
+    parser.add_argument("--conversations", type=int, default=2, help="per strategy, concurrent")
+    parser.add_argument("--window", type=int, default=8, help="messages kept verbatim")
+    parser.add_argument(
+        "--summary-every", type=int, default=5, help="turns that leave the window per summary"
+    )
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write per-request records as JSONL")
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        parser.error(f"unknown strategies: {', '.join(unknown)}")
+
+    headers = {}
+    if args.key:
+        headers = {"apikey": args.key, "Authorization": f"Bearer {args.key}"}
+
+    print(
+        f"=== {args.conversations} x {args.turns}-turn conversations per strategy "
+        f"against {args.url} ==="
+    )
+    start = time.perf_counter()
+    records = asyncio.run(simulate(args.url, headers, strategies, args))
+    report(records, strategies, args.turns)
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    main()
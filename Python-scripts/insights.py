@@ -0,0 +1,630 @@
+"""
+Incrementally maintained calorie and weight insights on top of the mirror.
+
+Reads calorie_log, weight_logs and daily_plans from the SQLite mirror
+(db_mirror.py) and keeps, per user:
+
+    insight_days    one row per (user, day): food and exercise calories, log
+                    count, daily_plans.calorie_target and weight, plus prefix
+                    sums of food, exercise and logged days so any date range
+                    is two index lookups (range_summary)
+    insight_users   30-day ring buffers of days and weigh-ins with running
+                    7- and 30-day sums, and the logging and on-target streaks
+
+Each source table has a cursor on the mirror's `_seq` change counter in
+`_insight_seq`, so `update` only reads rows the mirror added or changed
+since the last run, including late commits and weight_logs re-weighs picked
+up by its lookback. What each source row contributed is kept in
+insight_rows, so a changed row is applied as the difference. Rows are
+grouped per (user, day) and every touched day is an O(1) ring update. A day
+that already left the 30-day window, a change that splits a streak, a day
+losing all its logs or a weigh-in removed from a day rebuilds just that user
+from insight_days. Days and cursors commit together.
+
+    python db_mirror.py sync && python insights.py update
+    python insights.py show --user <uuid> --as-of 2026-01-31
+    python insights.py range <uuid> 2026-01-01 2026-01-31
+    python insights.py check          # compare with a from-scratch recompute
+    python insights.py rebuild
+
+Edits older than the mirror's lookback, and deletes, need
+`db_mirror.py sync --full` followed by `insights.py rebuild`.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from db_mirror import DEFAULT_DB
+from db_mirror import connect as connect_mirror
+
+RING = 30
+WINDOWS = (7, 30)
+# Calorie slot vector: logged, food, exercise, days with a target, sum of
+# (target - net) over those days
+_CALORIE_WIDTH = 5
+_WEIGHT_WIDTH = 2  # weigh-ins, grams
+
+_EMPTY_DAY = {"food": 0, "exercise": 0, "entries": 0, "target": None, "weight": None}
+
+
+def connect(path=DEFAULT_DB):
+    db = connect_mirror(path)
+    legacy = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = '_insight_cursor'"
+    ).fetchone()
+    if legacy:
+        # Aggregates from the created_at cursors have no insight_rows to
+        # apply changes against; start over, the next update rebuilds them
+        print("Dropping insights from an older version, run update", file=sys.stderr)
+        for table in (
+            "_insight_cursor", "_insight_seq", "insight_rows", "insight_days", "insight_users"
+        ):
+            db.execute(f"DROP TABLE IF EXISTS {table}")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS _insight_seq (source TEXT PRIMARY KEY, "
+        "seq INTEGER, rows INTEGER DEFAULT 0, updated_at REAL)"
+    )
+    # What each source row added to its day: food, exercise, entries for
+    # calorie_log, the weight or calorie_target otherwise
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS insight_rows (source TEXT, id TEXT, user_id TEXT, "
+        "date TEXT, a, b, c, PRIMARY KEY (source, id))"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS insight_days (user_id TEXT, date TEXT, "
+        "food INTEGER DEFAULT 0, exercise INTEGER DEFAULT 0, entries INTEGER "
+        "DEFAULT 0, target INTEGER, weight REAL, cum_food INTEGER DEFAULT 0, "
+        "cum_exercise INTEGER DEFAULT 0, cum_days INTEGER DEFAULT 0, "
+        "PRIMARY KEY (user_id, date))"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS insight_users (user_id TEXT PRIMARY KEY, state TEXT)"
+    )
+    db.commit()
+    return db
+
+
+def _ordinal(value):
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _iso(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+class Ring:
+    """Per-day slots for the last 30 days with running 7- and 30-day sums.
+
+    `advance` moves the newest day forward and subtracts the days that fall
+    out of each window, at most 30 slots however far it jumps; `set`
+    replaces one day's vector inside the window.
+    """
+
+    def __init__(self, width, state=None):
+        self.width = width
+        state = state or {}
+        self.last = state.get("last")
+        self.slots = state.get("slots") or [None] * RING
+        self.sums = state.get("sums") or {str(w): [0] * width for w in WINDOWS}
+
+    def to_json(self):
+        return {"last": self.last, "slots": self.slots, "sums": self.sums}
+
+    def get(self, ordinal):
+        slot = self.slots[ordinal % RING]
+        return slot[1] if slot and slot[0] == ordinal else None
+
+    def _add(self, ordinal, vector, sign):
+        for window in WINDOWS:
+            if ordinal > self.last - window:
+                sums = self.sums[str(window)]
+                for i, v in enumerate(vector):
+                    sums[i] += sign * v
+
+    def advance(self, ordinal):
+        if self.last is None:
+            self.last = ordinal
+            return
+        if ordinal <= self.last:
+            return
+        for window in WINDOWS:
+            sums = self.sums[str(window)]
+            for day in range(self.last - window + 1, min(self.last, ordinal - window) + 1):
+                vector = self.get(day)
+                if vector:
+                    for i, v in enumerate(vector):
+                        sums[i] -= v
+        for day in range(self.last - RING + 1, min(self.last, ordinal - RING) + 1):
+            if self.get(day) is not None:
+                self.slots[day % RING] = None
+        self.last = ordinal
+
+    def set(self, ordinal, vector):
+        """Replaces a day's vector; False if the day is outside the window."""
+        if self.last is None:
+            self.advance(ordinal)
+        if not self.last - RING < ordinal <= self.last:
+            return False
+        old = self.get(ordinal)
+        if old:
+            self._add(ordinal, old, -1)
+        self.slots[ordinal % RING] = [ordinal, vector]
+        self._add(ordinal, vector, 1)
+        return True
+
+    def window(self, days):
+        return self.sums[str(days)]
+
+
+def _met_target(day):
+    return bool(
+        day["entries"]
+        and day["target"] is not None
+        and day["food"] - day["exercise"] <= day["target"]
+    )
+
+
+def _calorie_vector(day):
+    has_target = day["target"] is not None
+    gap = day["target"] - (day["food"] - day["exercise"]) if has_target else 0
+    return [1, day["food"], day["exercise"], int(has_target), gap]
+
+
+class UserInsights:
+    """Aggregates for one user; `apply` takes a day's row before and after."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.calories = Ring(_CALORIE_WIDTH, state.get("calories"))
+        self.weights = Ring(_WEIGHT_WIDTH, state.get("weights"))
+        self.streaks = state.get("streaks") or {"log": None, "target": None}
+        self.best = state.get("best") or {"log": 0, "target": 0}
+        self.missed = state.get("missed")  # latest logged day over its target
+
+    def to_json(self):
+        return {
+            "calories": self.calories.to_json(),
+            "weights": self.weights.to_json(),
+            "streaks": self.streaks,
+            "best": self.best,
+            "missed": self.missed,
+        }
+
+    def _extend(self, kind, ordinal):
+        run = self.streaks[kind]
+        if run is None or ordinal > run[1] + 1:
+            run = [ordinal, ordinal]
+        elif ordinal == run[1] + 1:
+            run = [run[0], ordinal]
+        elif not run[0] <= ordinal <= run[1]:
+            return False
+        self.streaks[kind] = run
+        self.best[kind] = max(self.best[kind], run[1] - run[0] + 1)
+        return True
+
+    def apply(self, ordinal, old, new):
+        """Folds one changed day in; False means the user needs a rebuild."""
+        if old["entries"] and not new["entries"]:
+            return False
+        if old["weight"] is not None and new["weight"] is None:
+            return False
+        if new["weight"] is not None and new["weight"] != old["weight"]:
+            self.weights.advance(ordinal)
+            # Weigh-ins older than the window do not change any reported value
+            self.weights.set(ordinal, [1, round(new["weight"] * 1000)])
+        if not new["entries"]:
+            return True
+        self.calories.advance(ordinal)
+        if not self.calories.set(ordinal, _calorie_vector(new)):
+            return False
+        if not old["entries"] and not self._extend("log", ordinal):
+            return False
+        met_before, met_now = _met_target(old), _met_target(new)
+        if not met_now:
+            self.missed = max(self.missed or ordinal, ordinal)
+        if met_now == met_before:
+            return True
+        # A day that stopped meeting its target may split the current run, and
+        # one that now meets it may have been the latest miss
+        if not met_now or ordinal == self.missed:
+            return False
+        return self._extend("target", ordinal)
+
+    def summary(self, as_of=None):
+        """Reported values, optionally moved forward to `as_of` (an ordinal)."""
+        calories = self.calories
+        weights = self.weights
+        if as_of is not None:
+            calories = Ring(_CALORIE_WIDTH, json.loads(json.dumps(calories.to_json())))
+            weights = Ring(_WEIGHT_WIDTH, json.loads(json.dumps(weights.to_json())))
+            calories.advance(as_of)
+            weights.advance(as_of)
+        end = as_of if as_of is not None else calories.last
+        result = {"last_log": _iso(self.calories.last) if self.calories.last else None}
+        latest = calories.get(end) if end is not None else None
+        result["today_food"] = latest[1] if latest else 0
+        for window in WINDOWS:
+            logged, food, exercise, targeted, gap = (
+                calories.window(window) if calories.last is not None else [0] * 5
+            )
+            result[f"days_{window}"] = logged
+            result[f"food_{window}"] = round(food / logged) if logged else None
+            result[f"net_{window}"] = round((food - exercise) / logged) if logged else None
+            result[f"deficit_{window}"] = round(gap / targeted) if targeted else None
+        for kind in ("log", "target"):
+            run = self.streaks[kind]
+            # The run counts as current if it reaches the day before `end`,
+            # since that day may simply not be logged yet
+            current = run and end is not None and run[1] >= end - 1
+            if kind == "target" and self.missed is not None:
+                current = current and run[1] > self.missed
+            result[f"{kind}_streak"] = run[1] - run[0] + 1 if current else 0
+            result[f"{kind}_best"] = self.best[kind]
+        result.update(weight=None, weight_7=None, weight_30=None, weight_change_30=None)
+        if weights.last is not None:
+            newest = max(
+                (s for s in weights.slots if s and s[0] > weights.last - RING),
+                default=None,
+            )
+            oldest = min(
+                (s for s in weights.slots if s and s[0] > weights.last - RING),
+                default=None,
+            )
+            if newest:
+                result["weight"] = newest[1][1] / 1000
+                result["weight_change_30"] = round((newest[1][1] - oldest[1][1]) / 1000, 2)
+            for window in WINDOWS:
+                count, grams = weights.window(window)
+                if count:
+                    result[f"weight_{window}"] = round(grams / count / 1000, 2)
+        return result
+
+
+def _day(db, user_id, day):
+    row = db.execute(
+        "SELECT food, exercise, entries, target, weight FROM insight_days "
+        "WHERE user_id = ? AND date = ?",
+        (user_id, day),
+    ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(_EMPTY_DAY, row))
+
+
+def _ensure_day(db, user_id, day):
+    """Returns the day's row, inserting it with the previous day's prefix sums."""
+    row = _day(db, user_id, day)
+    if row is not None:
+        return row
+    prefix = db.execute(
+        "SELECT cum_food, cum_exercise, cum_days FROM insight_days "
+        "WHERE user_id = ? AND date < ? ORDER BY date DESC LIMIT 1",
+        (user_id, day),
+    ).fetchone() or (0, 0, 0)
+    db.execute(
+        "INSERT INTO insight_days (user_id, date, cum_food, cum_exercise, cum_days) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (user_id, day) + tuple(prefix),
+    )
+    return dict(_EMPTY_DAY)
+
+
+def _read_changed(db, source, columns):
+    row = db.execute("SELECT seq FROM _insight_seq WHERE source = ?", (source,)).fetchone()
+    return db.execute(
+        f"SELECT id, {', '.join(columns)}, _seq FROM {source} WHERE _seq > ? ORDER BY _seq",
+        (row[0] if row else 0,),
+    ).fetchall()
+
+
+def _move_cursor(db, source, rows):
+    if not rows:
+        return
+    db.execute(
+        "INSERT INTO _insight_seq (source, seq, rows, updated_at) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(source) DO UPDATE SET seq = excluded.seq, "
+        "rows = rows + excluded.rows, updated_at = excluded.updated_at",
+        (source, rows[-1][-1], len(rows), time.time()),
+    )
+
+
+def _replace_row(db, source, row_id, key, values):
+    """Stores a source row's contribution; returns the previous (key, values)."""
+    previous = db.execute(
+        "SELECT user_id, date, a, b, c FROM insight_rows WHERE source = ? AND id = ?",
+        (source, row_id),
+    ).fetchone()
+    if key is None:
+        db.execute(
+            "DELETE FROM insight_rows WHERE source = ? AND id = ?", (source, row_id)
+        )
+    else:
+        db.execute(
+            "INSERT OR REPLACE INTO insight_rows VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (source, row_id) + key + tuple(values) + (0,) * (3 - len(values)),
+        )
+    if previous is None:
+        return None, None
+    return (previous[0], previous[1]), previous[2:]
+
+
+def load_user(db, user_id):
+    row = db.execute(
+        "SELECT state FROM insight_users WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    return UserInsights(json.loads(row[0]) if row else None)
+
+
+def _save_user(db, user_id, insights):
+    db.execute(
+        "INSERT OR REPLACE INTO insight_users (user_id, state) VALUES (?, ?)",
+        (user_id, json.dumps(insights.to_json(), separators=(",", ":"))),
+    )
+
+
+def rebuild_user(db, user_id):
+    """Replays every stored day of one user in date order."""
+    insights = UserInsights()
+    for row in db.execute(
+        "SELECT date, food, exercise, entries, target, weight FROM insight_days "
+        "WHERE user_id = ? ORDER BY date",
+        (user_id,),
+    ):
+        insights.apply(_ordinal(row[0]), _EMPTY_DAY, dict(zip(_EMPTY_DAY, row[1:])))
+    return insights
+
+
+def update(db):
+    """Folds rows the mirror added or changed since the last run into the aggregates."""
+    stats = {"rows": 0, "changed": 0, "days": 0, "users": 0, "rebuilt": 0}
+    # (user, day) -> [food, exercise, entries] deltas; weight and target by
+    # (user, day), None when the row that set it moved away
+    deltas, weights, targets = {}, {}, {}
+
+    def key_of(user_id, day):
+        return (user_id, day[:10]) if user_id and day else None
+
+    with db:
+        calorie_rows = _read_changed(
+            db, "calorie_log", ("user_id", "log_date", "log_type", "calories")
+        )
+        for row_id, user_id, day, log_type, calories, _ in calorie_rows:
+            key = key_of(user_id, day)
+            calories = calories or 0
+            values = (0, calories, 1) if log_type == "exercise" else (calories, 0, 1)
+            old_key, old_values = _replace_row(db, "calorie_log", row_id, key, values)
+            if old_key is not None:
+                stats["changed"] += 1
+                delta = deltas.setdefault(old_key, [0, 0, 0])
+                for i, v in enumerate(old_values):
+                    delta[i] -= v
+            if key is not None:
+                delta = deltas.setdefault(key, [0, 0, 0])
+                for i, v in enumerate(values):
+                    delta[i] += v
+        for source, columns, latest, cast in (
+            ("weight_logs", ("user_id", "date", "weight"), weights, float),
+            ("daily_plans", ("user_id", "date", "calorie_target"), targets, int),
+        ):
+            rows = _read_changed(db, source, columns)
+            for row_id, user_id, day, value, _ in rows:
+                key = key_of(user_id, day) if value is not None else None
+                old_key, _ = _replace_row(
+                    db, source, row_id, key, (cast(value),) if key else ()
+                )
+                if old_key is not None:
+                    stats["changed"] += 1
+                    if old_key != key and old_key not in latest:
+                        # Another row may still hold the day the row left
+                        other = db.execute(
+                            "SELECT a FROM insight_rows WHERE source = ? AND "
+                            "user_id = ? AND date = ? LIMIT 1",
+                            (source,) + old_key,
+                        ).fetchone()
+                        latest[old_key] = cast(other[0]) if other else None
+                if key is not None:
+                    latest[key] = cast(value)
+            stats["rows"] += len(rows)
+            _move_cursor(db, source, rows)
+        stats["rows"] += len(calorie_rows)
+        _move_cursor(db, "calorie_log", calorie_rows)
+
+        changes = {}
+        # Ascending (user, day) so a new day copies its predecessor's prefix sums
+        for key in sorted(deltas.keys() | weights.keys() | targets.keys()):
+            user_id, day = key
+            old = _ensure_day(db, user_id, day)
+            new = dict(old)
+            food, exercise, entries = deltas.get(key, (0, 0, 0))
+            new["food"] += food
+            new["exercise"] += exercise
+            new["entries"] += entries
+            new["weight"] = weights.get(key, old["weight"])
+            new["target"] = targets.get(key, old["target"])
+            db.execute(
+                "UPDATE insight_days SET food = ?, exercise = ?, entries = ?, "
+                "target = ?, weight = ? WHERE user_id = ? AND date = ?",
+                (new["food"], new["exercise"], new["entries"], new["target"],
+                 new["weight"], user_id, day),
+            )
+            newly_logged = int(new["entries"] > 0) - int(old["entries"] > 0)
+            if food or exercise or newly_logged:
+                # Prefix sums from this day on; only back-dated rows touch
+                # more than the newest day
+                db.execute(
+                    "UPDATE insight_days SET cum_food = cum_food + ?, cum_exercise = "
+                    "cum_exercise + ?, cum_days = cum_days + ? WHERE user_id = ? "
+                    "AND date >= ?",
+                    (food, exercise, newly_logged, user_id, day),
+                )
+            changes.setdefault(user_id, []).append((_ordinal(day), old, new))
+            stats["days"] += 1
+
+        for user_id, days in changes.items():
+            insights = load_user(db, user_id)
+            if not all(insights.apply(ordinal, old, new) for ordinal, old, new in days):
+                insights = rebuild_user(db, user_id)
+                stats["rebuilt"] += 1
+            _save_user(db, user_id, insights)
+        stats["users"] = len(changes)
+    return stats
+
+
+def reset(db):
+    with db:
+        db.execute("DELETE FROM insight_days")
+        db.execute("DELETE FROM insight_users")
+        db.execute("DELETE FROM insight_rows")
+        db.execute("DELETE FROM _insight_seq")
+
+
+def range_summary(db, user_id, start, end):
+    """Totals between two dates (inclusive) from the prefix sums."""
+
+    def prefix(day, inclusive):
+        op = "<=" if inclusive else "<"
+        return db.execute(
+            "SELECT cum_food, cum_exercise, cum_days FROM insight_days "
+            f"WHERE user_id = ? AND date {op} ? ORDER BY date DESC LIMIT 1",
+            (user_id, day),
+        ).fetchone() or (0, 0, 0)
+
+    high, low = prefix(end, True), prefix(start, False)
+    food, exercise, days = (h - lo for h, lo in zip(high, low))
+    return {
+        "start": start,
+        "end": end,
+        "days_logged": days,
+        "food": food,
+        "exercise": exercise,
+        "food_per_day": round(food / days) if days else None,
+        "net_per_day": round((food - exercise) / days) if days else None,
+    }
+
+
+def from_scratch(db):
+    """Per-(user, day) totals straight from the mirror, for `check`."""
+    days = {}
+    for user_id, day, food, exercise, entries in db.execute(
+        "SELECT user_id, substr(log_date, 1, 10), "
+        "SUM(CASE WHEN log_type = 'exercise' THEN 0 ELSE COALESCE(calories, 0) END), "
+        "SUM(CASE WHEN log_type = 'exercise' THEN COALESCE(calories, 0) ELSE 0 END), "
+        "COUNT(*) FROM calorie_log GROUP BY user_id, substr(log_date, 1, 10)"
+    ):
+        days[(user_id, day)] = dict(_EMPTY_DAY, food=food, exercise=exercise, entries=entries)
+    # Latest row per day wins, as in update()
+    for user_id, day, weight in db.execute(
+        "SELECT user_id, substr(date, 1, 10), weight FROM weight_logs "
+        "WHERE weight IS NOT NULL ORDER BY _seq"
+    ):
+        days.setdefault((user_id, day), dict(_EMPTY_DAY))["weight"] = float(weight)
+    for user_id, day, target in db.execute(
+        "SELECT user_id, substr(date, 1, 10), calorie_target FROM daily_plans "
+        "WHERE calorie_target IS NOT NULL ORDER BY _seq"
+    ):
+        days.setdefault((user_id, day), dict(_EMPTY_DAY))["target"] = int(target)
+    users = {}
+    for (user_id, day) in sorted(days):
+        insights = users.setdefault(user_id, UserInsights())
+        insights.apply(_ordinal(day), _EMPTY_DAY, days[(user_id, day)])
+    return users
+
+
+def _users(db, user_id=None):
+    if user_id:
+        return [user_id]
+    return [r[0] for r in db.execute("SELECT user_id FROM insight_users ORDER BY user_id")]
+
+
+def print_table(rows):
+    print(
+        f"{'user':<10}{'last log':>12}{'today':>7}{'kcal 7d':>9}{'net 7d':>8}"
+        f"{'def 7d':>8}{'net 30d':>9}{'def 30d':>9}{'streak':>8}{'best':>6}"
+        f"{'on tgt':>8}{'kg':>7}{'kg 7d':>7}{'Δ30d':>7}"
+    )
+
+    def show(value, spec=""):
+        return "-" if value is None else format(value, spec)
+
+    for user_id, s in rows:
+        print(
+            f"{user_id[:8]:<10}{show(s['last_log']):>12}{s['today_food']:>7}"
+            f"{show(s['food_7']):>9}{show(s['net_7']):>8}{show(s['deficit_7']):>8}"
+            f"{show(s['net_30']):>9}{show(s['deficit_30']):>9}{s['log_streak']:>8}"
+            f"{s['log_best']:>6}{s['target_streak']:>8}{show(s['weight'], '.1f'):>7}"
+            f"{show(s['weight_7'], '.1f'):>7}{show(s['weight_change_30'], '+.1f'):>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental calorie and weight insights")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("update", help="fold in rows added since the last run")
+    commands.add_parser("rebuild", help="drop the aggregates and recompute them")
+    show = commands.add_parser("show", help="per-user insights")
+    show.add_argument("--user")
+    show.add_argument("--as-of", help="report windows ending on this date")
+    show.add_argument("--json", action="store_true")
+    span = commands.add_parser("range", help="totals between two dates")
+    span.add_argument("user")
+    span.add_argument("start")
+    span.add_argument("end")
+    commands.add_parser("check", help="compare with a from-scratch recompute")
+    args = parser.parse_args()
+
+    try:
+        db = connect(args.db)
+    except sqlite3.Error as e:
+        print(f"ERROR: {args.db}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command in ("update", "rebuild"):
+        if args.command == "rebuild":
+            reset(db)
+        start = time.perf_counter()
+        stats = update(db)
+        print(
+            f"+{stats['rows']} rows ({stats['changed']} changed) -> {stats['days']} days "
+            f"for {stats['users']} users ({stats['rebuilt']} rebuilt) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return
+
+    if args.command == "range":
+        print(json.dumps(range_summary(db, args.user, args.start, args.end), indent=2))
+        return
+
+    if args.command == "show":
+        as_of = _ordinal(args.as_of) if args.as_of else None
+        rows = [(u, load_user(db, u).summary(as_of)) for u in _users(db, args.user)]
+        if args.json:
+            print(json.dumps(dict(rows), indent=2))
+        else:
+            print_table(rows)
+        return
+
+    start = time.perf_counter()
+    expected = from_scratch(db)
+    elapsed = time.perf_counter() - start
+    stored = set(_users(db))
+    mismatched = 0
+    for user_id in sorted(stored | expected.keys()):
+        want = expected.get(user_id, UserInsights()).summary()
+        got = load_user(db, user_id).summary()
+        if want != got:
+            mismatched += 1
+            diff = {k: (got.get(k), v) for k, v in want.items() if got.get(k) != v}
+            print(f"   {user_id}: {diff}")
+    print(f"{len(stored | expected.keys())} users, {mismatched} mismatched "
+          f"(from-scratch recompute {elapsed:.2f}s)")
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Concurrent load generator for the chat-agent edge function.
+
+Replays the debug_chat.py / test_phase5.py payloads either closed-loop
+(`--concurrency` workers, each sending back to back) or open-loop
+(`--rate` Poisson arrivals per second) and reports latency percentiles,
+throughput and error rate per mode.
+
+    python load_test.py --url http://127.0.0.1:8787 --concurrency 16 --requests 400
+    python load_test.py --modes validate_goal --rate 2 --duration 60
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+
+import metrics
+from async_http import post_json
+from latency_stats import summarize
+from payloads import FUNCTION_URL, PAYLOADS
+
+
+class Result:
+    __slots__ = ("mode", "latency", "ok", "error")
+
+    def __init__(self, mode, latency, ok, error=None):
+        self.mode = mode
+        self.latency = latency
+        self.ok = ok
+        self.error = error
+
+
+async def send_one(url, headers, mode, timeout):
+    payload = PAYLOADS[mode]()
+    start = time.perf_counter()
+    try:
+        resp = await post_json(url, payload, headers=headers, timeout=timeout)
+        metrics.observe_response(mode, resp, source="load_test")
+        ok = resp.status == 200
+        error = None if ok else f"HTTP {resp.status}"
+    except asyncio.TimeoutError:
+        ok, error = False, "timeout"
+    except Exception as e:
+        ok, error = False, type(e).__name__
+    return Result(mode, time.perf_counter() - start, ok, error)
+
+
+async def run_closed_loop(url, headers, modes, concurrency, total, duration, timeout):
+    results = []
+    picks = itertools.cycle(modes)
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [total]
+
+    async def worker():
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            if total is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            results.append(await send_one(url, headers, next(picks), timeout))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def run_open_loop(url, headers, modes, rate, total, duration, timeout):
+    picks = itertools.cycle(modes)
+    tasks = []
+    start = time.perf_counter()
+    next_at = start
+    while True:
+        if total is not None and len(tasks) >= total:
+            break
+        if duration and next_at - start >= duration:
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_one(url, headers, next(picks), timeout)))
+        next_at += random.expovariate(rate)
+    return await asyncio.gather(*tasks)
+
+
+def report(results, wall_time):
+    print(
+        f"\n{'mode':<18}{'reqs':>6}{'err%':>7}{'rps':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    )
+    by_mode = {}
+    for r in results:
+        by_mode.setdefault(r.mode, []).append(r)
+    rows = sorted(by_mode.items()) + [("ALL", results)]
+    for mode, rows_for_mode in rows:
+        stats = summarize([r.latency for r in rows_for_mode])
+        errors = sum(1 for r in rows_for_mode if not r.ok)
+        print(
+            f"{mode:<18}{stats['count']:>6}"
+            f"{100 * errors / max(1, stats['count']):>7.1f}"
+            f"{stats['count'] / wall_time:>8.2f}"
+            + "".join(
+                f"{stats[key] * 1000:>10.1f}" for key in ("p50", "p95", "p99", "max")
+            )
+        )
+    failures = {}
+    for r in results:
+        if r.error:
+            failures[(r.mode, r.error)] = failures.get((r.mode, r.error), 0) + 1
+    for (mode, error), count in sorted(failures.items()):
+        print(f"   {mode}: {error} x{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=os.getenv("CHAT_AGENT_URL", FUNCTION_URL))
+    parser.add_argument("--key", default=os.getenv("EXPO_PUBLIC_SUPABASE_ANON_KEY"))
+    parser.add_argument(
+        "--modes",
+        default="chat,goal_intake,validate_goal,generate_roadmap",
+        help="comma-separated subset of: " + ", ".join(PAYLOADS),
+    )
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, help="open-loop arrivals per second")
+    parser.add_argument("--requests", type=int, help="total requests to send")
+    parser.add_argument("--duration", type=float, help="seconds to keep sending")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in PAYLOADS]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+    if args.requests is None and args.duration is None:
+        args.requests = 10 * len(modes)
+
+    headers = {}
+    if args.key:
+        headers = {"apikey": args.key, "Authorization": f"Bearer {args.key}"}
+
+    if args.rate:
+        print(f"=== Open loop: {args.rate}/s against {args.url} ===")
+        runner = run_open_loop(
+            args.url, headers, modes, args.rate, args.requests, args.duration, args.timeout
+        )
+    else:
+        print(f"=== Closed loop: {args.concurrency} workers against {args.url} ===")
+        runner = run_closed_loop(
+            args.url,
+            headers,
+            modes,
+            args.concurrency,
+            args.requests,
+            args.duration,
+            args.timeout,
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(runner)
+    report(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
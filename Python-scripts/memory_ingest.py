@@ -0,0 +1,414 @@
+"""
+Batched ingestion and re-embedding for the user_memory table.
+
+The chat-agent embeds every extracted fact one request at a time, including
+facts it has embedded before. Here facts are keyed by a hash of their
+normalised text, and embeddings live in a content-addressed on-disk cache
+with one directory per embedder, model and dimension: `vectors.f32` (a
+memory-mapped float32 matrix, one row per fact) plus `keys.bin` (the 16-byte
+hash of each row, in row order). Only cache misses are sent to the embedder,
+in batches, and the resulting rows are upserted in chunks. Switching model
+therefore starts a new cache, which is what makes a backfill re-embed.
+
+    python memory_ingest.py facts.ndjson --embedder gemini
+    python memory_ingest.py facts.ndjson --embedder local --dry-run rows.ndjson
+    python memory_ingest.py --from-table --embedder gemini      # re-embed backfill
+    python memory_ingest.py --stats
+
+The local embedder is an offline stand-in and is only accepted with --dry-run.
+
+Input rows need user_id and fact_text (category is optional), as NDJSON,
+a JSON array or CSV.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import numpy as np
+
+import metrics
+from memory_search import DIM, fetch_rows
+from plan_export import rest_config
+
+DEFAULT_CACHE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "embedding_cache"
+)
+GEMINI_MODEL = "text-embedding-004"
+CATEGORIES = {"personal", "diet", "medical", "fitness", "general"}
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_fact(text):
+    """Case, width and whitespace folding, so trivially different facts match."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return _SPACES.sub(" ", text).strip().rstrip(".!")
+
+
+def fact_key(text):
+    return hashlib.blake2b(normalize_fact(text).encode("utf-8"), digest_size=16).digest()
+
+
+def cache_dir(root, embedder):
+    """Cache directory for one embedder, model and dimension."""
+    name = getattr(embedder, "name", None) or (
+        f"{type(embedder).__module__}.{type(embedder).__qualname__}"
+    )
+    dim = getattr(embedder, "dim", DIM)
+    return os.path.join(root, re.sub(r"[^\w.-]+", "_", f"{name}-{dim}"))
+
+
+class EmbeddingCache:
+    """Append-only embedding store addressed by fact_key."""
+
+    def __init__(self, path=DEFAULT_CACHE, dim=DIM):
+        self.path = path
+        self.dim = dim
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._keys_path = os.path.join(path, "keys.bin")
+        self._index = {}
+        self._matrix = None
+        os.makedirs(path, exist_ok=True)
+        rows = 0
+        if os.path.exists(self._vectors_path):
+            rows = os.path.getsize(self._vectors_path) // (4 * dim)
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                keys = f.read()
+            # Vectors are written before keys, a torn append leaves extra
+            # vector bytes that the next append overwrites
+            rows = min(rows, len(keys) // 16)
+            for row in range(rows):
+                self._index[keys[16 * row : 16 * row + 16]] = row
+        self._rows = rows
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def size_bytes(self):
+        if not os.path.exists(self._vectors_path):
+            return 0
+        return os.path.getsize(self._vectors_path) + os.path.getsize(self._keys_path)
+
+    def _map(self):
+        if self._matrix is None or len(self._matrix) != self._rows:
+            self._matrix = (
+                np.memmap(
+                    self._vectors_path, dtype=np.float32, mode="r",
+                    shape=(self._rows, self.dim),
+                )
+                if self._rows
+                else np.empty((0, self.dim), dtype=np.float32)
+            )
+        return self._matrix
+
+    def get(self, key):
+        row = self._index.get(key)
+        return None if row is None else self._map()[row]
+
+    def get_many(self, keys):
+        rows = [self._index[k] for k in keys]
+        return np.asarray(self._map()[rows])
+
+    def put_many(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(keys), self.dim):
+            raise ValueError(f"Expected {len(keys)}x{self.dim} vectors, got {vectors.shape}")
+        with open(self._vectors_path, "r+b" if self._rows else "wb") as f:
+            f.seek(self._rows * self.dim * 4)
+            f.write(vectors.tobytes())
+            f.truncate()
+        with open(self._keys_path, "r+b" if self._rows else "wb") as f:
+            f.seek(self._rows * 16)
+            f.write(b"".join(keys))
+            f.truncate()
+        for offset, key in enumerate(keys):
+            self._index[key] = self._rows + offset
+        self._rows += len(keys)
+        self._matrix = None
+
+
+class LocalEmbedder:
+    """Deterministic offline stand-in: hashed word and character trigram features.
+
+    Similar texts get similar vectors, which is enough to exercise dedupe,
+    caching and match_memory tuning without API calls.
+    """
+
+    name = "local"
+    batch_size = 1000
+
+    def __init__(self, dim=DIM):
+        self.dim = dim
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            norm = normalize_fact(text)
+            words = norm.split()
+            features = words + [norm[j : j + 3] for j in range(max(0, len(norm) - 2))]
+            for feature in features:
+                h = int.from_bytes(
+                    hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(),
+                    "little",
+                )
+                out[i, h % self.dim] += 1.0 if h & (1 << 63) else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class GeminiEmbedder:
+    """text-embedding-004 through batchEmbedContents, 100 texts per call."""
+
+    batch_size = 100
+    dim = DIM
+
+    def __init__(self, api_key=None, model=GEMINI_MODEL):
+        if api_key is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY not found in .env")
+        self.model = model
+        self.name = f"gemini-{model}"
+        self.url = (
+            "https://generativelanguage.googleapis.com/v1beta/models/"
+            f"{model}:batchEmbedContents?key={api_key}"
+        )
+
+    def embed(self, texts):
+        payload = {
+            "requests": [
+                {"model": f"models/{self.model}", "content": {"parts": [{"text": t}]}}
+                for t in texts
+            ]
+        }
+        response = metrics.post(self.url, json=payload, timeout=120, mode="embed")
+        if response.status != 200:
+            raise RuntimeError(f"Embedding failed: HTTP {response.status} {response.text[:200]}")
+        return np.array(
+            [e["values"] for e in response.json()["embeddings"]], dtype=np.float32
+        )
+
+
+EMBEDDERS = {"local": LocalEmbedder, "gemini": GeminiEmbedder}
+
+
+def load_embedder(name):
+    """A built-in embedder or `module:Class` for any object with embed(texts)."""
+    if name in EMBEDDERS:
+        return EMBEDDERS[name]()
+    module_name, _, class_name = name.partition(":")
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)()
+
+
+def read_facts(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return list(csv.DictReader(f))
+        if path.endswith((".ndjson", ".jsonl")):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def dedupe(rows):
+    """Drops repeats of the same normalised fact for the same user."""
+    seen = set()
+    unique = []
+    for row in rows:
+        marker = (str(row["user_id"]), fact_key(row["fact_text"]))
+        if marker not in seen:
+            seen.add(marker)
+            unique.append(row)
+    return unique
+
+
+def embed_rows(rows, cache, embedder, stats):
+    """Attaches `embedding` to each row, embedding cache misses in batches."""
+    keys = [fact_key(r["fact_text"]) for r in rows]
+    missing = {}
+    for key, row in zip(keys, rows):
+        if key not in cache and key not in missing:
+            missing[key] = row["fact_text"]
+    stats["cache_hits"] += len(rows) - len(missing)
+    pending = list(missing.items())
+    for start in range(0, len(pending), embedder.batch_size):
+        batch = pending[start : start + embedder.batch_size]
+        vectors = embedder.embed([text for _, text in batch])
+        cache.put_many([key for key, _ in batch], vectors)
+        stats["embedded"] += len(batch)
+        stats["embed_calls"] += 1
+    vectors = cache.get_many(keys)
+    for row, vector in zip(rows, vectors):
+        row["embedding"] = vector
+    return rows
+
+
+def _vector_literal(vector):
+    # pgvector text input, 7 significant digits is float32 precision
+    return "[" + ",".join("%.7g" % v for v in vector) + "]"
+
+
+def upsert_payload(row):
+    payload = {
+        "user_id": row["user_id"],
+        "fact_text": row["fact_text"],
+        "category": row.get("category") if row.get("category") in CATEGORIES else "general",
+        "embedding": _vector_literal(row["embedding"]),
+    }
+    if row.get("id"):
+        payload["id"] = row["id"]
+    return payload
+
+
+def upsert(rows, base_url, headers, chunk_size, stats):
+    """POSTs rows in chunks; rows with an id update in place."""
+    url = f"{base_url}/rest/v1/user_memory?on_conflict=id"
+    merged = dict(headers)
+    merged["Prefer"] = "resolution=merge-duplicates,return=minimal"
+    for start in range(0, len(rows), chunk_size):
+        chunk = [upsert_payload(r) for r in rows[start : start + chunk_size]]
+        # PostgREST bulk inserts need the same keys on every object
+        with_id = [p for p in chunk if "id" in p]
+        without_id = [p for p in chunk if "id" not in p]
+        for part in (with_id, without_id):
+            if not part:
+                continue
+            response = metrics.post(
+                url, headers=merged, json=part, timeout=120, mode="rest:user_memory"
+            )
+            if response.status not in (200, 201, 204):
+                raise RuntimeError(
+                    f"Upsert failed at row {start}: HTTP {response.status} "
+                    f"{response.text[:200]}"
+                )
+            stats["upserted"] += len(part)
+            stats["upsert_calls"] += 1
+
+
+def existing_keys(base_url, headers, user_ids, page_size=1000):
+    """(user_id, fact_key) pairs already stored for these users."""
+    keys = set()
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), 50):
+        users = ",".join(user_ids[start : start + 50])
+        offset = 0
+        while True:
+            url = (
+                f"{base_url}/rest/v1/user_memory?select=user_id,fact_text"
+                f"&user_id=in.({users})&order=id&limit={page_size}&offset={offset}"
+            )
+            response = metrics.get(url, headers, timeout=60, mode="rest:user_memory")
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status} {response.text[:200]}")
+            page = response.json()
+            keys.update((str(r["user_id"]), fact_key(r["fact_text"])) for r in page)
+            offset += len(page)
+            if len(page) < page_size:
+                break
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched user_memory ingestion")
+    parser.add_argument("facts", nargs="?", help="NDJSON, JSON or CSV of new facts")
+    parser.add_argument(
+        "--from-table", action="store_true", help="re-embed rows already in user_memory"
+    )
+    parser.add_argument(
+        "--missing-only", action="store_true", help="with --from-table: rows lacking an embedding"
+    )
+    parser.add_argument(
+        "--embedder", help="gemini, module:Class, or local (offline, --dry-run only)"
+    )
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="root of the per-model caches")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per upsert")
+    parser.add_argument("--dry-run", metavar="PATH", help="write upsert rows as NDJSON")
+    parser.add_argument("--stats", action="store_true", help="show cache size and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        names = sorted(os.listdir(args.cache)) if os.path.isdir(args.cache) else []
+        for name in names:
+            path = os.path.join(args.cache, name)
+            if not os.path.isdir(path):
+                continue
+            dim = int(name.rsplit("-", 1)[-1]) if name.rsplit("-", 1)[-1].isdigit() else DIM
+            cache = EmbeddingCache(path, dim)
+            print(f"{name}: {len(cache)} cached embeddings, {cache.size_bytes() / 1e6:.1f} MB")
+        if not names:
+            print(f"No cached embeddings in {args.cache}")
+        return
+    if not args.facts and not args.from_table:
+        parser.error("give a facts file or --from-table")
+    if not args.embedder:
+        parser.error("--embedder is required")
+    if args.embedder == "local" and not args.dry_run:
+        parser.error("the local embedder is a stand-in, use it with --dry-run only")
+
+    base_url, headers = (None, None) if args.dry_run else rest_config()
+    if not args.dry_run and not base_url:
+        print("ERROR: EXPO_PUBLIC_SUPABASE_URL not found in .env")
+        sys.exit(1)
+    start = time.perf_counter()
+    stats = dict.fromkeys(
+        ("input", "duplicates", "cache_hits", "embedded", "embed_calls",
+         "upserted", "upsert_calls"),
+        0,
+    )
+    if args.from_table:
+        rows = fetch_rows()
+        if args.missing_only:
+            rows = [r for r in rows if r.get("embedding") is None]
+        stats["input"] = len(rows)
+    else:
+        rows = read_facts(args.facts)
+        stats["input"] = len(rows)
+        rows = dedupe(rows)
+        if not args.dry_run:
+            stored = existing_keys(
+                base_url, headers, [str(r["user_id"]) for r in rows]
+            )
+            rows = [
+                r for r in rows
+                if (str(r["user_id"]), fact_key(r["fact_text"])) not in stored
+            ]
+        stats["duplicates"] = stats["input"] - len(rows)
+
+    embedder = load_embedder(args.embedder)
+    cache = EmbeddingCache(cache_dir(args.cache, embedder), getattr(embedder, "dim", DIM))
+    embed_rows(rows, cache, embedder, stats)
+
+    if args.dry_run:
+        with open(args.dry_run, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(upsert_payload(row), ensure_ascii=False) + "\n")
+        stats["upserted"] = len(rows)
+    else:
+        upsert(rows, base_url, headers, args.chunk_size, stats)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{stats['input']} facts | {stats['duplicates']} duplicates | "
+        f"{stats['cache_hits']} cache hits | {stats['embedded']} embedded in "
+        f"{stats['embed_calls']} calls | {stats['upserted']} upserted in "
+        f"{stats['upsert_calls']} calls | {elapsed:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
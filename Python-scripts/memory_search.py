@@ -0,0 +1,381 @@
+"""
+Offline re-implementation of the match_memory RPC for tuning retrieval.
+
+user_memory rows are loaded into one contiguous, L2-normalised float32
+matrix grouped by user, so cosine similarity is a single matrix product.
+Exact search answers many queries per call with the same semantics as the
+SQL function (similarity > match_threshold, best match_count first). An IVF
+index (k-means coarse quantiser) gives approximate search, and the report
+shows recall against exact search versus per-query latency.
+
+Queries are facts held out of the bank, so their neighbours sit at the
+bank's real inter-fact distances instead of being near-copies of a stored
+vector. IVF scores every probed list against all the queries probing it in
+one matrix product.
+
+    python memory_search.py --synthetic 50000 --users 500 --queries 200
+    python memory_search.py --rows user_memory.ndjson --threshold 0.5 --count 5
+    python memory_search.py --fetch --queries 100
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+DIM = 768  # Gemini text-embedding-004
+
+
+def parse_embedding(value):
+    # PostgREST returns pgvector columns as "[0.1,0.2,...]" strings
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def load_rows(path):
+    """Reads exported user_memory rows from a JSON array or NDJSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".ndjson") or path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def fetch_rows(page_size=1000, key=None):
+    """Pages user_memory out of Supabase (needs a key that bypasses RLS)."""
+    import metrics
+    from plan_export import rest_config
+
+    url, headers = rest_config(key)
+    if not url:
+        raise RuntimeError("EXPO_PUBLIC_SUPABASE_URL not found in .env")
+    rows = []
+    while True:
+        response = metrics.get(
+            f"{url}/rest/v1/user_memory?select=id,user_id,fact_text,category,embedding"
+            f"&order=id&limit={page_size}&offset={len(rows)}",
+            headers,
+            timeout=60,
+            mode="rest:user_memory",
+        )
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status} {response.text[:200]}")
+        page = response.json()
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+def synthetic_rows(count, users, dim=DIM, topics=64, seed=0):
+    """Clustered random embeddings standing in for a memory bank of `count` facts.
+
+    Each user's facts come from a few broad topics of their own, and within
+    a topic from one of several subtopics, so similarities are graded
+    instead of all-or-nothing.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    per_topic = max(1, count // (10 * topics))
+    sub_centres = np.repeat(centres, per_topic, axis=0) + rng.standard_normal(
+        (topics * per_topic, dim)
+    ).astype(np.float32)
+    user = rng.integers(0, users, count)
+    user_topics = rng.integers(0, topics, (users, 4))
+    topic = user_topics[user, rng.integers(0, 4, count)]
+    sub = topic * per_topic + rng.integers(0, per_topic, count)
+    vectors = sub_centres[sub] + 0.8 * rng.standard_normal((count, dim)).astype(
+        np.float32
+    )
+    return [
+        {
+            "id": str(i),
+            "user_id": f"user-{user[i]}",
+            "fact_text": f"fact {i} (topic {topic[i]})",
+            "category": "general",
+            "embedding": vectors[i],
+        }
+        for i in range(count)
+    ]
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k best scores per row, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.intp)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, part, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
+
+
+class MemoryIndex:
+    def __init__(self, rows, dim=DIM):
+        rows = [r for r in rows if r.get("embedding") is not None]
+        rows.sort(key=lambda r: str(r["user_id"]))
+        self.ids = [r["id"] for r in rows]
+        self.texts = [r.get("fact_text") for r in rows]
+        self.categories = [r.get("category", "general") for r in rows]
+        matrix = np.empty((len(rows), dim), dtype=np.float32)
+        for i, r in enumerate(rows):
+            matrix[i] = parse_embedding(r["embedding"])
+        self.matrix = np.ascontiguousarray(_normalize(matrix))
+
+        # Rows are grouped by user, so each memory bank is one slice
+        self.user_slices = {}
+        users = [str(r["user_id"]) for r in rows]
+        start = 0
+        for i in range(1, len(users) + 1):
+            if i == len(users) or users[i] != users[start]:
+                self.user_slices[users[start]] = slice(start, i)
+                start = i
+        self.user_codes = np.empty(len(rows), dtype=np.int32)
+        self.user_names = list(self.user_slices)
+        self.user_lookup = {name: code for code, name in enumerate(self.user_names)}
+        for code, name in enumerate(self.user_names):
+            self.user_codes[self.user_slices[name]] = code
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match(self, queries, user_id=None, threshold=0.5, count=5):
+        """Exact batched match_memory.
+
+        Returns (indices, similarities) arrays of shape (len(queries), count).
+        Slots that don't clear the threshold hold index -1 and NaN.
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if user_id is None:
+            base, bank = 0, self.matrix
+        else:
+            part = self.user_slices.get(str(user_id), slice(0, 0))
+            base, bank = part.start, self.matrix[part]
+        scores = queries @ bank.T
+        best = _top_k(scores, count)
+        sims = np.take_along_axis(scores, best, axis=1)
+        indices = best + base
+        return _pad(indices, sims, threshold, count)
+
+
+def _pad(indices, sims, threshold, count):
+    out_idx = np.full((indices.shape[0], count), -1, dtype=np.intp)
+    out_sim = np.full((indices.shape[0], count), np.nan, dtype=np.float32)
+    width = indices.shape[1]
+    keep = sims > threshold
+    out_idx[:, :width] = np.where(keep, indices, -1)
+    out_sim[:, :width] = np.where(keep, sims, np.nan)
+    return out_idx, out_sim
+
+
+class IvfIndex:
+    """Inverted-file index over a MemoryIndex matrix."""
+
+    def __init__(self, memory, lists=100, iterations=10, seed=0, sample=50000):
+        self.memory = memory
+        matrix = memory.matrix
+        rng = np.random.default_rng(seed)
+        lists = max(1, min(lists, len(matrix)))
+        train = matrix
+        if len(matrix) > sample:
+            train = matrix[rng.choice(len(matrix), sample, replace=False)]
+        centroids = train[rng.choice(len(train), lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            for c in range(lists):
+                members = train[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        self.centroids = centroids
+
+        # CSR layout: rows of list c are order[offsets[c]:offsets[c + 1]],
+        # grouped by user inside each list so a memory bank is one sub-slice
+        assign = np.argmax(matrix @ centroids.T, axis=1)
+        self.order = np.lexsort((memory.user_codes, assign))
+        self.offsets = np.searchsorted(assign[self.order], np.arange(lists + 1))
+        self.order_users = memory.user_codes[self.order]
+
+    def _members(self, c, user_code):
+        lo, hi = self.offsets[c], self.offsets[c + 1]
+        if user_code is not None:
+            users = self.order_users[lo:hi]
+            lo, hi = lo + np.searchsorted(users, user_code), lo + np.searchsorted(
+                users, user_code, side="right"
+            )
+        return self.order[lo:hi]
+
+    def match(self, queries, user_id=None, threshold=0.5, count=5, nprobe=8):
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        user_code = None
+        if user_id is not None:
+            if str(user_id) not in self.memory.user_slices:
+                return _pad(
+                    np.empty((len(queries), 0), dtype=np.intp),
+                    np.empty((len(queries), 0), dtype=np.float32),
+                    threshold,
+                    count,
+                )
+            user_code = self.memory.user_lookup[str(user_id)]
+        probes = _top_k(queries @ self.centroids.T, nprobe)
+        best_idx = np.full((len(queries), count), -1, dtype=np.intp)
+        best_sim = np.full((len(queries), count), -np.inf, dtype=np.float32)
+        # List-major: one product per probed list, merged into a running top-k
+        for c in np.unique(probes):
+            members = self._members(c, user_code)
+            if not len(members):
+                continue
+            qs = np.flatnonzero((probes == c).any(axis=1))
+            scores = queries[qs] @ self.memory.matrix[members].T
+            sims = np.concatenate([best_sim[qs], scores], axis=1)
+            idx = np.concatenate(
+                [best_idx[qs], np.broadcast_to(members, scores.shape)], axis=1
+            )
+            top = _top_k(sims, count)
+            best_sim[qs] = np.take_along_axis(sims, top, axis=1)
+            best_idx[qs] = np.take_along_axis(idx, top, axis=1)
+        best_sim[best_idx < 0] = np.nan
+        return _pad(best_idx, best_sim, threshold, count)
+
+
+def hold_out(rows, count, seed=1):
+    """Splits up to `count` facts off the bank as queries, tagged with their owner.
+
+    Every user keeps at least one fact, so per-user searches have a bank.
+    Returns (bank rows, query matrix, users).
+    """
+    rng = np.random.default_rng(seed)
+    rows = [r for r in rows if r.get("embedding") is not None]
+    by_user = {}
+    for i, r in enumerate(rows):
+        by_user.setdefault(str(r["user_id"]), []).append(i)
+    eligible = [i for indices in by_user.values() for i in indices[1:]]
+    picks = sorted(
+        rng.choice(eligible, min(count, len(eligible)), replace=False).tolist()
+    )
+    queries = np.array(
+        [parse_embedding(rows[i]["embedding"]) for i in picks], dtype=np.float32
+    ).reshape(len(picks), -1)
+    users = [str(rows[i]["user_id"]) for i in picks]
+    held = set(picks)
+    return [r for i, r in enumerate(rows) if i not in held], queries, users
+
+
+def recall(approx, exact):
+    hits = total = 0
+    for a, e in zip(approx, exact):
+        truth = set(e[e >= 0].tolist())
+        total += len(truth)
+        hits += len(truth.intersection(a[a >= 0].tolist()))
+    return hits / total if total else 1.0
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_queries(index, queries, users, **options):
+    """One batched match_memory call per user, or a global call without users."""
+    if users is None:
+        return index.match(queries, None, **options)
+    count = options.get("count", 5)
+    out_idx = np.full((len(queries), count), -1, dtype=np.intp)
+    out_sim = np.full((len(queries), count), np.nan, dtype=np.float32)
+    by_user = {}
+    for q, user in enumerate(users):
+        by_user.setdefault(user, []).append(q)
+    for user, qs in by_user.items():
+        out_idx[qs], out_sim[qs] = index.match(queries[qs], user, **options)
+    return out_idx, out_sim
+
+
+def report(memory, queries, users, threshold, count, lists):
+    print(f"Memory bank: {len(memory)} facts across {len(memory.user_slices)} users")
+    print(
+        f"Queries: {len(queries)} | match_threshold {threshold} | match_count {count}"
+    )
+
+    # Unthresholded top-k, so the sweep below can apply any cut-off
+    (best, sims), elapsed = _timed(
+        lambda: run_queries(memory, queries, users, threshold=-np.inf, count=count)
+    )
+    sims = np.nan_to_num(sims, nan=-np.inf)
+    exact = np.where(sims > threshold, best, -1)
+    returned = np.sum(exact >= 0, axis=1)
+    print(
+        f"\nExact: {1e6 * elapsed / len(queries):.1f} us/query, "
+        f"{returned.mean():.2f} results/query on average"
+    )
+
+    print("\nThreshold sweep (results returned per query):")
+    for t in (0.3, 0.4, 0.5, 0.6, 0.7, 0.8):
+        passed = np.sum(sims > t, axis=1)
+        print(
+            f"   > {t:.1f}: mean {passed.mean():.2f} | "
+            f"empty {100 * np.mean(passed == 0):.1f}%"
+        )
+
+    ivf, build = _timed(lambda: IvfIndex(memory, lists=lists))
+    print(f"\nIVF ({len(ivf.centroids)} lists) built in {build:.2f}s")
+    # recall@k against the exact top-k; the thresholded column only counts
+    # matches above match_threshold, which is what the RPC would return
+    print(f"   {'nprobe':>6}{'recall@k':>10}{f'>{threshold:g}':>9}{'us/query':>11}")
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        if nprobe > len(ivf.centroids):
+            break
+        (approx, approx_sims), elapsed = _timed(
+            lambda: run_queries(
+                ivf, queries, users, threshold=-np.inf, count=count, nprobe=nprobe
+            )
+        )
+        above = np.where(np.nan_to_num(approx_sims, nan=-np.inf) > threshold, approx, -1)
+        print(
+            f"   {nprobe:>6}{recall(approx, best):>10.3f}{recall(above, exact):>9.3f}"
+            f"{1e6 * elapsed / len(queries):>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline match_memory benchmarks")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--rows", help="exported user_memory rows (.json/.ndjson)")
+    source.add_argument("--fetch", action="store_true", help="page rows from Supabase")
+    source.add_argument("--synthetic", type=int, metavar="N", help="N random facts")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--count", type=int, default=5)
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument(
+        "--global",
+        dest="global_search",
+        action="store_true",
+        help="search all users at once instead of per-user banks",
+    )
+    args = parser.parse_args()
+
+    if args.rows:
+        rows = load_rows(args.rows)
+    elif args.fetch:
+        rows = fetch_rows()
+    else:
+        rows = synthetic_rows(args.synthetic, args.users)
+    rows, queries, users = hold_out(rows, args.queries)
+    memory = MemoryIndex(rows)
+    if not len(queries):
+        print("Need users with at least two embedded facts to hold queries out.")
+        return
+    if args.global_search:
+        users = None
+    report(memory, queries, users, args.threshold, args.count, args.lists)
+
+
+if __name__ == "__main__":
+    main()
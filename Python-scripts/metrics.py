@@ -0,0 +1,297 @@
+"""
+Phase timings for the chat-agent clients.
+
+Every request made through `post`/`get` (and through cassette.post, which
+uses them) gets a Trace that splits its wall time into phases:
+
+    build -> dns -> connect -> tls -> send -> server -> download -> decode -> validate
+
+`build` is payload serialisation, `server` is request sent to first response
+byte, `decode` and `validate` are recorded by `decode_and_validate`. Traces
+are tagged with the chat-agent `mode` and exported when the script exits:
+
+    VQ_METRICS=client.jsonl        append one JSON line per request ("-" prints)
+    VQ_METRICS_PROM=client.prom    write Prometheus text (node_exporter textfile)
+
+    VQ_METRICS=client.jsonl python test_phase5.py
+
+Traces are only kept while one of the exporters is configured, and then at
+most 2 * FLUSH_EVERY of them: older ones are appended to the JSONL file and
+folded into the Prometheus histograms as the run goes, so long load tests
+stay in bounded memory.
+
+`post` and `get` are blocking and run their own event loop; they raise
+RuntimeError when called from a running loop, where async code should await
+async_http.request and call `observe_response` instead.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from async_http import request
+from payloads import mode_name
+from response_schema import VALIDATORS, SchemaError, parse_response
+
+PHASES = (
+    "build",
+    "dns",
+    "connect",
+    "tls",
+    "send",
+    "server",
+    "download",
+    "decode",
+    "validate",
+)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+FLUSH_EVERY = 1000
+
+# Traces not exported yet, oldest first; late spans (decode, validate) can
+# still land on the newest ones
+_traces = []
+# Histograms and request counts of the traces already exported
+_series = {}
+_requests_total = {}
+
+
+def _exporting():
+    return bool(os.getenv("VQ_METRICS") or os.getenv("VQ_METRICS_PROM"))
+
+
+class Trace:
+    def __init__(self, mode, **tags):
+        self.mode = mode or "chat"
+        self.tags = tags
+        self.spans = {}
+        self.status = None
+        self.started = time.time()
+        if _exporting():
+            _traces.append(self)
+            if len(_traces) >= 2 * FLUSH_EVERY:
+                _flush(FLUSH_EVERY)
+
+    @contextmanager
+    def span(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+    def add(self, phase, seconds):
+        self.spans[phase] = self.spans.get(phase, 0.0) + seconds
+
+    def add_http(self, timings):
+        """Adds the phases of an async_http response's `timings`."""
+        previous = 0.0
+        for key, phase in (
+            ("dns", "dns"),
+            ("connect", "connect"),
+            ("tls", "tls"),
+            ("sent", "send"),
+            ("first_byte", "server"),
+            ("last_byte", "download"),
+        ):
+            if key in timings:
+                self.add(phase, timings[key] - previous)
+                previous = timings[key]
+
+    def describe(self):
+        """One line per-phase breakdown in milliseconds."""
+        order = [p for p in PHASES if p in self.spans]
+        order += [p for p in self.spans if p not in PHASES]
+        return " | ".join(f"{p} {1000 * self.spans[p]:.1f}" for p in order) + " ms"
+
+    @property
+    def total(self):
+        return sum(self.spans.values())
+
+    def as_dict(self):
+        return {
+            "ts": round(self.started, 3),
+            "mode": self.mode,
+            "status": self.status,
+            **self.tags,
+            "total": round(self.total, 6),
+            "spans": {p: round(s, 6) for p, s in self.spans.items()},
+        }
+
+
+def traces():
+    """Traces recorded but not exported yet."""
+    return list(_traces)
+
+
+def observe_response(mode, response, build=None, **tags):
+    """Records a Trace for a response from async_http (load/batch tooling)."""
+    trace = Trace(mode, **tags)
+    if build is not None:
+        trace.add("build", build)
+    trace.add_http(response.timings)
+    trace.status = response.status
+    response.trace = trace
+    return trace
+
+
+def _send(method, url, headers, payload, timeout, mode, tags):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError(
+            f"metrics.{method.lower()}() blocks and cannot run inside an event loop; "
+            "await async_http.request and use observe_response instead"
+        )
+    trace = Trace(mode, **tags)
+    merged = dict(headers or {})
+    body = None
+    if payload is not None:
+        with trace.span("build"):
+            body = json.dumps(payload).encode("utf-8")
+        merged.setdefault("Content-Type", "application/json")
+    try:
+        response = asyncio.run(request(method, url, merged, body, timeout))
+    except BaseException as e:
+        trace.status = type(e).__name__
+        raise
+    trace.add_http(response.timings)
+    trace.status = response.status
+    response.trace = trace
+    return response
+
+
+def post(url, headers=None, json=None, timeout=None, mode=None, **tags):
+    """Blocking, traced `requests.post(url, headers=..., json=...)` stand-in."""
+    payload = {} if json is None else json
+    return _send("POST", url, headers, payload, timeout, mode or mode_name(payload), tags)
+
+
+def get(url, headers=None, timeout=None, mode="rest", **tags):
+    return _send("GET", url, headers, None, timeout, mode, tags)
+
+
+def decode_and_validate(response, mode):
+    """Decodes a chat-agent response and checks it against the mode's schema.
+
+    Returns (document, errors); both steps are timed on the response's
+    trace. The document is None when the body is not JSON (a proxy or HTML
+    error page), has no `text` field (an `{"error": ...}` body) or `text` is
+    not valid JSON.
+    """
+    trace = getattr(response, "trace", None) or Trace(mode)
+    with trace.span("decode"):
+        try:
+            body = response.json()
+        except ValueError as e:
+            return None, [SchemaError("", f"response body is not JSON: {e}")]
+        if not isinstance(body, dict) or not isinstance(body.get("text"), str):
+            return None, [SchemaError("text", "no 'text' field in response")]
+        try:
+            doc = parse_response(body)
+        except ValueError as e:
+            return None, [SchemaError("text", f"invalid JSON: {e}")]
+    with trace.span("validate"):
+        errors = VALIDATORS[mode].errors(doc)
+    return doc, errors
+
+
+def _histograms(trace_list, series=None):
+    series = {} if series is None else series
+    for trace in trace_list:
+        for phase, seconds in trace.spans.items():
+            entry = series.setdefault(
+                (trace.mode, phase), [[0] * len(BUCKETS), 0.0, 0]
+            )
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry[0][i] += 1
+            entry[1] += seconds
+            entry[2] += 1
+    return series
+
+
+def _request_counts(trace_list, counts=None):
+    counts = {} if counts is None else counts
+    for trace in trace_list:
+        key = (trace.mode, str(trace.status))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(trace_list=None):
+    """Prometheus text for trace_list, or for every trace of this run."""
+    if trace_list is None:
+        series = {k: [list(v[0]), v[1], v[2]] for k, v in _series.items()}
+        series = _histograms(_traces, series)
+        requests_total = _request_counts(_traces, dict(_requests_total))
+    else:
+        series = _histograms(trace_list)
+        requests_total = _request_counts(trace_list)
+    lines = [
+        "# HELP vq_client_phase_seconds Time per request phase in the chat-agent clients.",
+        "# TYPE vq_client_phase_seconds histogram",
+    ]
+    order = {phase: i for i, phase in enumerate(PHASES)}
+    for mode, phase in sorted(series, key=lambda k: (k[0], order.get(k[1], 99), k[1])):
+        buckets, total, count = series[(mode, phase)]
+        name = "vq_client_phase_seconds"
+        for bound, cumulative in zip(BUCKETS, buckets):
+            labels = _labels(mode=mode, phase=phase, le=f"{bound:g}")
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        lines.append(f'{name}_bucket{_labels(mode=mode, phase=phase, le="+Inf")} {count}')
+        lines.append(f"{name}_sum{_labels(mode=mode, phase=phase)} {total:.6f}")
+        lines.append(f"{name}_count{_labels(mode=mode, phase=phase)} {count}")
+
+    lines.append("# HELP vq_client_requests_total Requests by mode and outcome.")
+    lines.append("# TYPE vq_client_requests_total counter")
+    for (mode, status), count in sorted(requests_total.items()):
+        lines.append(f"vq_client_requests_total{_labels(mode=mode, status=status)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_jsonl(path, trace_list=None):
+    trace_list = _traces if trace_list is None else trace_list
+    lines = "".join(json.dumps(t.as_dict()) + "\n" for t in trace_list)
+    if path == "-":
+        sys.stdout.write(lines)
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+
+
+def write_prometheus(path, trace_list=None):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(trace_list))
+    os.replace(temp_path, path)
+
+
+def _flush(count):
+    """Exports the oldest `count` traces and drops them from memory."""
+    batch = _traces[:count]
+    del _traces[:count]
+    if os.getenv("VQ_METRICS"):
+        write_jsonl(os.environ["VQ_METRICS"], batch)
+    _histograms(batch, _series)
+    _request_counts(batch, _requests_total)
+
+
+@atexit.register
+def _export():
+    if not _traces and not _series:
+        return
+    _flush(len(_traces))
+    if os.getenv("VQ_METRICS_PROM"):
+        write_prometheus(os.environ["VQ_METRICS_PROM"])
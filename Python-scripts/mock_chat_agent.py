@@ -0,0 +1,375 @@
+"""
+Local stand-in for the chat-agent edge function.
+
+Speaks the same request/response contract as
+supabase/functions/chat-agent/index.ts for every mode (title ->
+{"title"}, generate_summary -> {"summary"}, everything else -> {"text"},
+JSON modes carrying a JSON string) and answers with templated content
+shaped like real captures. Each mode has a log-normal latency model and the
+body can be trickled out at a fixed bandwidth, so load tests, cassettes and
+client benchmarks get realistic timing without Gemini calls.
+
+generate_roadmap answers in the shape the prompt asks for (`weekly_plans`
+plus `day_1_tasks`, as goalsStore.ts reads it); `--roadmap-shape capture`
+switches to the full `weeks[].days[]` roadmap found in older captures.
+
+    python mock_chat_agent.py --port 8787 --latency-scale 0.05
+    python mock_chat_agent.py --roadmap-shape capture --size-scale 4
+    python load_test.py --url http://127.0.0.1:8787 --concurrency 32 --requests 500
+
+Latency, error rate and payload size can be overridden per mode with
+--config, a JSON file such as
+    {"generate_roadmap": {"median": 30, "sigma": 0.4, "error_rate": 0.05,
+                          "shape": "capture"},
+     "chat": {"reply_words": 400, "per_kb": 0.05},
+     "analyze_meal": {"size": 10}}
+where `size` multiplies the generated text of that mode (--size-scale sets
+it for every mode).
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import random
+import time
+
+# Medians (seconds) and spread roughly as observed against gemini-2.5-flash
+# per_kb adds seconds per KB of request body, for history-carrying modes
+MODES = {
+    "chat": {"median": 2.5, "sigma": 0.5, "reply_words": 120, "per_kb": 0.03},
+    "title": {"median": 0.6, "sigma": 0.3},
+    "generate_summary": {"median": 1.2, "sigma": 0.3, "per_kb": 0.01},
+    "goal_intake": {"median": 2.0, "sigma": 0.4, "reply_words": 40, "per_kb": 0.03},
+    # Scaled by the number of weeks requested, relative to 8
+    "generate_roadmap": {"median": 25.0, "sigma": 0.45, "per_week": True},
+    "generate_daily_tasks": {"median": 6.0, "sigma": 0.4},
+    "validate_goal": {"median": 1.5, "sigma": 0.3},
+    "analyze_meal": {"median": 3.0, "sigma": 0.4},
+    "meal_suggest": {"median": 2.5, "sigma": 0.4},
+    "ingredient_suggest": {"median": 2.5, "sigma": 0.4},
+    "plan": {"median": 3.0, "sigma": 0.4},
+}
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
+}
+_WORDS = (
+    "protein hydration steady progress walk strength sleep fibre portion "
+    "consistency recovery vegetables balance energy routine mindful"
+).split()
+_MEALS = (
+    ("breakfast", "08:00", "Oats with skim milk, berries and a scoop of whey", 0.24),
+    ("lunch", "13:00", "Grilled chicken with brown rice and vegetable stir-fry", 0.32),
+    ("snack", "16:30", "Greek yogurt with a handful of almonds", 0.12),
+    ("dinner", "19:30", "Steamed fish with dal and sauteed greens", 0.32),
+)
+SHAPES = ("prompt", "capture")
+
+
+def _words(rng, count, size=1.0):
+    count = max(1, round(count * size))
+    return " ".join(rng.choice(_WORDS) for _ in range(count)).capitalize() + "."
+
+
+def _number(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _meal(meal_type, time_slot, description, share, calories):
+    kcal = round(calories * share)
+    return {
+        "meal_type": meal_type,
+        "time": time_slot,
+        "description": description,
+        "calories": kcal,
+        "protein": round(kcal * 0.3 / 4),
+        "carbs": round(kcal * 0.45 / 4),
+        "fat": round(kcal * 0.25 / 9),
+    }
+
+
+def _day_meals(calories):
+    return [_meal(*m, calories) for m in _MEALS]
+
+
+def _workout(rng, size, rest=False):
+    return {
+        "time": "N/A" if rest else "18:00",
+        "description": "Rest day" if rest else _words(rng, 12, size),
+        "duration": "0 min" if rest else "30 min",
+        "calories_burned": 0 if rest else 250,
+    }
+
+
+def roadmap(context, rng, shape="prompt", size=1.0):
+    weight = _number(context.get("weight"), 80)
+    target = _number(context.get("target_weight"), weight - 5)
+    weeks = max(1, int(_number(context.get("duration_weeks"), 8)))
+    calories = round(weight * 24 * 1.4 - (500 if target < weight else -300))
+    plan = {
+        "goal_summary": _words(rng, 55, size),
+        "daily_calorie_target": calories,
+        "daily_water_target": int(min(4000, max(2000, weight * 35))),
+        "macros": {
+            "protein": round(calories * 0.3 / 4),
+            "carbs": round(calories * 0.45 / 4),
+            "fat": round(calories * 0.25 / 9),
+        },
+    }
+    if shape == "prompt":
+        plan["weekly_plans"] = [
+            {
+                "week": w,
+                "focus": _words(rng, 10, size),
+                "calorie_target": calories,
+                "ai_tips": _words(rng, 25, size),
+            }
+            for w in range(1, weeks + 1)
+        ]
+        plan["day_1_tasks"] = {
+            "meals": _day_meals(calories),
+            "workouts": [_workout(rng, size)],
+        }
+        return plan
+    start = datetime.date.today() + datetime.timedelta(days=1)
+    plan_weeks = []
+    for w in range(1, weeks + 1):
+        days = []
+        for d in range(1, 8):
+            number = (w - 1) * 7 + d
+            days.append(
+                {
+                    "day_number": number,
+                    "date": (start + datetime.timedelta(days=number - 1)).isoformat(),
+                    "meals": _day_meals(calories),
+                    "workout": {
+                        "time": "N/A" if d == 7 else "18:00",
+                        "description": "Rest day" if d == 7 else _words(rng, 12, size),
+                        "calories_burn": 0 if d == 7 else 300,
+                    },
+                }
+            )
+        plan_weeks.append(
+            {"week_number": w, "focus": _words(rng, 10, size), "days": days}
+        )
+    plan["weeks"] = plan_weeks
+    return plan
+
+
+def validate_goal(context):
+    weight = _number(context.get("weight"), 80)
+    target = _number(context.get("targetValue"), weight)
+    weeks = _number(context.get("durationWeeks"), 8)
+    rate = abs(weight - target) / max(weeks, 1)
+    limit = 1.0 if target < weight else 0.5
+    realistic = weeks >= 2 and rate <= limit
+    return {
+        "is_realistic": realistic,
+        "reason": (
+            f"{rate:.2f} kg per week is within the safe range."
+            if realistic
+            else f"{rate:.2f} kg per week is faster than the safe {limit} kg."
+        ),
+        "suggested_timeline_weeks": None
+        if realistic
+        else max(2, math.ceil(abs(weight - target) / limit)),
+        "rate_per_week": round(rate, 2),
+    }
+
+
+def _suggestion(rng, context, size):
+    calories = int(_number(context.get("remainingCalories"), 500) * 0.8) or 400
+    meal = _meal("x", "", "", 1.0, calories)
+    return {
+        "suggestion": "Grilled paneer wrap",
+        "description": _words(rng, 20, size),
+        "calories": meal["calories"],
+        "protein": meal["protein"],
+        "carbs": meal["carbs"],
+        "fat": meal["fat"],
+        "notes": _words(rng, 15, size),
+    }
+
+
+def respond(mode, body, settings, rng):
+    """The response document for one request, as the edge function builds it."""
+    context = body.get("context") or {}
+    size = settings.get("size", 1.0)
+    if mode == "title":
+        return {"title": "Weight Loss Goals"}
+    if mode == "generate_summary":
+        return {"summary": _words(rng, 35, size)}
+    if mode == "generate_roadmap":
+        text = roadmap(context, rng, settings.get("shape", "prompt"), size)
+    elif mode == "validate_goal":
+        text = validate_goal(context)
+    elif mode == "generate_daily_tasks":
+        calories = _number(context.get("calorieTarget"), 1900)
+        text = {
+            "meals": _day_meals(calories),
+            "workouts": [_workout(rng, size)],
+        }
+    elif mode == "analyze_meal":
+        meal = _meal("x", "", "", 1.0, rng.randint(250, 750))
+        text = {
+            "detected_food": "Rice with dal and mixed vegetable curry",
+            **{k: meal[k] for k in ("calories", "protein", "carbs", "fat")},
+            "confidence": rng.choice(("high", "medium", "low")),
+            "notes": _words(rng, 15, size),
+        }
+    elif mode in ("meal_suggest", "ingredient_suggest"):
+        text = _suggestion(rng, context, size)
+    elif mode == "plan":
+        text = {
+            "summary": _words(rng, 12, size),
+            "tasks": [
+                {"description": _words(rng, 5, size), "xp_reward": 10, "task_type": t}
+                for t in ("workout", "nutrition", "mindfulness")
+            ],
+        }
+    else:
+        # chat and goal_intake answer in plain text
+        return {"text": _words(rng, settings.get("reply_words", 60), size)}
+    return {"text": json.dumps(text, indent=2)}
+
+
+class MockChatAgent:
+    def __init__(self, modes, latency_scale=1.0, bandwidth=None, seed=None):
+        self.modes = modes
+        self.latency_scale = latency_scale
+        self.bandwidth = bandwidth
+        self.rng = random.Random(seed)
+        self.counts = {}
+
+    def latency(self, mode, body, size=0):
+        settings = self.modes.get(mode, self.modes["chat"])
+        median = settings["median"]
+        if settings.get("per_week"):
+            weeks = _number((body.get("context") or {}).get("duration_weeks"), 8)
+            median *= max(weeks, 1) / 8
+        median += settings.get("per_kb", 0.0) * size / 1024
+        seconds = self.rng.lognormvariate(math.log(median), settings["sigma"])
+        return seconds * self.latency_scale
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method = request_line.split(b" ", 1)[0].decode("latin-1")
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            raw = await reader.readexactly(int(headers.get("content-length", 0)))
+            if method == "OPTIONS":
+                await self._send(writer, 200, b"ok", "text/plain")
+                return
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                await self._send(writer, 400, b'{"error":"Invalid JSON body"}')
+                return
+            mode = body.get("mode") or "chat"
+            settings = self.modes.get(mode, self.modes["chat"])
+            self.counts[mode] = self.counts.get(mode, 0) + 1
+            await asyncio.sleep(self.latency(mode, body, len(raw)))
+            if self.rng.random() < settings.get("error_rate", 0.0):
+                status = self.rng.choice((429, 500, 503))
+                error = {"error": "Gemini API request failed", "details": "mock"}
+                await self._send(writer, status, json.dumps(error).encode("utf-8"))
+                return
+            payload = respond(mode, body, settings, self.rng)
+            await self._send(writer, 200, json.dumps(payload).encode("utf-8"))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, body, content_type="application/json"):
+        reason = {200: "OK", 400: "Bad Request", 429: "Too Many Requests"}.get(
+            status, "Error"
+        )
+        head = [f"HTTP/1.1 {status} {reason}", f"Content-Type: {content_type}"]
+        head += [f"{k}: {v}" for k, v in CORS_HEADERS.items()]
+        head += [f"Content-Length: {len(body)}", "Connection: close"]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if not self.bandwidth:
+            writer.write(body)
+            await writer.drain()
+            return
+        # Trickle the body out to model download time on large payloads
+        step = max(1024, int(self.bandwidth / 20))
+        for i in range(0, len(body), step):
+            writer.write(body[i : i + step])
+            await writer.drain()
+            await asyncio.sleep(len(body[i : i + step]) / self.bandwidth)
+
+
+def load_modes(path=None, error_rate=0.0, roadmap_shape="prompt", size_scale=1.0):
+    modes = {mode: dict(settings) for mode, settings in MODES.items()}
+    for settings in modes.values():
+        settings.setdefault("error_rate", error_rate)
+        settings.setdefault("size", size_scale)
+    modes["generate_roadmap"]["shape"] = roadmap_shape
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for mode, overrides in json.load(f).items():
+                modes.setdefault(
+                    mode, dict(MODES["chat"], error_rate=error_rate, size=size_scale)
+                )
+                modes[mode].update(overrides)
+    return modes
+
+
+async def serve(agent, host, port):
+    server = await asyncio.start_server(agent.handle, host, port, backlog=1024)
+    print(f"Mock chat-agent listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local chat-agent stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--config", help="JSON file with per-mode overrides")
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0, help="multiply all latencies"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, help="response bytes per second")
+    parser.add_argument(
+        "--roadmap-shape", choices=SHAPES, default="prompt",
+        help="weekly_plans + day_1_tasks, or the weeks[].days[] capture shape",
+    )
+    parser.add_argument(
+        "--size-scale", type=float, default=1.0, help="multiply generated text in every mode"
+    )
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    agent = MockChatAgent(
+        load_modes(args.config, args.error_rate, args.roadmap_shape, args.size_scale),
+        args.latency_scale,
+        args.bandwidth,
+        args.seed,
+    )
+    start = time.perf_counter()
+    try:
+        asyncio.run(serve(agent, args.host, args.port))
+    except KeyboardInterrupt:
+        served = ", ".join(f"{m} {n}" for m, n in sorted(agent.counts.items()))
+        print(f"\nServed {served or 'nothing'} in {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Request payloads for the chat-agent edge function.
+
+These mirror what the app sends (chat.tsx, goalsStore) and are shared by the
+debug scripts and the load tooling so every client exercises the same shapes.
+"""
+
+SUPABASE_URL = "https://nodwouaygritoprsbrrf.supabase.co"
+FUNCTION_URL = f"{SUPABASE_URL}/functions/v1/chat-agent"
+FAKE_USER_ID = "00000000-0000-0000-0000-000000000000"
+
+WIZARD_DATA = {
+    "goal": "Lose 5kg in 2 months",
+    "currentWeight": 80,
+    "targetWeight": 75,
+    "duration": 8,
+}
+
+
+def chat_payload(message="Hello, how are you?"):
+    # mode is undefined for normal chat
+    return {"message": message, "userId": FAKE_USER_ID}
+
+
+def app_chat_payload(message="Hello", history=(), mode=None):
+    """The body chat.tsx sends: mode null plus history and profile context."""
+    return {
+        "mode": mode,  # undefined in JS becomes null
+        "message": message,
+        "history": list(history),
+        "attachments": [],
+        "context": {
+            "userId": FAKE_USER_ID,
+            "userName": "Test User",
+            "xp": 100,
+            "level": 1,
+            "streak": 0,
+        },
+        "userId": FAKE_USER_ID,
+    }
+
+
+def goal_intake_payload(message="I want to lose weight"):
+    return {
+        "message": message,
+        "mode": "goal_intake",
+        "userId": FAKE_USER_ID,
+        "context": {"userName": "TestUser"},
+    }
+
+
+def validate_goal_payload(wizard_data=WIZARD_DATA):
+    return {
+        "mode": "validate_goal",
+        "userId": FAKE_USER_ID,
+        "context": {
+            "goalDescription": wizard_data["goal"],
+            "weight": wizard_data["currentWeight"],
+            "targetValue": wizard_data["targetWeight"],
+            "targetUnit": "kg",
+            "durationWeeks": wizard_data["duration"],
+        },
+    }
+
+
+def roadmap_payload(wizard_data=WIZARD_DATA, goal_id="test-goal-id-123"):
+    return {
+        "mode": "generate_roadmap",
+        "userId": FAKE_USER_ID,
+        "context": {
+            "goalId": goal_id,
+            "userName": "Test User",
+            "age": 30,
+            "height": 175,
+            "weight": wizard_data["currentWeight"],
+            "goal": wizard_data["goal"],
+            "target_weight": wizard_data["targetWeight"],
+            "targetUnit": "kg",
+            "duration_weeks": wizard_data["duration"],
+            "dietPreference": "Balanced",
+            "activityLevel": "Moderate",
+        },
+    }
+
+
+# Payload builders keyed by the name used in reports ("chat" has no mode)
+PAYLOADS = {
+    "chat": chat_payload,
+    "goal_intake": goal_intake_payload,
+    "validate_goal": validate_goal_payload,
+    "generate_roadmap": roadmap_payload,
+}
+
+
+def mode_name(payload):
+    return payload.get("mode") or "chat"
+
+
+# Fields a synthetic profile may set, as sent by test_phase5.py
+PROFILE_FIELDS = (
+    "age",
+    "height",
+    "weight",
+    "target_weight",
+    "duration_weeks",
+    "dietPreference",
+    "activityLevel",
+)
+
+
+def profile_roadmap_payload(profile, goal_id="batch-goal"):
+    """generate_roadmap payload for one synthetic profile dict."""
+    weight = float(profile["weight"])
+    target = float(profile["target_weight"])
+    weeks = int(profile["duration_weeks"])
+    verb = "Lose" if target < weight else "Gain"
+    payload = roadmap_payload(
+        {
+            "goal": f"{verb} {abs(weight - target):g}kg in {weeks} weeks",
+            "currentWeight": weight,
+            "targetWeight": target,
+            "duration": weeks,
+        },
+        goal_id=goal_id,
+    )
+    context = payload["context"]
+    for field in ("age", "height", "dietPreference", "activityLevel"):
+        if profile.get(field) not in (None, ""):
+            context[field] = profile[field]
+    return payload
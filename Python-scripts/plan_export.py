@@ -0,0 +1,245 @@
+"""
+Snapshot a user's plan tree (health_goals -> weekly_plans -> daily_plans ->
+plan_tasks) to NDJSON.
+
+check_db_state.py makes one capped GET per table. This fetches the whole
+tree in one PostgREST embedded-resource query, pages through the goals
+with Range headers and splits the streamed JSON array as it arrives. Each
+goal is written as soon as its closing brace comes in, so memory holds one
+goal tree at most, never a whole response.
+
+    python plan_export.py --user <uuid> --out snapshot.ndjson
+    python plan_export.py --user <uuid> --tree --page-size 5 --out -
+
+Rows are written as {"table": ..., "row": {...}} with embedded children
+removed (foreign keys link them), or as one nested goal per line with
+--tree.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import metrics
+from async_http import request
+
+SELECT = (
+    "*,weekly_plans(*,daily_plans(*,plan_tasks(*)))"
+    "&weekly_plans.order=week_number"
+    "&weekly_plans.daily_plans.order=date"
+    "&weekly_plans.daily_plans.plan_tasks.order=time_slot"
+)
+CHILDREN = {
+    "health_goals": "weekly_plans",
+    "weekly_plans": "daily_plans",
+    "daily_plans": "plan_tasks",
+}
+
+_STRUCTURAL = re.compile(rb'[\[\]{}"]')
+_STRING_STOP = re.compile(rb'["\\]')
+_SEPARATORS = b", \t\r\n"
+
+
+class ArrayItems:
+    """Incrementally splits a streamed top-level JSON array into its items.
+
+    Only structural bytes are inspected (regex jumps over everything else),
+    and an item is decoded once its closing bracket arrives.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buffer = bytearray()
+        self.count = 0
+
+    def feed(self, chunk):
+        items = []
+        mark = 0
+        i = 0
+        length = len(chunk)
+        if self._escape and length:
+            self._escape = False
+            i = 1
+        while i < length:
+            if self._in_string:
+                match = _STRING_STOP.search(chunk, i)
+                if match is None:
+                    break
+                j = match.start()
+                if chunk[j] == 0x5C:  # backslash
+                    if j + 1 >= length:
+                        self._escape = True
+                        break
+                    i = j + 2
+                    continue
+                self._in_string = False
+                i = j + 1
+                continue
+            match = _STRUCTURAL.search(chunk, i)
+            if match is None:
+                break
+            j = match.start()
+            char = chunk[j]
+            i = j + 1
+            if char == 0x22:  # quote
+                self._in_string = True
+            elif char in b"[{":
+                self._depth += 1
+                if self._depth == 1:
+                    mark = i
+            else:
+                self._depth -= 1
+                if self._depth == 1:
+                    self._buffer += chunk[mark:i]
+                    mark = i
+                    items.append(json.loads(bytes(self._buffer).lstrip(_SEPARATORS)))
+                    self._buffer.clear()
+                    self.count += 1
+                elif self._depth == 0:
+                    self._buffer.clear()
+                    mark = i
+        if self._depth >= 1:
+            self._buffer += chunk[mark:]
+        return items
+
+    def close(self):
+        if self._depth or self._in_string:
+            raise ValueError("Response ended inside the JSON array")
+
+
+def flatten(table, row):
+    """Yields (table, row) for a row and its embedded children, parents first."""
+    child_table = CHILDREN.get(table)
+    children = row.pop(child_table, None) if child_table else None
+    yield table, row
+    for child in children or []:
+        yield from flatten(child_table, child)
+
+
+def _content_total(headers):
+    # Content-Range: 0-24/311, or */0 for an empty result, total may be *
+    _, _, total = headers.get("content-range", "").partition("/")
+    return int(total) if total.isdigit() else None
+
+
+async def export_tree(base_url, headers, user_id, write, page_size=25, timeout=60):
+    """Streams every goal of user_id to write(goal); returns (goals, pages)."""
+    url = (
+        f"{base_url}/rest/v1/health_goals?select={SELECT}"
+        f"&user_id=eq.{user_id}&order=created_at,id"
+    )
+    offset = 0
+    pages = 0
+    while True:
+        splitter = ArrayItems()
+
+        def on_chunk(data, elapsed):
+            for goal in splitter.feed(data):
+                write(goal)
+
+        page_headers = dict(headers)
+        page_headers.update(
+            {
+                "Range-Unit": "items",
+                "Range": f"{offset}-{offset + page_size - 1}",
+                "Prefer": "count=exact",
+                "Accept": "application/json",
+            }
+        )
+        response = await request(
+            "GET", url, page_headers, timeout=timeout, on_chunk=on_chunk,
+            keep_body=False,
+        )
+        metrics.observe_response("rest:plan_tree", response, page=pages)
+        pages += 1
+        if response.status == 416:  # Range past the end
+            break
+        if response.status not in (200, 206):
+            raise RuntimeError(f"HTTP {response.status} fetching goals at {offset}")
+        splitter.close()
+        offset += splitter.count
+        total = _content_total(response.headers)
+        if splitter.count < page_size or (total is not None and offset >= total):
+            break
+    return offset, pages
+
+
+class NdjsonWriter:
+    def __init__(self, handle, tree):
+        self.handle = handle
+        self.tree = tree
+        self.rows = {}
+
+    def __call__(self, goal):
+        if self.tree:
+            self.handle.write(json.dumps(goal, ensure_ascii=False) + "\n")
+            return
+        for table, row in flatten("health_goals", goal):
+            self.rows[table] = self.rows.get(table, 0) + 1
+            self.handle.write(
+                json.dumps({"table": table, "row": row}, ensure_ascii=False) + "\n"
+            )
+
+
+def rest_config(key=None):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    url = os.getenv("EXPO_PUBLIC_SUPABASE_URL")
+    key = key or os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv(
+        "EXPO_PUBLIC_SUPABASE_ANON_KEY"
+    )
+    return url, {"apikey": key, "Authorization": f"Bearer {key}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's plan tree")
+    parser.add_argument("--user", required=True, help="profiles.id of the user")
+    parser.add_argument("--out", default="-", help="NDJSON path, - for stdout")
+    parser.add_argument("--tree", action="store_true", help="one nested goal per line")
+    parser.add_argument("--page-size", type=int, default=25, help="goals per request")
+    parser.add_argument("--key", help="JWT to use, defaults to the .env keys")
+    args = parser.parse_args()
+
+    base_url, headers = rest_config(args.key)
+    if not base_url:
+        print("ERROR: EXPO_PUBLIC_SUPABASE_URL not found in .env")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.out == "-":
+        writer = NdjsonWriter(sys.stdout, args.tree)
+        goals, pages = asyncio.run(
+            export_tree(base_url, headers, args.user, writer, args.page_size)
+        )
+    else:
+        directory = os.path.dirname(os.path.abspath(args.out))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                writer = NdjsonWriter(f, args.tree)
+                goals, pages = asyncio.run(
+                    export_tree(base_url, headers, args.user, writer, args.page_size)
+                )
+            os.replace(temp_path, args.out)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    counts = ", ".join(f"{n} {t}" for t, n in writer.rows.items())
+    print(
+        f"Exported {goals} goals ({counts or 'nested'}) in {pages} requests, "
+        f"{time.perf_counter() - start:.2f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
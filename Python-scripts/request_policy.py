@@ -0,0 +1,423 @@
+"""
+Client-side request policy for the chat-agent: hedging, deadlines and a
+circuit breaker.
+
+A call that has not answered by the mode's observed p95 gets one duplicate
+(a hedge) and the first 200 wins; the loser is cancelled. Hedges come out of
+a budget of --hedge-ratio extra requests per request sent, and are never
+sent while the breaker is not closed, so a slow or failing function does not
+see its load doubled. Requests carrying a `message` are not hedged: the
+function stores facts from messages in user_memory, so a duplicate would
+store them twice.
+
+Every mode has a deadline covering all attempts. The breaker opens when more
+than half of the last 20 calls failed (5xx, 429, timeout, transport error),
+fails fast for --cooldown seconds, then lets one probe through.
+
+    VQ_HEDGE=1 python test_phase5.py              # cassette.post goes through here
+    python request_policy.py --url http://127.0.0.1:8787 --mode generate_roadmap -n 40
+
+Latencies are timed as the caller sees them, from the start of the call to
+the winning response (a missed deadline counts as the deadline), so hedging
+cannot hide the tail it is meant to cut. Latencies, counters, the hedge
+budget and the breaker's recent outcomes are kept in policy_state.json, so
+one-shot scripts start from the p95, budget and breaker state of earlier
+runs. Concurrent processes each save on exit and the last one wins.
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import time
+from collections import deque
+
+import metrics
+from async_http import post_json
+from latency_stats import percentile
+from payloads import FUNCTION_URL, PAYLOADS, mode_name
+from rate_limit import should_retry
+
+DEFAULT_STATE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "policy_state.json"
+)
+
+# mode -> (deadline seconds, hedge delay before enough samples are observed)
+MODE_POLICY = {
+    "generate_roadmap": (150.0, 45.0),
+    "generate_daily_tasks": (60.0, 15.0),
+    "validate_goal": (30.0, 6.0),
+    "analyze_meal": (45.0, 10.0),
+    "meal_suggest": (30.0, 8.0),
+    "ingredient_suggest": (30.0, 8.0),
+    "plan": (45.0, 10.0),
+    "generate_summary": (20.0, 4.0),
+    "title": (15.0, 3.0),
+    "chat": (60.0, 10.0),
+    "goal_intake": (60.0, 10.0),
+}
+COUNTERS = (
+    "requests",
+    "hedged",
+    "hedge_wins",
+    "primary_wins",
+    "failed",
+    "deadline_exceeded",
+    "rejected",
+)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class LatencyTracker:
+    """Sliding window of caller-observed call latencies per mode."""
+
+    def __init__(self, window=200, warmup=10):
+        self.window = window
+        self.warmup = warmup
+        self.samples = {}
+
+    def record(self, mode, seconds):
+        self.samples.setdefault(mode, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, mode, q):
+        values = self.samples.get(mode)
+        if not values or len(values) < self.warmup:
+            return None
+        return percentile(sorted(values), q)
+
+
+class CircuitBreaker:
+    """closed -> open on a high failure rate -> half_open probe -> closed."""
+
+    def __init__(self, failure_rate=0.5, window=20, min_calls=10, cooldown=30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.state = "closed"
+        # Wall clock, so the cooldown carries over between processes
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self):
+        if self.state == "open":
+            if time.time() - self.opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, ok):
+        if self.state == "half_open":
+            self._probing = False
+            if ok:
+                self.state = "closed"
+                self.outcomes.clear()
+            else:
+                self._open()
+            return
+        self.outcomes.append(ok)
+        failures = self.outcomes.count(False)
+        if (
+            len(self.outcomes) >= self.min_calls
+            and failures / len(self.outcomes) > self.failure_rate
+        ):
+            self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.time()
+
+    def to_json(self):
+        return {
+            "state": self.state,
+            "opened_at": self.opened_at,
+            "outcomes": list(self.outcomes),
+        }
+
+    def load(self, state):
+        self.outcomes.extend(bool(ok) for ok in state.get("outcomes", ()))
+        self.opened_at = float(state.get("opened_at", 0.0))
+        # A probe that was in flight when its process exited never reported
+        # back, so a saved half_open circuit resumes as open
+        self.state = "open" if state.get("state") in ("open", "half_open") else "closed"
+
+
+def _hedgeable(payload):
+    # index.ts stores user_memory facts for any request with a message
+    return not payload.get("message") or mode_name(payload) == "title"
+
+
+class RequestPolicy:
+    def __init__(
+        self,
+        hedge_quantile=95,
+        hedge_ratio=0.1,
+        tracker=None,
+        breaker=None,
+        modes=MODE_POLICY,
+        hedge=True,
+    ):
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_ratio = hedge_ratio
+        self.tracker = tracker or LatencyTracker()
+        self.breaker = breaker or CircuitBreaker()
+        self.modes = modes
+        self.counters = {}
+        # hedge_ratio tokens per request, capped; persisted with the state
+        self._hedge_tokens = 0.0
+
+    def count(self, mode, counter):
+        counts = self.counters.setdefault(mode, dict.fromkeys(COUNTERS, 0))
+        counts[counter] += 1
+
+    def hedge_delay(self, mode):
+        observed = self.tracker.quantile(mode, self.hedge_quantile)
+        if observed is not None:
+            return observed
+        return self.modes.get(mode, self.modes["chat"])[1]
+
+    def deadline(self, mode):
+        return self.modes.get(mode, self.modes["chat"])[0]
+
+    def _take_hedge_token(self):
+        if not self.hedge or self.breaker.state != "closed" or self._hedge_tokens < 1.0:
+            return False
+        self._hedge_tokens -= 1.0
+        return True
+
+    async def _attempt(self, url, payload, headers, mode, kind, timeout):
+        response = await post_json(url, payload, headers=headers, timeout=timeout)
+        metrics.observe_response(mode, response, source="policy", attempt=kind)
+        return response
+
+    async def call(self, url, payload, headers=None, deadline=None):
+        """Posts payload under the policy and returns the winning response.
+
+        Raises CircuitOpenError without sending while the breaker is open
+        and DeadlineExceeded when no attempt answered in time. A non-200
+        response is returned as is once every attempt has finished.
+        """
+        mode = mode_name(payload)
+        if not self.breaker.allow():
+            self.count(mode, "rejected")
+            raise CircuitOpenError(
+                f"chat-agent circuit open, retry in "
+                f"{self.breaker.cooldown - (time.time() - self.breaker.opened_at):.0f}s"
+            )
+        self.count(mode, "requests")
+        started = time.perf_counter()
+        self._hedge_tokens = min(10.0, self._hedge_tokens + self.hedge_ratio)
+        deadline = deadline or self.deadline(mode)
+        end = time.monotonic() + deadline
+        tasks = {
+            asyncio.ensure_future(
+                self._attempt(url, payload, headers, mode, "primary", deadline)
+            ): "primary"
+        }
+        hedge_at = time.monotonic() + self.hedge_delay(mode)
+        can_hedge = _hedgeable(payload)
+        last = None
+        try:
+            while tasks:
+                now = time.monotonic()
+                if now >= end:
+                    break
+                wake = end
+                if can_hedge and "hedge" not in tasks.values():
+                    wake = min(end, hedge_at)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    kind = tasks.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        last = e
+                        continue
+                    if response.status == 200:
+                        self.tracker.record(mode, time.perf_counter() - started)
+                        self.count(mode, "hedge_wins" if kind == "hedge" else "primary_wins")
+                        self.breaker.record(True)
+                        return response
+                    last = response
+                    if response.status == 429:
+                        # Rate limited, a hedge would only add to it
+                        can_hedge = False
+                if (
+                    can_hedge
+                    and "hedge" not in tasks.values()
+                    and time.monotonic() >= hedge_at
+                ):
+                    can_hedge = False
+                    if tasks and self._take_hedge_token():
+                        self.count(mode, "hedged")
+                        remaining = end - time.monotonic()
+                        tasks[
+                            asyncio.ensure_future(
+                                self._attempt(url, payload, headers, mode, "hedge", remaining)
+                            )
+                        ] = "hedge"
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        if tasks or last is None:
+            self.tracker.record(mode, deadline)
+            self.count(mode, "deadline_exceeded")
+            self.breaker.record(False)
+            raise DeadlineExceeded(f"{mode}: no response within {deadline:.0f}s")
+        self.count(mode, "failed")
+        if isinstance(last, Exception):
+            self.breaker.record(False)
+            raise last
+        self.breaker.record(not should_retry(last.status))
+        return last
+
+    def state(self):
+        return {
+            "latencies": {m: list(v) for m, v in self.tracker.samples.items()},
+            "counters": self.counters,
+            "hedge_tokens": self._hedge_tokens,
+            "breaker": self.breaker.to_json(),
+        }
+
+    def load_state(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        for mode, values in state.get("latencies", {}).items():
+            for value in values:
+                self.tracker.record(mode, value)
+        for mode, counts in state.get("counters", {}).items():
+            merged = self.counters.setdefault(mode, dict.fromkeys(COUNTERS, 0))
+            for counter, value in counts.items():
+                if counter in merged:
+                    merged[counter] += value
+        self._hedge_tokens = float(state.get("hedge_tokens", self._hedge_tokens))
+        self.breaker.load(state.get("breaker", {}))
+
+    def save_state(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state(), f)
+        os.replace(tmp, path)
+
+    def report(self, since=None):
+        """Counter table, relative to a previous `counters` snapshot if given."""
+        since = since or {}
+        print(
+            f"{'mode':<20}{'requests':>9}{'hedged':>8}{'hedge won':>10}"
+            f"{'failed':>8}{'deadline':>9}{'rejected':>9}{'p95 s':>8}"
+        )
+        for mode, counts in sorted(self.counters.items()):
+            before = since.get(mode, {})
+            c = {k: v - before.get(k, 0) for k, v in counts.items()}
+            if not c["requests"] and not c["rejected"]:
+                continue
+            p95 = self.tracker.quantile(mode, 95)
+            print(
+                f"{mode:<20}{c['requests']:>9}{c['hedged']:>8}{c['hedge_wins']:>10}"
+                f"{c['failed']:>8}{c['deadline_exceeded']:>9}{c['rejected']:>9}"
+                + (f"{p95:>8.1f}" if p95 is not None else f"{'-':>8}")
+            )
+        print(f"Circuit: {self.breaker.state}")
+
+
+_default = None
+
+
+def default_policy():
+    """Process-wide policy, seeded from and saved back to VQ_POLICY_STATE."""
+    global _default
+    if _default is None:
+        _default = RequestPolicy()
+        path = os.getenv("VQ_POLICY_STATE", DEFAULT_STATE)
+        _default.load_state(path)
+        atexit.register(_default.save_state, path)
+    return _default
+
+
+def post(url, headers=None, json=None, timeout=None):
+    """Blocking `metrics.post` stand-in that applies the default policy."""
+    return asyncio.run(default_policy().call(url, json or {}, headers, deadline=timeout))
+
+
+async def _drive(policy, url, headers, mode, count, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await policy.call(url, PAYLOADS[mode](), headers)
+                outcomes.append((time.perf_counter() - start, response.status))
+            except Exception as e:
+                outcomes.append((time.perf_counter() - start, type(e).__name__))
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedged chat-agent calls")
+    parser.add_argument("--url", default=os.getenv("CHAT_AGENT_URL", FUNCTION_URL))
+    parser.add_argument("--key", default=os.getenv("EXPO_PUBLIC_SUPABASE_ANON_KEY"))
+    parser.add_argument("--mode", default="generate_roadmap", choices=sorted(PAYLOADS))
+    parser.add_argument("-n", "--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hedge-ratio", type=float, default=0.1)
+    parser.add_argument("--hedge-quantile", type=float, default=95)
+    parser.add_argument("--no-hedge", action="store_true", help="baseline without hedges")
+    parser.add_argument("--cooldown", type=float, default=30.0)
+    parser.add_argument("--state", default=os.getenv("VQ_POLICY_STATE", DEFAULT_STATE))
+    args = parser.parse_args()
+
+    headers = {}
+    if args.key:
+        headers = {"apikey": args.key, "Authorization": f"Bearer {args.key}"}
+    policy = RequestPolicy(
+        args.hedge_quantile,
+        args.hedge_ratio,
+        breaker=CircuitBreaker(cooldown=args.cooldown),
+        hedge=not args.no_hedge,
+    )
+    policy.load_state(args.state)
+    before = json.loads(json.dumps(policy.counters))
+    start = time.perf_counter()
+    outcomes = asyncio.run(
+        _drive(policy, args.url, headers, args.mode, args.requests, args.concurrency)
+    )
+    wall = time.perf_counter() - start
+    latencies = sorted(seconds for seconds, status in outcomes if status == 200)
+    if latencies:
+        spread = " ".join(
+            f"p{q} {percentile(latencies, q):.2f}s" for q in (50, 95, 99)
+        ) + f" max {latencies[-1]:.2f}s"
+    else:
+        spread = "p50 - p95 - p99 - max -"
+    print(f"{len(latencies)}/{len(outcomes)} ok in {wall:.1f}s | {spread}")
+    policy.report(since=before)
+    policy.save_state(args.state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+Response schemas for the JSON modes of the chat-agent edge function.
+
+Each schema is a small tree of nodes (Object, Array, Number, ...) mirroring
+the OUTPUT FORMAT blocks in supabase/functions/chat-agent/index.ts. A schema
+is compiled once into nested closures that only answer valid/invalid, which
+is all bulk runs need for the common case. Documents that fail are walked a
+second time to collect every error with its field path, e.g.
+`weeks[3].days[5].meals[2].calories: expected number, got str`.
+
+    python response_schema.py --mode generate_roadmap roadmaps/*.json
+    python response_schema.py --mode validate_goal captures.ndjson --repeat 200
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import Counter
+
+_MISSING = object()
+_INDEX = re.compile(r"\[\d+\]")
+
+
+class SchemaError:
+    __slots__ = ("path", "message")
+
+    def __init__(self, path, message):
+        self.path = path
+        self.message = message
+
+    def __repr__(self):
+        return f"SchemaError({self.path!r}, {self.message!r})"
+
+    def __str__(self):
+        return f"{self.path or '$'}: {self.message}"
+
+
+class ResponseValidationError(ValueError):
+    def __init__(self, mode, errors):
+        super().__init__(
+            f"{mode} response failed validation: "
+            + "; ".join(str(e) for e in errors[:5])
+            + (f" (+{len(errors) - 5} more)" if len(errors) > 5 else "")
+        )
+        self.mode = mode
+        self.errors = errors
+
+
+def _type_name(value):
+    return "null" if value is None else type(value).__name__
+
+
+def _child(path, key):
+    return f"{path}.{key}" if path else key
+
+
+class Node:
+    expected = "value"
+
+    def __init__(self, nullable=False):
+        self.nullable = nullable
+
+    def compile(self):
+        check = self._compile()
+        if not self.nullable:
+            return check
+        return lambda value: value is None or check(value)
+
+    def explain(self, value, path, errors):
+        if value is None and self.nullable:
+            return
+        if not self._type_ok(value):
+            errors.append(
+                SchemaError(path, f"expected {self.expected}, got {_type_name(value)}")
+            )
+            return
+        self._explain(value, path, errors)
+
+    def _type_ok(self, value):
+        return True
+
+    def _explain(self, value, path, errors):
+        pass
+
+
+class String(Node):
+    expected = "string"
+
+    def __init__(self, min_length=0, pattern=None, nullable=False):
+        super().__init__(nullable)
+        self.min_length = min_length
+        self.pattern = re.compile(pattern) if pattern else None
+
+    def _compile(self):
+        min_length = self.min_length
+        match = self.pattern.match if self.pattern else None
+        if match:
+            return lambda v: (
+                type(v) is str and len(v) >= min_length and match(v) is not None
+            )
+        if min_length:
+            return lambda v: type(v) is str and len(v) >= min_length
+        return lambda v: type(v) is str
+
+    def _type_ok(self, value):
+        return type(value) is str
+
+    def _explain(self, value, path, errors):
+        if len(value) < self.min_length:
+            errors.append(SchemaError(path, f"shorter than {self.min_length} chars"))
+        elif self.pattern and not self.pattern.match(value):
+            errors.append(
+                SchemaError(path, f"{value[:30]!r} does not match {self.pattern.pattern}")
+            )
+
+
+class Number(Node):
+    def __init__(self, minimum=None, maximum=None, integer=False, nullable=False):
+        super().__init__(nullable)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.integer = integer
+
+    def _compile(self):
+        # bool is an int subclass, so compare exact types
+        types = (int,) if self.integer else (int, float)
+        low = float("-inf") if self.minimum is None else self.minimum
+        high = float("inf") if self.maximum is None else self.maximum
+        return lambda v: type(v) in types and low <= v <= high
+
+    def _type_ok(self, value):
+        if self.integer:
+            return type(value) is int
+        return type(value) in (int, float)
+
+    @property
+    def expected(self):
+        return "integer" if self.integer else "number"
+
+    def _explain(self, value, path, errors):
+        if self.minimum is not None and value < self.minimum:
+            errors.append(SchemaError(path, f"{value} is below {self.minimum}"))
+        if self.maximum is not None and value > self.maximum:
+            errors.append(SchemaError(path, f"{value} is above {self.maximum}"))
+
+
+class Boolean(Node):
+    expected = "boolean"
+
+    def _compile(self):
+        return lambda v: type(v) is bool
+
+    def _type_ok(self, value):
+        return type(value) is bool
+
+
+class Enum(Node):
+    def __init__(self, *values, nullable=False):
+        super().__init__(nullable)
+        self.values = frozenset(values)
+        self.expected = " | ".join(sorted(repr(v) for v in values))
+
+    def _compile(self):
+        values = self.values
+        return lambda v: type(v) is str and v in values
+
+    def _type_ok(self, value):
+        return type(value) is str and value in self.values
+
+
+class Array(Node):
+    expected = "array"
+
+    def __init__(self, item, min_items=0, nullable=False):
+        super().__init__(nullable)
+        self.item = item
+        self.min_items = min_items
+
+    def _compile(self):
+        check = self.item.compile()
+        min_items = self.min_items
+
+        def array(v):
+            if type(v) is not list or len(v) < min_items:
+                return False
+            for element in v:
+                if not check(element):
+                    return False
+            return True
+
+        return array
+
+    def _type_ok(self, value):
+        return type(value) is list
+
+    def _explain(self, value, path, errors):
+        if len(value) < self.min_items:
+            errors.append(
+                SchemaError(path, f"expected at least {self.min_items} items, got {len(value)}")
+            )
+        for index, element in enumerate(value):
+            self.item.explain(element, f"{path}[{index}]", errors)
+
+
+class Object(Node):
+    """A JSON object. Unknown keys are allowed, the model adds extras often.
+
+    `require_any` lists alternative key groups of which at least one must be
+    fully present, e.g. the `weeks` and `weekly_plans` roadmap shapes.
+    """
+
+    expected = "object"
+
+    def __init__(self, required=None, optional=None, require_any=(), nullable=False):
+        super().__init__(nullable)
+        self.required = required or {}
+        self.optional = optional or {}
+        self.require_any = tuple(tuple(group) for group in require_any)
+
+    def _compile(self):
+        required = tuple((k, n.compile()) for k, n in self.required.items())
+        optional = tuple((k, n.compile()) for k, n in self.optional.items())
+        groups = self.require_any
+
+        def obj(v):
+            if type(v) is not dict:
+                return False
+            for key, check in required:
+                item = v.get(key, _MISSING)
+                if item is _MISSING or not check(item):
+                    return False
+            for key, check in optional:
+                item = v.get(key, _MISSING)
+                if item is not _MISSING and not check(item):
+                    return False
+            if groups:
+                for group in groups:
+                    for key in group:
+                        if key not in v:
+                            break
+                    else:
+                        return True
+                return False
+            return True
+
+        return obj
+
+    def _type_ok(self, value):
+        return type(value) is dict
+
+    def _explain(self, value, path, errors):
+        for key, node in self.required.items():
+            if key not in value:
+                errors.append(SchemaError(_child(path, key), "missing required field"))
+            else:
+                node.explain(value[key], _child(path, key), errors)
+        for key, node in self.optional.items():
+            if key in value:
+                node.explain(value[key], _child(path, key), errors)
+        if self.require_any and not any(
+            all(key in value for key in group) for group in self.require_any
+        ):
+            options = " | ".join("+".join(group) for group in self.require_any)
+            errors.append(SchemaError(path, f"expected one of: {options}"))
+
+
+def _nutrients(**extra):
+    fields = {n: Number(minimum=0) for n in ("calories", "protein", "carbs", "fat")}
+    fields.update(extra)
+    return fields
+
+
+# Captures contain "20: 00"
+_TIME = r"\d{1,2}\s*:\s*\d{2}"
+_DATE = r"\d{4}-\d{2}-\d{2}$"
+
+MEAL = Object(
+    required=_nutrients(
+        meal_type=String(min_length=1),
+        time=String(pattern=_TIME),
+        description=String(min_length=1),
+    )
+)
+WORKOUT = Object(
+    required={"description": String(min_length=1)},
+    optional={
+        # Rest days come back with "time": "N/A"
+        "time": String(),
+        "duration": String(),
+        "calories_burned": Number(minimum=0),
+        # The full weeks[] roadmap spells it calories_burn
+        "calories_burn": Number(minimum=0),
+    },
+)
+DAILY_TASKS = Object(
+    required={"meals": Array(MEAL, min_items=1)},
+    optional={"workouts": Array(WORKOUT)},
+)
+
+SCHEMAS = {
+    "generate_roadmap": Object(
+        required={
+            "goal_summary": String(min_length=1),
+            "daily_calorie_target": Number(minimum=800, maximum=6000),
+            "macros": Object(
+                required={n: Number(minimum=0) for n in ("protein", "carbs", "fat")}
+            ),
+        },
+        optional={
+            "daily_water_target": Number(minimum=0),
+            # Roadmap as requested by the prompt: week summaries + Day 1
+            "weekly_plans": Array(
+                Object(
+                    required={"focus": String()},
+                    optional={
+                        "week": Number(integer=True, minimum=1),
+                        "calorie_target": Number(minimum=0),
+                        "ai_tips": String(),
+                    },
+                ),
+                min_items=1,
+            ),
+            "day_1_tasks": DAILY_TASKS,
+            # Full roadmap as seen in captures: every day of every week
+            "weeks": Array(
+                Object(
+                    required={
+                        "week_number": Number(integer=True, minimum=1),
+                        "days": Array(
+                            Object(
+                                required={
+                                    "day_number": Number(integer=True, minimum=1),
+                                    "meals": Array(MEAL, min_items=1),
+                                },
+                                optional={
+                                    "date": String(pattern=_DATE),
+                                    "workout": WORKOUT,
+                                    "workouts": Array(WORKOUT),
+                                },
+                            ),
+                            min_items=1,
+                        ),
+                    },
+                    optional={"focus": String(), "calorie_target": Number(minimum=0)},
+                ),
+                min_items=1,
+            ),
+        },
+        require_any=(("weeks",), ("weekly_plans", "day_1_tasks")),
+    ),
+    "validate_goal": Object(
+        required={
+            "is_realistic": Boolean(),
+            "reason": String(min_length=1),
+            "suggested_timeline_weeks": Number(minimum=0, nullable=True),
+            "rate_per_week": Number(),
+        }
+    ),
+    "generate_daily_tasks": DAILY_TASKS,
+    "analyze_meal": Object(
+        required=_nutrients(
+            detected_food=String(min_length=1),
+            confidence=Enum("high", "medium", "low"),
+        ),
+        optional={"notes": String()},
+    ),
+}
+
+
+class Validator:
+    def __init__(self, mode, schema):
+        self.mode = mode
+        self.schema = schema
+        self.is_valid = schema.compile()
+
+    def errors(self, doc):
+        """Every schema violation in doc, empty when it is valid."""
+        if self.is_valid(doc):
+            return []
+        errors = []
+        self.schema.explain(doc, "", errors)
+        return errors
+
+    def validate(self, doc):
+        errors = self.errors(doc)
+        if errors:
+            raise ResponseValidationError(self.mode, errors)
+        return doc
+
+
+VALIDATORS = {mode: Validator(mode, schema) for mode, schema in SCHEMAS.items()}
+
+
+def parse_response(body):
+    """The model output inside a chat-agent response.
+
+    Accepts the decoded `{"text": "..."}` envelope, a batch_roadmaps.py
+    checkpoint (`{"response": {...}}`) or an already parsed document.
+    """
+    if isinstance(body, dict) and isinstance(body.get("response"), dict):
+        body = body["response"]
+    if isinstance(body, dict) and isinstance(body.get("text"), str):
+        return json.loads(body["text"])
+    return body
+
+
+def validate_response(mode, body):
+    """Returns (document, errors) for a raw response body or parsed document."""
+    try:
+        doc = parse_response(body)
+    except json.JSONDecodeError as e:
+        return None, [SchemaError("text", f"invalid JSON: {e}")]
+    return doc, VALIDATORS[mode].errors(doc)
+
+
+def iter_documents(path):
+    """Yields (label, body) for a JSON file or every line of an NDJSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield f"{path}:{number}", json.loads(line)
+        else:
+            yield path, json.load(f)
+
+
+def validate_many(mode, bodies):
+    """Bulk validation: yields (index, errors) for every invalid body."""
+    validator = VALIDATORS[mode]
+    is_valid = validator.is_valid
+    for index, body in enumerate(bodies):
+        try:
+            doc = parse_response(body)
+        except json.JSONDecodeError as e:
+            yield index, [SchemaError("text", f"invalid JSON: {e}")]
+            continue
+        if not is_valid(doc):
+            yield index, validator.errors(doc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate chat-agent responses")
+    parser.add_argument("paths", nargs="+", help="JSON responses or NDJSON files")
+    parser.add_argument("--mode", required=True, choices=sorted(VALIDATORS))
+    parser.add_argument("--show", type=int, default=10, help="invalid docs to list")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="validate the set N times (throughput)"
+    )
+    args = parser.parse_args()
+
+    labels, bodies = [], []
+    for path in args.paths:
+        for label, body in iter_documents(path):
+            labels.append(label)
+            bodies.append(body)
+    # Decode the envelopes up front so the timing covers validation only
+    docs = []
+    for body in bodies:
+        try:
+            docs.append(parse_response(body))
+        except json.JSONDecodeError:
+            docs.append(body)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        failures = list(validate_many(args.mode, docs))
+    elapsed = time.perf_counter() - start
+
+    total = len(docs) * args.repeat
+    print(
+        f"{len(docs)} {args.mode} responses, {len(docs) - len(failures)} valid, "
+        f"{len(failures)} invalid"
+    )
+    print(
+        f"Validated {total} in {elapsed * 1000:.1f} ms "
+        f"({total / elapsed if elapsed else float('inf'):,.0f} docs/s)"
+    )
+
+    by_path = Counter()
+    for _, errors in failures:
+        by_path.update({_INDEX.sub("[*]", e.path) or "$" for e in errors})
+    if by_path:
+        print("\nMost common failing fields:")
+        for path, count in by_path.most_common(10):
+            print(f"   {count:>6}  {path}")
+    for index, errors in failures[: args.show]:
+        print(f"\n❌ {labels[index]}")
+        for error in errors[:5]:
+            print(f"   - {error}")
+        if len(errors) > 5:
+            print(f"   ... {len(errors) - 5} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Streaming chat-agent client with per-phase latency.
+
+The body is printed as it arrives (raw JSON today, `data:` payloads if the
+function answers with text/event-stream) and the request is broken down into
+DNS, TCP connect, TLS, time to first byte, first token and last byte, so
+network, model and payload time can be told apart.
+"""
+
+import asyncio
+import codecs
+import json
+import os
+import re
+import sys
+import time
+
+import metrics
+from async_http import post_json, request
+from payloads import mode_name
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reference")
+)
+from json_stream import PlanEvents  # noqa: E402
+
+# First character of the answer inside {"text": "..."} (or title/summary)
+_FIRST_TOKEN = re.compile(r'"(?:text|title|summary|error)"\s*:\s*"[^"]')
+_PHASES = (
+    ("dns", "DNS lookup"),
+    ("connect", "TCP connect"),
+    ("tls", "TLS handshake"),
+    ("sent", "Request sent"),
+    ("first_byte", "First byte (TTFB)"),
+    ("first_token", "First token"),
+    ("last_byte", "Last byte"),
+)
+
+
+class _Printer:
+    """Echoes body chunks and records when the first token shows up."""
+
+    def __init__(self, out, echo):
+        self.out = out
+        self.echo = echo
+        self.first_token = None
+        self.event_stream = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._seen = ""
+        self._line = ""
+
+    def __call__(self, data, elapsed):
+        text = self._decoder.decode(data)
+        if self.event_stream is None:
+            self.event_stream = text.lstrip().startswith(("data:", "event:", ":"))
+        if self.event_stream:
+            self._events(text, elapsed)
+            return
+        if self.first_token is None:
+            # Only the start of the body matters, keep the buffer small
+            self._seen = (self._seen + text)[-4096:]
+            if _FIRST_TOKEN.search(self._seen):
+                self.first_token = elapsed
+        if self.echo:
+            self.out.write(text)
+            self.out.flush()
+
+    def _events(self, text, elapsed):
+        self._line += text
+        *lines, self._line = self._line.split("\n")
+        for line in lines:
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if not data or data == "[DONE]":
+                continue
+            if self.first_token is None:
+                self.first_token = elapsed
+            if self.echo:
+                try:
+                    event = json.loads(data)
+                    data = event.get("text") or event.get("delta") or data
+                except (ValueError, AttributeError):
+                    pass
+                self.out.write(data)
+                self.out.flush()
+
+
+async def stream_post(url, payload, headers=None, timeout=None, echo=True):
+    """Posts payload, echoing the body as it streams in.
+
+    Returns the response; `response.timings` also holds `first_token`.
+    """
+    printer = _Printer(sys.stdout, echo)
+    merged = {"Accept": "text/event-stream, application/json"}
+    merged.update(headers or {})
+    response = await post_json(
+        url, payload, headers=merged, timeout=timeout, on_chunk=printer
+    )
+    if printer.first_token is not None:
+        response.timings["first_token"] = printer.first_token
+    metrics.observe_response(mode_name(payload), response, stream=True)
+    return response
+
+
+async def stream_plan(url, payload, headers=None, timeout=None, on_event=None, keep_body=True):
+    """Posts a roadmap payload and parses the plan while it downloads.
+
+    `on_event(kind, path, value, elapsed)` is called for every week, day,
+    day_1_tasks and top-level field as soon as it closes (see
+    json_stream.PlanEvents). Returns the response with the events, each
+    with the seconds since the request started, as `response.events`, and
+    `response.truncated` when the body ended mid-plan.
+    """
+    parser = PlanEvents()
+    events = []
+    start = time.perf_counter()
+
+    def on_chunk(data, elapsed):
+        for kind, path, value in parser.feed(data):
+            events.append((kind, path, value, elapsed))
+            if on_event:
+                on_event(kind, path, value, elapsed)
+
+    merged = {"Content-Type": "application/json"}
+    merged.update(headers or {})
+    body = json.dumps(payload).encode("utf-8")
+    response = await request(
+        "POST", url, merged, body, timeout, on_chunk=on_chunk, keep_body=keep_body
+    )
+    for kind, path, value in parser.close():
+        events.append((kind, path, value, time.perf_counter() - start))
+    response.events = events
+    response.truncated = parser.truncated
+    metrics.observe_response(mode_name(payload), response, stream=True)
+    return response
+
+
+def print_timings(timings):
+    print("\n\n   Phase                 at (ms)   delta (ms)")
+    previous = 0.0
+    for key, label in _PHASES:
+        if key not in timings:
+            continue
+        at = timings[key]
+        print(f"   {label:<20}{1000 * at:>9.1f}{1000 * (at - previous):>12.1f}")
+        previous = at
+    if "first_byte" in timings and "sent" in timings:
+        server = timings["first_byte"] - timings["sent"]
+        download = timings["last_byte"] - timings["first_byte"]
+        print(
+            f"   Server wait {1000 * server:.1f} ms | download {1000 * download:.1f} ms"
+        )
+
+
+def stream_chat(url, headers, payload, timeout=120):
+    """Blocking wrapper used by the debug scripts."""
+    try:
+        response = asyncio.run(stream_post(url, payload, headers, timeout))
+        print(f"\nStatus Code: {response.status}")
+        print_timings(response.timings)
+        return response
+    except Exception as e:
+        print("Exception:", e)
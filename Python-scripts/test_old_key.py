@@ -1,6 +1,7 @@
-import requests
 import json
 
+import metrics
+
 # OLD KEY (the one that was supposedly working before)
 OLD_KEY = "sb_publishable_zsRFhzOrapI7NscZ6vYGFw_AB3I__GV"
 SUPABASE_URL = "https://nodwouaygritoprsbrrf.supabase.co"
@@ -14,12 +15,13 @@ def test_with_old_key():
     payload = {"message": "Hello", "userId": "00000000-0000-0000-0000-000000000000"}
 
     try:
-        resp = requests.post(FUNCTION_URL, headers=HEADERS, json=payload)
+        resp = metrics.post(FUNCTION_URL, headers=HEADERS, json=payload)
         print(f"Status Code: {resp.status_code}")
         if resp.status_code == 200:
             print("Response:", resp.json())
         else:
             print("Error:", resp.text)
+        print("Timings:", resp.trace.describe())
     except Exception as e:
         print("Exception:", e)
 
@@ -1,6 +1,8 @@
-import requests
 import json
-import time
+
+import cassette
+import metrics
+from payloads import WIZARD_DATA, roadmap_payload, validate_goal_payload
 
 SUPABASE_URL = "https://nodwouaygritoprsbrrf.supabase.co"
 FUNCTION_URL = f"{SUPABASE_URL}/functions/v1/chat-agent"
@@ -12,41 +14,38 @@ HEADERS = {"Authorization": f"Bearer {ANON_KEY}", "Content-Type": "application/j
 FAKE_USER_ID = "00000000-0000-0000-0000-000000000000"
 
 
+def report_schema_errors(errors):
+    if not errors:
+        print("   Schema Check: ✅ valid")
+        return
+    print(f"   Schema Check: ❌ {len(errors)} errors")
+    for error in errors[:10]:
+        print(f"     - {error}")
+
+
 def test_ui_flow_simulation():
     print("\n=== Simulating Chat Wizard Flow ===")
 
     # 1. User enters data in Wizard
-    wizard_data = {
-        "goal": "Lose 5kg in 2 months",
-        "currentWeight": 80,
-        "targetWeight": 75,
-        "duration": 8,
-    }
+    wizard_data = dict(WIZARD_DATA)
     print(f"\n[Step 1] User Input: {json.dumps(wizard_data)}")
 
     # 2. Trigger Validation (from goalsStore.validateGoalWithAI)
     print("\n[Step 2] calling validate_goal...")
-    validate_payload = {
-        "mode": "validate_goal",
-        "userId": FAKE_USER_ID,
-        "context": {
-            "goalDescription": wizard_data["goal"],
-            "weight": wizard_data["currentWeight"],
-            "targetValue": wizard_data["targetWeight"],
-            "targetUnit": "kg",
-            "durationWeeks": wizard_data["duration"],
-        },
-    }
+    validate_payload = validate_goal_payload(wizard_data)
 
     try:
-        val_resp = requests.post(FUNCTION_URL, headers=HEADERS, json=validate_payload)
+        val_resp = cassette.post(FUNCTION_URL, headers=HEADERS, json=validate_payload)
         if val_resp.status_code != 200:
             print(f"❌ Validation Failed: {val_resp.text}")
             return
 
-        val_data = val_resp.json()
-        print(f"✅ Validation Result: {val_data['text']}")
-        val_json = json.loads(val_data["text"])
+        val_json, errors = metrics.decode_and_validate(val_resp, "validate_goal")
+        print(f"✅ Validation Result: {json.dumps(val_json)}")
+        report_schema_errors(errors)
+        print(f"   Timings: {val_resp.trace.describe()}")
+        if val_json is None:
+            return
 
         if not val_json.get("is_realistic"):
             print(
@@ -64,59 +63,49 @@ def test_ui_flow_simulation():
     # but the Edge Function might use it for context or logging.
     FAKE_GOAL_ID = "test-goal-id-123"
 
-    plan_payload = {
-        "mode": "generate_roadmap",
-        "userId": FAKE_USER_ID,
-        "context": {
-            "goalId": FAKE_GOAL_ID,
-            "userName": "Test User",
-            "age": 30,
-            "height": 175,
-            "weight": wizard_data["currentWeight"],
-            "goal": wizard_data["goal"],
-            "target_weight": wizard_data["targetWeight"],
-            "targetUnit": "kg",
-            "duration_weeks": wizard_data["duration"],
-            "dietPreference": "Balanced",
-            "activityLevel": "Moderate",
-        },
-    }
+    plan_payload = roadmap_payload(wizard_data, goal_id=FAKE_GOAL_ID)
 
     try:
-        # Measure time
-        start_time = time.time()
-        plan_resp = requests.post(FUNCTION_URL, headers=HEADERS, json=plan_payload)
-        duration = time.time() - start_time
+        plan_resp = cassette.post(FUNCTION_URL, headers=HEADERS, json=plan_payload)
 
         if plan_resp.status_code != 200:
             print(f"❌ Plan Generation Failed: {plan_resp.text}")
             return
 
-        plan_data = plan_resp.json()
-        print(f"✅ Plan Generated in {duration:.2f}s")
+        replay_note = " (recorded time, replayed)" if cassette.replayed(plan_resp) else ""
+        print(f"✅ Plan Generated in {plan_resp.trace.total:.2f}s{replay_note}")
 
         # Verify JSON structure
-        if "text" in plan_data:
-            try:
-                plan_json = json.loads(plan_data["text"])
-                print(
-                    f"   Structure Check: {len(plan_json.get('weekly_plans', []))} weeks generated."
-                )
-                if len(plan_json.get("weekly_plans", [])) > 0:
-                    first_week = plan_json["weekly_plans"][0]
-                    print(f"   Sample Week 1 Focus: {first_week.get('focus')}")
-                    print(
-                        f"   Sample Week 1 Calorie Target: {first_week.get('calorie_target')}"
-                    )
-                if "day_1_tasks" in plan_json:
-                    print(
-                        f"   Day 1 Tasks: {len(plan_json['day_1_tasks'].get('meals', []))} meals, {len(plan_json['day_1_tasks'].get('workouts', []))} workouts"
-                    )
-            except json.JSONDecodeError:
-                print("❌ Failed to parse Plan JSON response")
-                print(plan_data["text"][:500])
-        else:
+        try:
+            plan_data = plan_resp.json()
+        except ValueError:
+            plan_data = None
+        if not isinstance(plan_data, dict) or "text" not in plan_data:
             print("❌ No 'text' field in response")
+            print(plan_resp.text[:500])
+            return
+        plan_json, errors = metrics.decode_and_validate(plan_resp, "generate_roadmap")
+        report_schema_errors(errors)
+        print(f"   Timings: {plan_resp.trace.describe()}")
+        if plan_json is None:
+            print(plan_resp.text[:500])
+            return
+
+        # Full roadmaps carry weeks[].days[], the prompt asks for weekly_plans
+        weeks = plan_json.get("weeks") or plan_json.get("weekly_plans") or []
+        print(f"   Structure Check: {len(weeks)} weeks generated.")
+        if weeks:
+            print(f"   Sample Week 1 Focus: {weeks[0].get('focus')}")
+            print(f"   Sample Week 1 Calorie Target: {weeks[0].get('calorie_target')}")
+        day_1 = plan_json.get("day_1_tasks")
+        if day_1 is None and plan_json.get("weeks"):
+            day_1 = (plan_json["weeks"][0].get("days") or [{}])[0]
+        if day_1:
+            workouts = day_1.get("workouts") or [day_1.get("workout")]
+            print(
+                f"   Day 1 Tasks: {len(day_1.get('meals', []))} meals, "
+                f"{len([w for w in workouts if w])} workouts"
+            )
 
     except Exception as e:
         print(f"❌ Exception in plan generation: {e}")
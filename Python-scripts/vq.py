@@ -0,0 +1,448 @@
+"""
+One entry point for the chat-agent and database debug scripts.
+
+    python vq.py chat "How much protein today?"      # debug_chat.py
+    python vq.py chat --app --stream                 # debug_app_chat.py
+    python vq.py intake "I want to lose weight"
+    python vq.py validate --weight 80 --target 75 --weeks 8
+    python vq.py roadmap --weeks 4 --out plan.json   # debug_plan_gen.py
+    python vq.py roadmap --events                    # days as they download
+    python vq.py db-state                            # check_db_state.py
+    python vq.py models --action embedContent        # check-model.py
+
+Only the standard library is imported at startup; each subcommand imports
+what it needs when it runs, and nothing here needs requests, dotenv or
+google.genai. `.env` is read once (from the working directory up, then from
+the repository root) without overriding variables already set, and
+CHAT_AGENT_URL points the chat subcommands at another function, such as
+mock_chat_agent.py. The model catalog is cached on disk for --ttl seconds,
+so `models` is a local file read after the first call.
+
+Exit status is 0 on success, 1 on an HTTP or transport failure and 2 when
+the response does not match its schema, for use in shell loops and health
+checks.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+MODEL_CACHE = os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "vital-quest",
+    "models.json",
+)
+
+_config = None
+
+
+def _env_files():
+    seen = []
+    for start in (os.getcwd(), HERE):
+        directory = start
+        while True:
+            path = os.path.join(directory, ".env")
+            if os.path.isfile(path) and path not in seen:
+                seen.append(path)
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+    return seen
+
+
+def _parse_env(path):
+    values = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, _, value = line.partition("=")
+            key = key.strip()
+            if key.startswith("export "):
+                key = key[7:].strip()
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            elif " #" in value:
+                value = value.split(" #", 1)[0].rstrip()
+            values[key] = value
+    return values
+
+
+def config():
+    """Settings from the environment and .env, read on first use only."""
+    global _config
+    if _config is None:
+        env = {}
+        # Nearest file wins, the real environment wins over both
+        for path in reversed(_env_files()):
+            env.update(_parse_env(path))
+        env.update(os.environ)
+        supabase_url = env.get("EXPO_PUBLIC_SUPABASE_URL")
+        if not supabase_url:
+            from payloads import SUPABASE_URL as supabase_url
+        _config = {
+            "supabase_url": supabase_url.rstrip("/"),
+            "function_url": env.get("CHAT_AGENT_URL")
+            or f"{supabase_url.rstrip('/')}/functions/v1/chat-agent",
+            "anon_key": env.get("EXPO_PUBLIC_SUPABASE_ANON_KEY"),
+            "service_key": env.get("SUPABASE_SERVICE_ROLE_KEY"),
+            "gemini_key": env.get("GEMINI_API_KEY") or env.get("GOOGLE_API_KEY"),
+        }
+    return _config
+
+
+def _function_headers():
+    key = config()["anon_key"]
+    if not key:
+        _fail("EXPO_PUBLIC_SUPABASE_ANON_KEY not found in .env")
+    return {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+
+
+def _rest_headers():
+    key = config()["service_key"] or config()["anon_key"]
+    if not key:
+        _fail("EXPO_PUBLIC_SUPABASE_ANON_KEY not found in .env")
+    return {"apikey": key, "Authorization": f"Bearer {key}"}
+
+
+def _fail(message, status=1):
+    print(f"ERROR: {message}", file=sys.stderr)
+    sys.exit(status)
+
+
+def _call(payload, stream=False):
+    """Posts a payload to the chat-agent; returns the response or exits."""
+    url = config()["function_url"]
+    if stream:
+        from stream_client import stream_chat
+
+        response = stream_chat(url, _function_headers(), payload)
+        if response is None or response.status != 200:
+            sys.exit(1)
+        return response
+    import cassette
+    from async_http import HttpError
+
+    try:
+        response = cassette.post(url, headers=_function_headers(), json=payload)
+    except (OSError, HttpError) as e:
+        _fail(f"{type(e).__name__}: {e}")
+    if response.status != 200:
+        print(f"HTTP {response.status}: {response.text[:500]}", file=sys.stderr)
+        sys.exit(1)
+    return response
+
+
+def _decode(response, mode):
+    import metrics
+
+    doc, errors = metrics.decode_and_validate(response, mode)
+    for error in errors[:10]:
+        print(f"   ❌ {error}", file=sys.stderr)
+    if len(errors) > 10:
+        print(f"   ... {len(errors) - 10} more schema errors", file=sys.stderr)
+    return doc, errors
+
+
+def cmd_chat(args):
+    from payloads import app_chat_payload, chat_payload, goal_intake_payload
+
+    if args.command == "intake":
+        payload = goal_intake_payload(args.message or "I want to lose weight")
+    elif args.app:
+        payload = app_chat_payload(args.message or "Hello")
+    else:
+        payload = chat_payload(args.message or "Hello, how are you?")
+    response = _call(payload, args.stream)
+    if not args.stream:
+        body = response.json()
+        print(body.get("text", json.dumps(body)) if isinstance(body, dict) else body)
+        print(f"\nTimings: {response.trace.describe()}", file=sys.stderr)
+    return 0
+
+
+def _wizard(args):
+    from payloads import WIZARD_DATA
+
+    wizard = dict(WIZARD_DATA)
+    for field, value in (
+        ("currentWeight", args.weight),
+        ("targetWeight", args.target),
+        ("duration", args.weeks),
+    ):
+        if value is not None:
+            wizard[field] = value
+    if args.goal:
+        wizard["goal"] = args.goal
+    elif args.weight is not None or args.target is not None or args.weeks:
+        change = wizard["currentWeight"] - wizard["targetWeight"]
+        verb = "Lose" if change >= 0 else "Gain"
+        wizard["goal"] = f"{verb} {abs(change):g}kg in {wizard['duration']} weeks"
+    return wizard
+
+
+def cmd_validate(args):
+    from payloads import validate_goal_payload
+
+    response = _call(validate_goal_payload(_wizard(args)))
+    doc, errors = _decode(response, "validate_goal")
+    if doc is None:
+        return 2
+    print(json.dumps(doc, indent=2, ensure_ascii=False))
+    print(f"\nTimings: {response.trace.describe()}", file=sys.stderr)
+    return 2 if errors else 0
+
+
+def _stream_events(payload):
+    import asyncio
+
+    from stream_client import stream_plan
+
+    def show(kind, path, value, elapsed):
+        if kind in ("day", "day_1_tasks"):
+            meals = len(value.get("meals") or [])
+            label = "day_1_tasks" if kind == "day_1_tasks" else f"day {value.get('day_number')}"
+            print(f"   {elapsed:>7.2f}s  {label}: {meals} meals", file=sys.stderr)
+        elif kind == "week":
+            week = value.get("week_number", value.get("week"))
+            print(f"   {elapsed:>7.2f}s  week {week}", file=sys.stderr)
+
+    try:
+        response = asyncio.run(
+            stream_plan(config()["function_url"], payload, _function_headers(), on_event=show)
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        _fail(f"{type(e).__name__}: {e}")
+    if response.status != 200:
+        print(f"HTTP {response.status}: {response.text[:500]}", file=sys.stderr)
+        sys.exit(1)
+    first = next(
+        (e[3] for e in response.events if e[0] in ("day", "day_1_tasks")), None
+    )
+    if first is not None:
+        print(
+            f"Day 1 usable after {first:.2f}s of {response.timings['last_byte']:.2f}s",
+            file=sys.stderr,
+        )
+    if response.truncated:
+        print("⚠️ Response ended mid-plan", file=sys.stderr)
+    return response
+
+
+def cmd_roadmap(args):
+    from payloads import roadmap_payload
+
+    payload = roadmap_payload(_wizard(args), goal_id=args.goal_id)
+    response = _stream_events(payload) if args.events else _call(payload)
+    doc, errors = _decode(response, "generate_roadmap")
+    if doc is None:
+        print(response.json().get("text", "")[:500], file=sys.stderr)
+        return 2
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=4, ensure_ascii=False)
+    # Full roadmaps carry weeks[].days[], the prompt asks for weekly_plans
+    weeks = doc.get("weeks") or doc.get("weekly_plans") or []
+    days = sum(len(w.get("days") or []) for w in weeks if isinstance(w, dict))
+    print(f"{len(weeks)} weeks, {days} days, target {doc.get('daily_calorie_target')} kcal")
+    print(f"Summary: {(doc.get('goal_summary') or '')[:200]}")
+    print(f"\nTimings: {response.trace.describe()}", file=sys.stderr)
+    return 2 if errors else 0
+
+
+DB_STATE_QUERIES = (
+    ("Health Goals", "health_goals",
+     "select=id,goal_type,status,ai_summary&status=eq.active&limit=3"),
+    ("Weekly Plans (first 3)", "weekly_plans",
+     "select=id,goal_id,week_number,focus_areas,status&limit=3"),
+    ("Daily Plans for today", "daily_plans",
+     "select=id,date,summary,calorie_target,weekly_plan_id&date=eq.{today}"),
+    ("Plan Tasks", "plan_tasks",
+     "select=id,plan_id,description,task_type,time_slot,is_completed&limit=10"),
+)
+
+
+def _short(value):
+    return str(value)[:8] if value else "None"
+
+
+def _db_line(table, row):
+    short = _short
+    if table == "health_goals":
+        return (f"{short(row.get('id'))}... | {row.get('goal_type')} | {row.get('status')}"
+                f" | {(row.get('ai_summary') or 'None')[:50]}")
+    if table == "weekly_plans":
+        return (f"Week {row.get('week_number')} | {row.get('status')} | goal "
+                f"{short(row.get('goal_id'))}... | {str(row.get('focus_areas'))[:60]}")
+    if table == "daily_plans":
+        return (f"{short(row.get('id'))}... | {row.get('calorie_target')} kcal | weekly "
+                f"{short(row.get('weekly_plan_id'))} | {row.get('summary')}")
+    return (f"{row.get('task_type')} | {row.get('time_slot')} | "
+            f"{str(row.get('description'))[:40]}")
+
+
+def cmd_db_state(args):
+    import asyncio
+    import datetime
+
+    import metrics
+    from async_http import request
+
+    base = config()["supabase_url"]
+    headers = _rest_headers()
+    today = datetime.date.today().isoformat()
+
+    async def fetch_all():
+        return await asyncio.gather(
+            *(
+                request("GET", f"{base}/rest/v1/{table}?{query.format(today=today)}",
+                        headers, timeout=args.timeout)
+                for _, table, query in DB_STATE_QUERIES
+            ),
+            return_exceptions=True,
+        )
+
+    # The four reads are independent, so they share one event loop
+    status = 0
+    for (title, table, _), response in zip(DB_STATE_QUERIES, asyncio.run(fetch_all())):
+        print(f"{title}:")
+        if isinstance(response, Exception):
+            print(f"   ❌ {type(response).__name__}: {response}")
+            status = 1
+            continue
+        metrics.observe_response(f"rest:{table}", response)
+        rows = response.json() if response.body else []
+        if response.status != 200:
+            message = rows.get("message") if isinstance(rows, dict) else response.text
+            print(f"   ❌ HTTP {response.status}: {message}")
+            status = 1
+        elif not rows:
+            print("   (no rows)")
+        for row in rows if isinstance(rows, list) else ():
+            print(f"   - {_db_line(table, row)}")
+    return status
+
+
+def load_models(ttl, refresh=False):
+    """Model catalog from the disk cache, refetched when older than ttl."""
+    if not refresh:
+        try:
+            with open(MODEL_CACHE, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if time.time() - cached["fetched_at"] < ttl:
+                return cached["models"], cached["fetched_at"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    import metrics
+
+    key = config()["gemini_key"]
+    if not key:
+        _fail("GEMINI_API_KEY not found in .env")
+    models = []
+    page_token = ""
+    # One paged listing serves every action, check-model.py listed twice
+    while True:
+        url = f"{MODELS_URL}?pageSize=1000&key={key}"
+        if page_token:
+            url += f"&pageToken={page_token}"
+        response = metrics.get(url, mode="models.list")
+        if response.status != 200:
+            _fail(f"HTTP {response.status}: {response.text[:300]}")
+        body = response.json()
+        for m in body.get("models", []):
+            models.append(
+                {
+                    "name": m["name"],
+                    "display_name": m.get("displayName"),
+                    "input_token_limit": m.get("inputTokenLimit"),
+                    "output_token_limit": m.get("outputTokenLimit"),
+                    "actions": m.get("supportedGenerationMethods", []),
+                }
+            )
+        page_token = body.get("nextPageToken")
+        if not page_token:
+            break
+    fetched_at = time.time()
+    os.makedirs(os.path.dirname(MODEL_CACHE), exist_ok=True)
+    tmp = MODEL_CACHE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": fetched_at, "models": models}, f)
+    os.replace(tmp, MODEL_CACHE)
+    return models, fetched_at
+
+
+def cmd_models(args):
+    models, fetched_at = load_models(args.ttl, args.refresh)
+    actions = args.action or ["generateContent", "embedContent"]
+    if args.json:
+        print(json.dumps([m for m in models if set(actions) & set(m["actions"])]))
+        return 0
+    for action in actions:
+        print(f"List of models that support {action}:\n")
+        for m in models:
+            if action in m["actions"]:
+                print(m["name"])
+        print()
+    age = time.time() - fetched_at
+    print(f"({len(models)} models, fetched {age:.0f}s ago)", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="vq", description="Vital Quest debug tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("chat", "send a chat message"),
+                            ("intake", "send a goal_intake message")):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("message", nargs="?")
+        p.add_argument("--stream", action="store_true", help="print as it arrives")
+        if name == "chat":
+            p.add_argument("--app", action="store_true", help="chat.tsx payload shape")
+        p.set_defaults(run=cmd_chat)
+
+    for name, run, help_text in (
+        ("validate", cmd_validate, "validate_goal for a wizard goal"),
+        ("roadmap", cmd_roadmap, "generate_roadmap and schema-check it"),
+    ):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("--goal", help="goal description")
+        p.add_argument("--weight", type=float)
+        p.add_argument("--target", type=float)
+        p.add_argument("--weeks", type=int)
+        if name == "roadmap":
+            p.add_argument("--goal-id", default="test-goal-id-123")
+            p.add_argument("--out", help="write the parsed plan as JSON")
+            p.add_argument(
+                "--events", action="store_true", help="show weeks and days as they arrive"
+            )
+        p.set_defaults(run=run)
+
+    p = commands.add_parser("db-state", help="goals, plans and tasks in Supabase")
+    p.add_argument("--timeout", type=float, default=30)
+    p.set_defaults(run=cmd_db_state)
+
+    p = commands.add_parser("models", help="Gemini models by supported action")
+    p.add_argument("--action", action="append", help="repeatable, default both")
+    p.add_argument("--ttl", type=float, default=86400, help="cache lifetime, seconds")
+    p.add_argument("--refresh", action="store_true", help="ignore the cache")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(run=cmd_models)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Repair whole directories of captured edge-function responses in parallel.
+
+Every file goes through the same single-pass pipeline as fix_json.py and
+unescape_json.py (detect envelope -> unwrap -> unescape -> parse ->
+reformat, see json_stream.repair_stream), spread over a process pool so all
+cores are busy. Outputs are written atomically, and failures are reported
+with the error offset and the text just before it. Inputs that would map to
+the same output (`a.txt` and `a.json`) keep their extension in the output
+name (`a.txt.json`, `a.json.json`).
+
+    python batch_repair.py captures/ repaired/
+    python batch_repair.py "captures/**/*.txt" repaired/ --workers 8 --summary report.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from json_stream import JsonStreamError, repair_file
+
+
+def find_inputs(source, pattern="*"):
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "**", pattern), recursive=True)
+        root = source
+    else:
+        paths = glob.glob(source, recursive=True)
+        root = _glob_root(source)
+    files = sorted(p for p in paths if os.path.isfile(p))
+    return root, files
+
+
+def _glob_root(pattern):
+    """The directory before the first wildcard component of a glob."""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    if parts == [""]:
+        return os.sep
+    return os.sep.join(parts) or "."
+
+
+def output_path(path, root, out_dir, suffix, keep_extension=False):
+    relative = os.path.relpath(path, root) if root else os.path.basename(path)
+    base = relative if keep_extension else os.path.splitext(relative)[0]
+    out_path = os.path.join(out_dir, base + suffix)
+    out_root = os.path.abspath(out_dir)
+    if os.path.commonpath([out_root, os.path.abspath(out_path)]) != out_root:
+        raise ValueError(f"{path}: output {out_path} falls outside {out_dir}")
+    return out_path
+
+
+def output_paths(files, root, out_dir, suffix=".json"):
+    """Output path per input; inputs that would share one keep their extension.
+
+    An output that would overwrite another input counts as a collision too.
+    """
+
+    def target(path, keep_extension):
+        out_path = output_path(path, root, out_dir, suffix, keep_extension)
+        if os.path.abspath(out_path) == os.path.abspath(path):
+            out_path = output_path(
+                path, root, out_dir, ".repaired" + suffix, keep_extension
+            )
+        return out_path
+
+    def key(out_path):
+        return os.path.normcase(os.path.abspath(out_path))
+
+    inputs = {key(path): path for path in files}
+    outputs = [target(path, False) for path in files]
+    counts = {}
+    for out_path in outputs:
+        counts[key(out_path)] = counts.get(key(out_path), 0) + 1
+    outputs = [
+        target(path, True)
+        if counts[key(out_path)] > 1 or key(out_path) in inputs
+        else out_path
+        for path, out_path in zip(files, outputs)
+    ]
+    owners = dict(inputs)
+    for path, out_path in zip(files, outputs):
+        other = owners.setdefault(key(out_path), path)
+        if other != path:
+            raise ValueError(f"{other} and {path} would both be written to {out_path}")
+    return outputs
+
+
+def repair_one(job):
+    """Worker: repairs one file and returns a result record."""
+    input_path, out_path, indent = job
+    start = time.perf_counter()
+    record = {"input": input_path, "output": out_path, "bytes": 0}
+    try:
+        record["bytes"] = os.path.getsize(input_path)
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        record["chars_out"] = repair_file(input_path, out_path, indent=indent)
+        record["status"] = "repaired"
+    except JsonStreamError as e:
+        record.update(
+            status="unrecoverable", error=str(e), offset=e.offset, context=e.context
+        )
+    except (OSError, UnicodeError, ValueError) as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def run(jobs, workers=None, chunksize=None):
+    """Yields result records as files finish, in input order."""
+    if workers == 1:
+        yield from map(repair_one, jobs)
+        return
+    workers = workers or os.cpu_count() or 1
+    # Small files finish in well under a millisecond, batch them per task
+    chunksize = chunksize or max(1, min(64, len(jobs) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(repair_one, jobs, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch repair of raw captures")
+    parser.add_argument("source", help="directory or glob of captures")
+    parser.add_argument("out_dir", help="where repaired .json files go")
+    parser.add_argument("--pattern", default="*", help="file glob inside a directory")
+    parser.add_argument("--workers", type=int, help="processes, default: all cores")
+    parser.add_argument("--indent", type=int, default=4, help="-1 for compact output")
+    parser.add_argument("--skip-existing", action="store_true")
+    parser.add_argument("--summary", help="write per-file results as JSON")
+    args = parser.parse_args()
+
+    root, files = find_inputs(args.source, args.pattern)
+    indent = None if args.indent < 0 else args.indent
+    try:
+        outputs = output_paths(files, root, args.out_dir)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    jobs = []
+    skipped = 0
+    for path, out_path in zip(files, outputs):
+        if args.skip_existing and os.path.exists(out_path):
+            skipped += 1
+            continue
+        jobs.append((path, out_path, indent))
+    print(f"{len(files)} captures, {skipped} skipped, repairing {len(jobs)}")
+
+    start = time.perf_counter()
+    results = []
+    counts = {"repaired": 0, "unrecoverable": 0, "failed": 0}
+    for record in run(jobs, args.workers):
+        results.append(record)
+        counts[record["status"]] += 1
+    elapsed = time.perf_counter() - start
+
+    total_bytes = sum(r["bytes"] for r in results)
+    print(
+        f"Repaired {counts['repaired']} | unrecoverable {counts['unrecoverable']} | "
+        f"failed {counts['failed']} in {elapsed:.2f}s "
+        f"({len(results) / elapsed if elapsed else 0:,.0f} files/s, "
+        f"{total_bytes / 1e6 / elapsed if elapsed else 0:.1f} MB/s)"
+    )
+    for record in results:
+        if record["status"] == "repaired":
+            continue
+        print(f"   ❌ {record['input']}: {record['error']}")
+        if record.get("context"):
+            print(f"      ...{record['context'][-60:]!r}")
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(
+                {"counts": counts, "seconds": elapsed, "files": results}, f, indent=1
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Micro-benchmarks for the plan JSON hot paths, with stored baselines.
+
+Synthetic roadmap captures are generated from the shape of plan.json.bak
+(the `"text"` envelope, escaped JSON, hard line breaks every 479 characters)
+at sizes from one week up to several years of days. Each case is timed on
+every size:
+
+    repair     json_stream.repair_stream on the raw capture (fix_json, unescape_json)
+    minify     compress_json.Minifier on the formatted plan
+    parse      json.loads of the formatted plan
+    load       json_stream.load_capture's path: repair + parse
+    events     json_stream.PlanEvents on the raw capture (weeks, days, fields)
+    validate   response_schema generate_roadmap validator
+    aggregate  plan_store.PlanStore build + day and week totals (needs NumPy)
+
+    python bench.py run --save before
+    python bench.py run --sizes 8,52 --cases repair,minify --save after
+    python bench.py compare before after
+    python bench.py compare before             # runs the suite now
+
+Results are kept as JSON under benchmarks/. A baseline is --runs separate
+processes (5 by default), each timing every case; the loops inside one
+process only agree with each other and say nothing about the next process,
+whose heap layout, hash seed and CPU frequency differ. `compare` therefore
+runs a one-sided Mann-Whitney U test (exact for small counts) on the
+per-run medians and flags a regression when it is significant and the
+median of those medians slowed down by more than --threshold. With 5 runs a
+side the smallest possible p is 1/252, so --alpha 0.01 asks for every run
+after to be slower than every run before; comparing a run against a copy
+of itself (A/A) reports nothing. Baselines recorded with --runs 1 cannot
+show a significant change.
+"""
+
+import argparse
+import copy
+import datetime
+import gc
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from compress_json import minify_stream
+from json_stream import iter_chunks, iter_plan_events, load_capture, repair_stream
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE = os.path.join(HERE, "plan.json.bak")
+BASELINE_DIR = os.path.join(HERE, "benchmarks")
+# Weeks per synthetic plan: one week, the real 8 weeks, a year, five years
+SIZES = (1, 8, 52, 260)
+CAPTURE_WIDTH = 479
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "Python-scripts"))
+
+
+def synthetic_plan(weeks, seed=0, template=None):
+    """A roadmap of `weeks` weeks built from the template's days and foci."""
+    template = template or load_capture(TEMPLATE)
+    rng = random.Random(seed)
+    days = [day for week in template["weeks"] for day in week["days"]]
+    foci = [week.get("focus", "") for week in template["weeks"]]
+    start = datetime.date(2026, 1, 20)
+    plan = {k: copy.deepcopy(v) for k, v in template.items() if k != "weeks"}
+    plan["weeks"] = []
+    for w in range(weeks):
+        week_days = []
+        for d in range(7):
+            number = w * 7 + d + 1
+            day = copy.deepcopy(days[(number - 1) % len(days)])
+            day["day_number"] = number
+            day["date"] = (start + datetime.timedelta(days=number - 1)).isoformat()
+            for meal in day.get("meals") or []:
+                for n in NUTRIENTS:
+                    if isinstance(meal.get(n), (int, float)):
+                        meal[n] = round(meal[n] * rng.uniform(0.9, 1.1))
+            week_days.append(day)
+        plan["weeks"].append(
+            {"week_number": w + 1, "focus": foci[w % len(foci)], "days": week_days}
+        )
+    return plan
+
+
+def capture_text(plan):
+    """The plan as the edge-function capture stores it."""
+    escaped = json.dumps(json.dumps(plan, indent=2, ensure_ascii=False), ensure_ascii=False)
+    raw = '"text": ' + escaped
+    lines = [raw[i : i + CAPTURE_WIDTH] for i in range(0, len(raw), CAPTURE_WIDTH)]
+    return "\n".join(lines) + "\n                }"
+
+
+def _fixtures(weeks, template):
+    plan = synthetic_plan(weeks, template=template)
+    pretty = json.dumps(plan, indent=4, ensure_ascii=False)
+    return {
+        "plan": plan,
+        "capture": capture_text(plan),
+        "pretty": pretty,
+        "pretty_bytes": pretty.encode("utf-8"),
+    }
+
+
+def _repair(f):
+    return "".join(repair_stream(iter_chunks(io.StringIO(f["capture"])), indent=4))
+
+
+def _minify(f):
+    return b"".join(minify_stream(iter_chunks(io.BytesIO(f["pretty_bytes"]))))
+
+
+def _parse(f):
+    return json.loads(f["pretty"])
+
+
+def _load(f):
+    return json.loads(
+        "".join(repair_stream(iter_chunks(io.StringIO(f["capture"])), indent=None))
+    )
+
+
+def _events(f):
+    return sum(1 for _ in iter_plan_events(iter_chunks(io.StringIO(f["capture"]))))
+
+
+def _validator():
+    from response_schema import VALIDATORS
+
+    validator = VALIDATORS["generate_roadmap"]
+    return lambda f: validator.errors(f["plan"])
+
+
+def _aggregator():
+    from plan_store import PlanStore
+
+    def aggregate(f):
+        store = PlanStore.from_plans([f["plan"]])
+        return store.day_totals(), store.week_totals()
+
+    return aggregate
+
+
+# case -> (factory returning fn(fixtures), name of the input measured in bytes)
+CASES = {
+    "repair": (lambda: _repair, "capture"),
+    "minify": (lambda: _minify, "pretty_bytes"),
+    "parse": (lambda: _parse, "pretty"),
+    "load": (lambda: _load, "capture"),
+    "events": (lambda: _events, "capture"),
+    "validate": (_validator, "pretty"),
+    "aggregate": (_aggregator, "pretty"),
+}
+
+
+def _loops(fn, arg, min_time):
+    """Loops per sample so that one sample takes at least min_time."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn(arg)
+        if time.perf_counter() - start >= min_time or loops >= 1 << 20:
+            return loops
+        loops *= 2
+
+
+def measure(fn, arg, repeat=15, min_time=0.02):
+    """Per-loop seconds for `repeat` samples, with the GC off as timeit does."""
+    loops = _loops(fn, arg, min_time)
+    samples = []
+    enabled = gc.isenabled()
+    # Start every case from a collected heap, not the previous case's garbage
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn(arg)
+            samples.append((time.perf_counter() - start) / loops)
+    finally:
+        if enabled:
+            gc.enable()
+    return samples, loops
+
+
+def run(cases=tuple(CASES), sizes=SIZES, repeat=15, min_time=0.02, log=print):
+    template = load_capture(TEMPLATE)
+    results = {}
+    for weeks in sizes:
+        fixtures = _fixtures(weeks, template)
+        for case in cases:
+            factory, measured = CASES[case]
+            try:
+                fn = factory()
+            except ImportError as e:
+                log(f"   {case:<10} skipped: {e}")
+                continue
+            samples, loops = measure(fn, fixtures, repeat, min_time)
+            size = len(fixtures[measured])
+            median = statistics.median(samples)
+            results[f"{case}/{weeks}w"] = {
+                "case": case,
+                "weeks": weeks,
+                "bytes": size,
+                "loops": loops,
+                "samples": samples,
+                "median": median,
+                "mean": statistics.fmean(samples),
+                "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+                "mb_per_s": size / 1e6 / median if median else 0.0,
+            }
+            log(
+                f"   {case:<10}{weeks:>5}w {size / 1e3:>10,.0f} kB "
+                f"{1000 * median:>10.3f} ms  {size / 1e6 / median:>8.1f} MB/s"
+            )
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def run_isolated(cases, sizes, repeat, min_time, runs, log=print):
+    """`runs` suite runs, each in a fresh interpreter, merged into one report."""
+    reports = []
+    for index in range(runs):
+        log(f"   run {index + 1}/{runs}")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.json")
+            subprocess.run(
+                [
+                    sys.executable, os.path.abspath(__file__), "run", "--runs", "1",
+                    "--cases", ",".join(cases), "--sizes", ",".join(map(str, sizes)),
+                    "--repeat", str(repeat), "--min-time", str(min_time),
+                    "--save", path,
+                ],
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            reports.append(load(path))
+    merged = dict(reports[0], runs=runs)
+    merged["results"] = {}
+    for key, first in reports[0]["results"].items():
+        medians = [r["results"][key]["median"] for r in reports if key in r["results"]]
+        median = statistics.median(medians)
+        merged["results"][key] = dict(
+            first,
+            run_medians=medians,
+            samples=[v for r in reports for v in r["results"][key]["samples"]],
+            median=median,
+            mb_per_s=first["bytes"] / 1e6 / median if median else 0.0,
+        )
+        log(
+            f"   {first['case']:<10}{first['weeks']:>5}w {first['bytes'] / 1e3:>10,.0f} kB "
+            f"{1000 * median:>10.3f} ms  spread {100 * (max(medians) / min(medians) - 1):.0f}%"
+        )
+    return merged
+
+
+def baseline_path(name):
+    if os.sep in name or name.endswith(".json"):
+        return name
+    return os.path.join(BASELINE_DIR, name + ".json")
+
+
+def save(report, name):
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    return path
+
+
+def load(name):
+    with open(baseline_path(name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _exact_greater(after, before):
+    """Exact one-sided Mann-Whitney p-value by enumerating rank assignments."""
+    pooled = list(before) + list(after)
+    everyone = range(len(pooled))
+
+    def u_stat(group):
+        others = [j for j in everyone if j not in group]
+        return sum(
+            1.0 if pooled[i] > pooled[j] else 0.5 if pooled[i] == pooled[j] else 0.0
+            for i in group
+            for j in others
+        )
+
+    observed = u_stat(set(range(len(before), len(pooled))))
+    groups = list(itertools.combinations(everyone, len(after)))
+    return sum(u_stat(set(g)) >= observed - 1e-9 for g in groups) / len(groups)
+
+
+def mann_whitney_greater(after, before):
+    """One-sided p-value that `after` tends to be larger than `before`.
+
+    Exact for small samples (up to 20000 rank assignments), otherwise the
+    normal approximation with tie correction.
+    """
+    if not after or not before:
+        return 1.0
+    if math.comb(len(after) + len(before), len(after)) <= 20000:
+        return _exact_greater(list(after), list(before))
+    pooled = sorted([(v, 0) for v in before] + [(v, 1) for v in after])
+    ranks = [0.0] * len(pooled)
+    tie_term = 0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        tie_term += t**3 - t
+        i = j + 1
+    n1, n2 = len(after), len(before)
+    rank_sum = sum(r for r, (_, group) in zip(ranks, pooled) if group == 1)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(before, after, alpha=0.01, threshold=0.05):
+    """Rows of (key, before median, after median, ratio, p, verdict).
+
+    The test runs on per-run medians; loops within one run are not
+    independent samples of the code's speed.
+    """
+    rows = []
+    for key, old in before["results"].items():
+        new = after["results"].get(key)
+        if new is None:
+            continue
+        ratio = new["median"] / old["median"] if old["median"] else float("inf")
+        old_runs = old.get("run_medians") or [old["median"]]
+        new_runs = new.get("run_medians") or [new["median"]]
+        p_slower = mann_whitney_greater(new_runs, old_runs)
+        p_faster = mann_whitney_greater(old_runs, new_runs)
+        if p_slower < alpha and ratio > 1 + threshold:
+            verdict, p = "REGRESSION", p_slower
+        elif p_faster < alpha and ratio < 1 / (1 + threshold):
+            verdict, p = "faster", p_faster
+        else:
+            verdict, p = "", min(p_slower, p_faster)
+        rows.append((key, old["median"], new["median"], ratio, p, verdict))
+    return rows
+
+
+def _int_list(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+def _run(args, cases, sizes):
+    if args.runs > 1:
+        return run_isolated(cases, sizes, args.repeat, args.min_time, args.runs)
+    return dict(run(cases, sizes, args.repeat, args.min_time), runs=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan JSON micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("run", "compare"):
+        p = commands.add_parser(name)
+        if name == "compare":
+            p.add_argument("before", help="baseline name or path")
+            p.add_argument("after", nargs="?", help="default: run the suite now")
+            p.add_argument("--alpha", type=float, default=0.01)
+            p.add_argument(
+                "--threshold", type=float, default=0.05,
+                help="smallest median slowdown reported, 0.05 = 5%%",
+            )
+        p.add_argument("--cases", default=",".join(CASES))
+        p.add_argument("--sizes", type=_int_list, default=SIZES, help="weeks, e.g. 1,8,52")
+        p.add_argument("--repeat", type=int, default=15, help="samples per case and run")
+        p.add_argument(
+            "--runs", type=int, default=5, help="separate processes per baseline"
+        )
+        p.add_argument("--min-time", type=float, default=0.02, help="seconds per sample")
+        p.add_argument("--save", help="store the run under this baseline name")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    if args.command == "compare":
+        before = load(args.before)
+        if args.after:
+            after = load(args.after)
+        else:
+            keys = before["results"].values()
+            sizes = sorted({r["weeks"] for r in keys if r["weeks"] in args.sizes})
+            cases = [c for c in cases if any(r["case"] == c for r in keys)]
+            after = _run(args, cases, sizes)
+    else:
+        after = _run(args, cases, args.sizes)
+    if args.save:
+        print(f"Saved {save(after, args.save)}")
+    if args.command == "run":
+        return
+
+    if before.get("python") != after.get("python") or before.get("machine") != after.get("machine"):
+        print(
+            f"⚠️ Comparing {before.get('python')}/{before.get('machine')} against "
+            f"{after.get('python')}/{after.get('machine')}"
+        )
+    single = [r for r in (before, after) if r.get("runs", 1) < 3]
+    if single:
+        print("⚠️ Fewer than 3 runs on a side, no change can be significant; use --runs 5")
+    rows = compare(before, after, args.alpha, args.threshold)
+    print(f"\n   {'case':<16}{'before ms':>12}{'after ms':>12}{'change':>9}{'p':>10}")
+    for key, old, new, ratio, p, verdict in rows:
+        print(
+            f"   {key:<16}{1000 * old:>12.3f}{1000 * new:>12.3f}"
+            f"{100 * (ratio - 1):>+8.1f}%{p:>10.2g}  {verdict}"
+        )
+    regressions = [row for row in rows if row[5] == "REGRESSION"]
+    print(f"\n{len(regressions)} regressions in {len(rows)} cases")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,222 @@
+"""
+Streaming JSON minifier for plan captures.
+
+Input is read in fixed-size byte chunks and only whitespace outside string
+values is dropped, so text inside strings survives byte for byte and memory
+use does not grow with the file. JSON's structural characters are ASCII and
+never appear inside a UTF-8 multibyte sequence, so the bytes are never
+decoded. Raw edge-function captures (escaped `"text"` envelope, hard line
+breaks) go through json_stream.repair_stream instead with `--repair`.
+
+    python compress_json.py plan.json plan.min.json
+    python compress_json.py plan.json.bak plan.min.json.gz --repair
+    python compress_json.py plan.json plan.min.json.zst   # needs zstandard
+"""
+
+import argparse
+import codecs
+import gzip
 import os
+import re
+import shutil
+import tempfile
+import time
+
+from json_stream import CHUNK_SIZE, JsonStreamError, iter_chunks, repair_stream
+
+_WHITESPACE = b" \t\r\n"
+_STRING_STOP = re.compile(rb'["\\]')
+
+
+class Minifier:
+    """Drops insignificant whitespace from a stream of JSON bytes."""
+
+    def __init__(self):
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        out = []
+        i = 0
+        length = len(chunk)
+        if self._escape and length:
+            # Second byte of an escape split across chunks
+            out.append(chunk[:1])
+            self._escape = False
+            i = 1
+        while i < length:
+            if self._in_string:
+                match = _STRING_STOP.search(chunk, i)
+                if match is None:
+                    out.append(chunk[i:])
+                    break
+                j = match.start()
+                if chunk[j] == 0x5C:  # backslash
+                    if j + 1 >= length:
+                        out.append(chunk[i:])
+                        self._escape = True
+                        break
+                    out.append(chunk[i : j + 2])
+                    i = j + 2
+                    continue
+                out.append(chunk[i : j + 1])
+                self._in_string = False
+                i = j + 1
+            else:
+                j = chunk.find(b'"', i)
+                if j == -1:
+                    out.append(chunk[i:].translate(None, _WHITESPACE))
+                    break
+                out.append(chunk[i : j + 1].translate(None, _WHITESPACE))
+                self._in_string = True
+                i = j + 1
+        return b"".join(out)
+
+
+def minify_stream(chunks):
+    minifier = Minifier()
+    for chunk in chunks:
+        data = minifier.feed(chunk)
+        if data:
+            yield data
+
+
+def _repaired(chunks, on_trailing=None):
+    # repair_stream works on text; re-encode its compact output. The
+    # incremental decoder keeps multibyte characters split across chunks.
+    def text():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for chunk in chunks:
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    for part in repair_stream(text(), indent=None, on_trailing=on_trailing):
+        yield part.encode("utf-8")
+
+
+def compression_for(path):
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
 
 
-def compress_json(input_path, output_path):
+def _open_writer(raw, compression, level):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level or 6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd output needs the zstandard package") from None
+        return zstandard.ZstdCompressor(level=level or 3).stream_writer(
+            raw, closefd=False
+        )
+    return None
+
+
+def minify_file(
+    input_path, output_path, compression=None, level=None, repair=False,
+    chunk_size=CHUNK_SIZE,
+):
+    """Minifies input_path into output_path and returns byte counts and timing.
+
+    The output goes to a temp file that replaces output_path at the end, so
+    overwriting the input is safe. With `repair`, data after the document is
+    dropped and reported in stats["trailing"] as (offset, first characters).
+    """
+    stats = {"bytes_in": 0, "bytes_minified": 0, "bytes_out": 0}
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    start = time.perf_counter()
+    try:
+        with open(input_path, "rb") as src, os.fdopen(fd, "wb") as raw:
+            def counted():
+                for chunk in iter_chunks(src, chunk_size):
+                    stats["bytes_in"] += len(chunk)
+                    yield chunk
+
+            writer = _open_writer(raw, compression, level)
+            sink = writer or raw
+            def trailing(offset, text):
+                stats["trailing"] = (offset, text)
+
+            if repair:
+                stream = _repaired(counted(), trailing)
+            else:
+                stream = minify_stream(counted())
+            for data in stream:
+                stats["bytes_minified"] += len(data)
+                sink.write(data)
+            if writer is not None:
+                writer.close()
+            stats["bytes_out"] = raw.tell()
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def compress_json(input_path, output_path, compression=None, level=None, repair=False):
     try:
         if not os.path.exists(input_path):
             print(f"Error: {input_path} does not exist.")
             return
 
-        with open(input_path, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
-
-        # Remove newline characters and join into a single string
-        # We also strip trailing spaces from each line to prevent extra spaces within strings/keys
-        compressed = "".join(line.strip() for line in lines)
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(compressed)
+        if compression is None:
+            compression = compression_for(output_path)
+        stats = minify_file(input_path, output_path, compression, level, repair)
+        mb_per_s = stats["bytes_in"] / 1e6 / stats["seconds"] if stats["seconds"] else 0
 
         print(f"Successfully compressed {input_path} to {output_path}")
-        print(f"Original line count: {len(lines)}")
-        print("Resulting file is a single line.")
+        print(
+            f"Bytes in {stats['bytes_in']:,} -> minified {stats['bytes_minified']:,}"
+            + (f" -> {compression} {stats['bytes_out']:,}" if compression else "")
+            + f" ({100 * stats['bytes_out'] / max(1, stats['bytes_in']):.1f}%)"
+        )
+        print(f"Throughput {mb_per_s:.1f} MB/s in {1000 * stats['seconds']:.1f} ms")
+        if "trailing" in stats:
+            offset, text = stats["trailing"]
+            print(
+                f"Warning: ignored data after the JSON document at offset {offset}: "
+                f"{text[:40]!r}"
+            )
+        return stats
 
+    except JsonStreamError as e:
+        print(f"Failed to repair capture: {e}")
+        print(f"Error context: {e.context}")
     except Exception as e:
         print(f"An error occurred: {e}")
 
 
-if __name__ == "__main__":
-    input_file = r"c:\Users\rejit\Development\react_native\vital-quest\vital-quest-app\reference\plan.json"
-    output_file = r"c:\Users\rejit\Development\react_native\vital-quest\vital-quest-app\reference\plan.json"  # Overwriting as requested
+def main():
+    default = r"c:\Users\rejit\Development\react_native\vital-quest\vital-quest-app\reference\plan.json"
+    parser = argparse.ArgumentParser(description="Minify JSON plan captures")
+    parser.add_argument("input", nargs="?", default=default)
+    parser.add_argument("output", nargs="?", help="defaults to overwriting input")
+    parser.add_argument(
+        "--compress", choices=("gzip", "zstd"), help="defaults to the output suffix"
+    )
+    parser.add_argument("--level", type=int, help="compression level")
+    parser.add_argument(
+        "--repair", action="store_true", help="input is a raw edge-function capture"
+    )
+    parser.add_argument("--no-backup", action="store_true")
+    args = parser.parse_args()
 
+    output = args.output or args.input  # Overwriting as requested
     # Let's create a backup first just in case
-    backup_file = r"c:\Users\rejit\Development\react_native\vital-quest\vital-quest-app\reference\plan.json.bak"
-    if os.path.exists(input_file):
-        import shutil
-
-        shutil.copy2(input_file, backup_file)
+    if output == args.input and not args.no_backup and os.path.exists(args.input):
+        backup_file = args.input + ".bak"
+        shutil.copy2(args.input, backup_file)
         print(f"Backup created at {backup_file}")
 
-    compress_json(input_file, output_file)
+    compress_json(args.input, output, args.compress, args.level, args.repair)
+
+
+if __name__ == "__main__":
+    main()
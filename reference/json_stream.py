@@ -0,0 +1,674 @@
+"""
+Single-pass streaming repair for captured edge-function responses.
+
+A raw capture looks like `"text": "{\n  \"goal_summary\": ...}"` with hard line
+breaks inserted every few hundred characters, which can split tokens and
+escape sequences (a `\` at the end of one line and a lone `n` on the next).
+The pipeline below undoes all of that in one pass over fixed-size chunks:
+
+    raw chunks -> LineFilter -> EnvelopeDecoder -> JsonFormatter -> output
+
+Memory use is bounded by the chunk size plus the longest single token, and
+non-ASCII text is passed through untouched. PlanEvents runs the same first
+two stages and yields each week, day and day_1_tasks object as soon as it
+closes, for clients that want Day 1 before the rest of the plan arrives.
+"""
+
+import codecs
+import json
+import os
+import re
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+_NEWLINE = re.compile(r"[\r\n]")
+_ENVELOPE = re.compile(r'\{?\s*"text"\s*:\s*"')
+# Enough non-whitespace characters to tell an envelope from raw JSON
+_PREFIX_LEN = 16
+# A line longer than this can't be a stray "n" artifact, stop holding it back
+_MAX_HELD_LINE = 4096
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonStreamError(ValueError):
+    def __init__(self, message, offset, context=""):
+        super().__init__(f"{message} at offset {offset}")
+        self.offset = offset
+        self.context = context
+
+
+class LineFilter:
+    """Drops capture line breaks and standalone `n` lines.
+
+    A lone `n` directly after a line ending in an odd run of backslashes is
+    the second half of a split `\\n` escape, so it is kept.
+    """
+
+    def __init__(self):
+        self._held = ""
+        self._holding = True
+        self._odd_backslash = False
+        self._line_after_backslash = False
+
+    def _emit(self, text, out):
+        if not text:
+            return
+        out.append(text)
+        run = len(text) - len(text.rstrip("\\"))
+        if run == len(text):
+            self._odd_backslash ^= run % 2 == 1
+        else:
+            self._odd_backslash = run % 2 == 1
+
+    def _end_line(self, out):
+        if self._holding and not (
+            self._held.strip() == "n" and not self._line_after_backslash
+        ):
+            self._emit(self._held, out)
+        self._held = ""
+        self._holding = True
+        self._line_after_backslash = self._odd_backslash
+
+    def feed(self, chunk):
+        out = []
+        for index, part in enumerate(_NEWLINE.split(chunk)):
+            if index:
+                self._end_line(out)
+            if not self._holding:
+                self._emit(part, out)
+                continue
+            self._held += part
+            if (
+                self._held.strip() not in ("", "n")
+                or len(self._held) > _MAX_HELD_LINE
+            ):
+                self._holding = False
+                held, self._held = self._held, ""
+                self._emit(held, out)
+        return "".join(out)
+
+    def close(self):
+        out = []
+        self._end_line(out)
+        return "".join(out)
+
+
+class EnvelopeDecoder:
+    """Unwraps the `"text": "..."` envelope and undoes one level of escaping.
+
+    Input that is already bare JSON is passed through unchanged.
+    """
+
+    def __init__(self):
+        self._prefix = ""
+        self._mode = None  # None until detected, then "envelope" or "raw"
+        self._tail = ""
+        self.done = False
+
+    def _detect(self, final):
+        stripped = self._prefix.lstrip()
+        if not final and len(stripped) < _PREFIX_LEN:
+            return None
+        match = _ENVELOPE.match(stripped)
+        if match:
+            self._mode = "envelope"
+            rest = stripped[match.end() :]
+        elif stripped.startswith('"'):
+            self._mode = "envelope"
+            rest = stripped[1:]
+        else:
+            self._mode = "raw"
+            rest = self._prefix
+        self._prefix = ""
+        return rest
+
+    def _unescape(self, text):
+        out = []
+        text = self._tail + text
+        self._tail = ""
+        i = 0
+        length = len(text)
+        while i < length:
+            quote = text.find('"', i)
+            slash = text.find("\\", i)
+            if slash == -1 or (quote != -1 and quote < slash):
+                if quote == -1:
+                    out.append(text[i:])
+                    break
+                out.append(text[i:quote])
+                self.done = True
+                break
+            out.append(text[i:slash])
+            if slash + 1 >= length:
+                self._tail = text[slash:]
+                break
+            code = text[slash + 1]
+            if code != "u":
+                out.append(_SIMPLE_ESCAPES.get(code, code))
+                i = slash + 2
+                continue
+            if slash + 6 > length:
+                self._tail = text[slash:]
+                break
+            try:
+                point = int(text[slash + 2 : slash + 6], 16)
+            except ValueError:
+                out.append(text[slash + 1 : slash + 6])
+                i = slash + 6
+                continue
+            i = slash + 6
+            if 0xD800 <= point < 0xDC00:
+                # High surrogate, the low half may still be in the next chunk
+                if length - i < 6 and "\\u".startswith(text[i : i + 2]):
+                    self._tail = text[slash:]
+                    break
+                if text.startswith("\\u", i):
+                    try:
+                        low = int(text[i + 2 : i + 6], 16)
+                    except ValueError:
+                        low = 0
+                    if 0xDC00 <= low < 0xE000:
+                        point = 0x10000 + ((point - 0xD800) << 10) + (low - 0xDC00)
+                        i += 6
+            if 0xD800 <= point < 0xE000:
+                point = 0xFFFD
+            out.append(chr(point))
+        return "".join(out)
+
+    def feed(self, chunk):
+        if self.done:
+            return ""
+        if self._mode is None:
+            self._prefix += chunk
+            chunk = self._detect(final=False)
+            if chunk is None:
+                return ""
+        if self._mode == "raw":
+            return chunk
+        return self._unescape(chunk)
+
+    def close(self):
+        if self._mode is None:
+            rest = self._detect(final=True)
+            if self._mode == "raw":
+                return rest
+            return self._unescape(rest)
+        return ""
+
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_SCALAR_END = re.compile(r'[ \t\r\n,:\[\]{}"]')
+_SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_CONTROL_ESCAPES = {"\b": "\\b", "\f": "\\f", "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+# Parser expectations
+_VALUE = "value"
+_VALUE_OR_END = "value_or_end"
+_KEY = "key"
+_KEY_OR_END = "key_or_end"
+_COLON = "colon"
+_COMMA_OR_END = "comma_or_end"
+_DONE = "done"
+
+
+class JsonFormatter:
+    """Validates a JSON text token by token and re-emits it.
+
+    `indent=None` gives compact output, an int gives `json.dump`-style
+    indentation. String contents and numbers are copied verbatim, raw control
+    characters inside strings are escaped and a trailing comma before a
+    closing bracket is dropped. Non-whitespace after the document is not
+    parsed; its offset and first characters go to `trailing_at`/`trailing`.
+    """
+
+    def __init__(self, indent=4):
+        self.indent = indent
+        self._stack = []
+        self._expect = _VALUE
+        self._in_string = False
+        self._string_is_key = False
+        self._escape_tail = ""
+        self._scalar = ""
+        self._after_open = False
+        self._pending_comma = False
+        self._offset = 0
+        self._recent = ""
+        self._chunk = ""
+        self.trailing_at = None
+        self.trailing = ""
+
+    @property
+    def complete(self):
+        return self._expect == _DONE
+
+    def _error(self, message, position):
+        offset = self._offset + position
+        context = (self._recent + self._chunk[:position])[-80:]
+        raise JsonStreamError(message, offset, context)
+
+    def _newline(self, depth):
+        if self.indent is None:
+            return ""
+        return "\n" + " " * (self.indent * depth)
+
+    def _before_token(self, out):
+        if self._pending_comma:
+            out.append(",")
+            self._pending_comma = False
+            out.append(self._newline(len(self._stack)))
+        elif self._after_open:
+            out.append(self._newline(len(self._stack)))
+        self._after_open = False
+
+    def _value_done(self):
+        self._expect = _COMMA_OR_END if self._stack else _DONE
+
+    def _start_value(self, position):
+        if self._expect == _DONE:
+            self._error("Unexpected data after JSON document", position)
+        if self._expect not in (_VALUE, _VALUE_OR_END):
+            self._error(f"Expected {self._expect}, found value", position)
+
+    def _finish_scalar(self, out, position):
+        if not _SCALAR.fullmatch(self._scalar):
+            self._error(f"Invalid literal {self._scalar[:20]!r}", position)
+        self._before_token(out)
+        out.append(self._scalar)
+        self._scalar = ""
+        self._value_done()
+
+    def _scan_string(self, chunk, i, out):
+        length = len(chunk)
+        while i < length:
+            match = _STRING_SPECIAL.search(chunk, i)
+            if match is None:
+                out.append(chunk[i:])
+                return length
+            j = match.start()
+            out.append(chunk[i:j])
+            char = chunk[j]
+            if char == '"':
+                out.append('"')
+                self._in_string = False
+                if self._string_is_key:
+                    self._expect = _COLON
+                else:
+                    self._value_done()
+                return j + 1
+            if char == "\\":
+                if j + 1 >= length:
+                    self._escape_tail = "\\"
+                    return length
+                out.append(chunk[j : j + 2])
+                i = j + 2
+                continue
+            out.append(_CONTROL_ESCAPES.get(char, "\\u%04x" % ord(char)))
+            i = j + 1
+        return i
+
+    def feed(self, chunk):
+        out = []
+        i = 0
+        length = len(chunk)
+        self._chunk = chunk
+        if self._escape_tail and chunk:
+            out.append(self._escape_tail + chunk[0])
+            self._escape_tail = ""
+            i = 1
+        while i < length:
+            if self._in_string:
+                i = self._scan_string(chunk, i, out)
+                continue
+            if self._scalar:
+                match = _SCALAR_END.search(chunk, i)
+                end = match.start() if match else length
+                self._scalar += chunk[i:end]
+                i = end
+                if match is None:
+                    break
+                self._finish_scalar(out, i)
+                continue
+            i = _WHITESPACE.match(chunk, i).end()
+            if i >= length:
+                break
+            if self._expect == _DONE:
+                if self.trailing_at is None:
+                    self.trailing_at = self._offset + i
+                else:
+                    i = 0
+                self.trailing += chunk[i : i + 80 - len(self.trailing)]
+                break
+            char = chunk[i]
+            if char == '"':
+                if self._expect in (_KEY, _KEY_OR_END):
+                    self._string_is_key = True
+                else:
+                    self._start_value(i)
+                    self._string_is_key = False
+                self._before_token(out)
+                out.append('"')
+                self._in_string = True
+                i += 1
+            elif char in "{[":
+                self._start_value(i)
+                self._before_token(out)
+                out.append(char)
+                self._stack.append(char)
+                self._expect = _KEY_OR_END if char == "{" else _VALUE_OR_END
+                self._after_open = True
+                i += 1
+            elif char in "}]":
+                opener = "{" if char == "}" else "["
+                if not self._stack or self._stack[-1] != opener:
+                    self._error(f"Unexpected {char!r}", i)
+                allowed = (_COMMA_OR_END, _KEY_OR_END, _VALUE_OR_END)
+                if self._expect not in allowed and not self._pending_comma:
+                    self._error(f"Expected {self._expect}, found {char!r}", i)
+                # Trailing comma repair
+                self._pending_comma = False
+                self._stack.pop()
+                if not self._after_open:
+                    out.append(self._newline(len(self._stack)))
+                self._after_open = False
+                out.append(char)
+                self._value_done()
+                i += 1
+            elif char == ",":
+                if self._expect != _COMMA_OR_END:
+                    self._error("Unexpected ','", i)
+                self._pending_comma = True
+                self._expect = _KEY if self._stack[-1] == "{" else _VALUE
+                i += 1
+            elif char == ":":
+                if self._expect != _COLON:
+                    self._error("Unexpected ':'", i)
+                out.append(": " if self.indent is not None else ":")
+                self._expect = _VALUE
+                i += 1
+            else:
+                self._start_value(i)
+                self._scalar = char
+                i += 1
+        self._offset += length
+        self._recent = (self._recent + chunk)[-80:]
+        return "".join(out)
+
+    def close(self):
+        out = []
+        self._chunk = ""
+        if self._scalar:
+            self._finish_scalar(out, 0)
+        if self._in_string:
+            self._error("Unterminated string", 0)
+        if self._expect != _DONE:
+            self._error("Unexpected end of JSON document", 0)
+        return "".join(out)
+
+
+def iter_chunks(handle, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def repair_stream(chunks, indent=4, on_trailing=None):
+    """Yields repaired JSON text for an iterable of raw capture chunks.
+
+    All of the input is read. Non-whitespace after the document (after the
+    `"text"` string for an envelope) raises JsonStreamError, or is passed to
+    `on_trailing(offset, text)` when given.
+    """
+    line_filter = LineFilter()
+    decoder = EnvelopeDecoder()
+    formatter = JsonFormatter(indent=indent)
+    for chunk in chunks:
+        text = formatter.feed(decoder.feed(line_filter.feed(chunk)))
+        if text:
+            yield text
+    tail = decoder.feed(line_filter.close()) + decoder.close()
+    text = formatter.feed(tail) + formatter.close()
+    if text:
+        yield text
+    if formatter.trailing_at is not None:
+        if on_trailing is None:
+            raise JsonStreamError(
+                "Unexpected data after JSON document",
+                formatter.trailing_at,
+                formatter.trailing,
+            )
+        on_trailing(formatter.trailing_at, formatter.trailing)
+
+
+def write_atomic(output_path, chunks, encoding="utf-8"):
+    """Streams text chunks to a temp file next to output_path, then renames it.
+
+    Returns the number of characters written. The output is left untouched
+    if anything fails, which makes `input_path == output_path` safe.
+    """
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    written = 0
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return written
+
+
+def repair_file(input_path, output_path, indent=4, chunk_size=CHUNK_SIZE):
+    """Repairs a raw capture into valid JSON. Returns characters written."""
+    with open(input_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        return write_atomic(
+            output_path, repair_stream(iter_chunks(f, chunk_size), indent=indent)
+        )
+
+
+def load_capture(path, chunk_size=CHUNK_SIZE):
+    """Parses a raw capture or a plain JSON file into Python objects."""
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        return json.loads(
+            "".join(repair_stream(iter_chunks(f, chunk_size), indent=None))
+        )
+
+
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_STRING_STOP = re.compile(r'["\\]')
+# Arrays whose items are plan weeks, in the full and the prompt's shape
+_WEEK_ARRAYS = ("weeks", "weekly_plans")
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Same repairs as the formatter applies (trailing commas, raw controls)
+        formatter = JsonFormatter(indent=None)
+        return json.loads(formatter.feed(text) + formatter.close())
+
+
+class PlanEvents:
+    """Incremental roadmap parser that yields objects as soon as they close.
+
+    Takes the response body (or a raw capture) as bytes or text chunks,
+    unwraps the `"text"` envelope on the way and returns events from every
+    `feed`:
+
+        ("field", ("goal_summary",), "...")          top-level values
+        ("week", ("weeks", 0), {...})                weeks[i], weekly_plans[i]
+        ("day", ("weeks", 0, "days", 2), {...})      weeks[i].days[j]
+        ("day_1_tasks", ("day_1_tasks",), {...})
+
+    Only the objects being watched are buffered, so memory is bounded by the
+    largest week (the largest day with `weeks=False`) rather than the plan.
+    A truncated body still yields everything that closed before the cut;
+    `close()` then sets `truncated` instead of raising.
+    """
+
+    def __init__(self, weeks=True, max_object=1 << 20):
+        self.weeks = weeks
+        self.max_object = max_object
+        self.done = False
+        self.truncated = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._lines = LineFilter()
+        self._envelope = EnvelopeDecoder()
+        self._stack = []  # [opener, current key or index]
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._key = None  # parts of the object key being read
+        self._recorders = []  # [depth, kind, path, parts, start, size]
+        self._field = None  # top-level value, ends at the next delimiter
+
+    def _kind(self, path):
+        if len(path) == 2 and path[0] in _WEEK_ARRAYS and self.weeks:
+            return "week"
+        if len(path) == 4 and path[0] == "weeks" and path[2] == "days":
+            return "day"
+        return None
+
+    def _finish(self, recorder, text, end, events):
+        depth, kind, path, parts, start, _ = recorder
+        parts.append(text[start:end])
+        value = "".join(parts).strip()
+        if value:
+            events.append((kind, path, _loads(value)))
+
+    def _scan(self, text, events):
+        i = 0
+        length = len(text)
+        while i < length and not self.done:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    if self._key is not None:
+                        self._key.append(text[i])
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(text, i)
+                end = match.start() if match else length
+                if self._key is not None:
+                    self._key.append(text[i:end])
+                if match is None:
+                    break
+                if text[end] == "\\":
+                    if self._key is not None:
+                        self._key.append("\\")
+                    self._escape = True
+                    i = end + 1
+                    continue
+                self._in_string = False
+                if self._key is not None:
+                    self._stack[-1][1] = json.loads('"' + "".join(self._key) + '"')
+                    self._key = None
+                i = end + 1
+                continue
+
+            match = _STRUCTURAL.search(text, i)
+            if match is None:
+                break
+            i = match.start()
+            char = text[i]
+            if char == '"':
+                self._in_string = True
+                if self._expect_key:
+                    self._expect_key = False
+                    self._key = []
+            elif char in "{[":
+                path = tuple(frame[1] for frame in self._stack)
+                kind = self._kind(path)
+                if kind is not None and char == "{":
+                    self._recorders.append([len(self._stack), kind, path, [], i, 0])
+                self._stack.append([char, None if char == "{" else 0])
+                self._expect_key = char == "{"
+            elif char in "}]":
+                if len(self._stack) == 1 and self._field is not None:
+                    # Scalar or string as the last top-level value
+                    self._finish(self._field, text, i, events)
+                    self._field = None
+                if not self._stack:
+                    raise JsonStreamError(f"Unexpected {char!r}", i)
+                self._stack.pop()
+                depth = len(self._stack)
+                while self._recorders and self._recorders[-1][0] == depth:
+                    self._finish(self._recorders.pop(), text, i + 1, events)
+                if depth == 1 and self._field is not None:
+                    self._finish(self._field, text, i + 1, events)
+                    self._field = None
+                self._expect_key = False
+                if not self._stack:
+                    self.done = True
+            elif char == ",":
+                if len(self._stack) == 1 and self._field is not None:
+                    self._finish(self._field, text, i, events)
+                    self._field = None
+                if self._stack and self._stack[-1][0] == "{":
+                    self._expect_key = True
+                elif self._stack:
+                    self._stack[-1][1] += 1
+            elif char == ":" and len(self._stack) == 1 and self._stack[0][0] == "{":
+                key = self._stack[0][1]
+                if key not in _WEEK_ARRAYS:
+                    kind = "day_1_tasks" if key == "day_1_tasks" else "field"
+                    self._field = [1, kind, (key,), [], i + 1, 0]
+            i += 1
+
+        # Keep the unfinished part of every watched object
+        for recorder in self._recorders + ([self._field] if self._field else []):
+            piece = text[recorder[4]:]
+            recorder[3].append(piece)
+            recorder[4] = 0
+            recorder[5] += len(piece)
+            if recorder[5] > self.max_object:
+                raise JsonStreamError(
+                    f"{recorder[1]} at {recorder[2]} is larger than {self.max_object} characters",
+                    0,
+                )
+
+    def feed(self, chunk):
+        """Returns the events completed by this chunk."""
+        if self.done:
+            return []
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        events = []
+        self._scan(self._envelope.feed(self._lines.feed(chunk)), events)
+        return events
+
+    def close(self):
+        events = []
+        if not self.done:
+            tail = self._decoder.decode(b"", final=True)
+            text = self._envelope.feed(self._lines.feed(tail) + self._lines.close())
+            self._scan(text + self._envelope.close(), events)
+        self.truncated = not self.done
+        self._recorders = []
+        self._field = None
+        return events
+
+
+def iter_plan_events(chunks, weeks=True):
+    """Yields PlanEvents events for an iterable of byte or text chunks."""
+    parser = PlanEvents(weeks=weeks)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -0,0 +1,261 @@
+"""
+Indexed binary archive for generated roadmap plans.
+
+Each day of a plan is stored as its own zlib-compressed compact JSON blob,
+with a fixed-width index at the end of the file. The reader mmaps the file
+and only decompresses the slice it is asked for, so pulling Day 1 of Week 6
+costs the same on a 2-week plan as on a 52-week one.
+
+Layout (little endian):
+
+    header   magic "VQPLAN1\\0", version u16, flags u16, weeks u32,
+             week index offset u64, day index offset u64, plan meta offset
+             u64, plan meta length u32
+    blobs    plan meta, then per week: week meta, day 1 .. day N
+    index    weeks x (meta offset u64, meta length u32, first day u32,
+             day count u32), days x (offset u64, length u32)
+
+Plans in the prompt's shape (`weekly_plans` + `day_1_tasks`) are indexed the
+same way: each weekly_plans entry is a week, and day_1_tasks is Day 1 of
+Week 1. FLAG_PROMPT_SHAPE makes `plan()` rebuild that shape.
+
+    python plan_archive.py pack plan.json.bak plan.vqp
+    python plan_archive.py get plan.vqp --week 6 --day 1
+    python plan_archive.py unpack plan.vqp plan.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from json_stream import load_capture
+
+MAGIC = b"VQPLAN1\0"
+VERSION = 1
+FLAG_ZLIB = 1
+FLAG_PROMPT_SHAPE = 2
+
+_HEADER = struct.Struct("<8sHHIQQQI")
+_WEEK_ENTRY = struct.Struct("<QIII")
+_DAY_ENTRY = struct.Struct("<QI")
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _pack(obj, compress):
+    data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(data, 9) if compress else data
+
+
+def _layout(plan):
+    """(meta, [(week meta, days)], flags) for either plan shape."""
+    weeks = plan.get("weeks")
+    weekly = plan.get("weekly_plans")
+    if not isinstance(weeks, list) and isinstance(weekly, list) and weekly:
+        meta = {k: v for k, v in plan.items() if k not in ("weekly_plans", "day_1_tasks")}
+        layout = [(week, []) for week in weekly]
+        if "day_1_tasks" in plan:
+            layout[0] = (weekly[0], [plan["day_1_tasks"]])
+        return meta, layout, FLAG_PROMPT_SHAPE
+    meta = {k: v for k, v in plan.items() if k != "weeks"}
+    layout = [
+        ({k: v for k, v in week.items() if k != "days"}, week.get("days") or [])
+        for week in weeks or []
+    ]
+    return meta, layout, 0
+
+
+def write_archive(plan, path, compress=True):
+    """Writes a parsed plan to path. Returns the number of days stored.
+
+    The archive is written to a temp file next to path and renamed over it,
+    so a failed write leaves the previous archive intact.
+    """
+    meta, layout, flags = _layout(plan)
+    if compress:
+        flags |= FLAG_ZLIB
+    week_entries = []
+    day_entries = []
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+
+            def put(obj):
+                offset = f.tell()
+                blob = _pack(obj, compress)
+                f.write(blob)
+                return offset, len(blob)
+
+            meta_offset, meta_length = put(meta)
+            for week, days in layout:
+                offset, length = put(week)
+                week_entries.append((offset, length, len(day_entries), len(days)))
+                for day in days:
+                    day_entries.append(put(day))
+
+            week_index = f.tell()
+            for entry in week_entries:
+                f.write(_WEEK_ENTRY.pack(*entry))
+            day_index = f.tell()
+            for entry in day_entries:
+                f.write(_DAY_ENTRY.pack(*entry))
+
+            f.seek(0)
+            f.write(
+                _HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    flags,
+                    len(week_entries),
+                    week_index,
+                    day_index,
+                    meta_offset,
+                    meta_length,
+                )
+            )
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(day_entries)
+
+
+class PlanArchive:
+    """Random access reader. Weeks and days are 1-based positions."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ArchiveError(f"{path} is empty")
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ArchiveError(f"{path} is too short to be a plan archive")
+        (
+            magic,
+            version,
+            self._flags,
+            self.week_count,
+            self._week_index,
+            self._day_index,
+            self._meta_offset,
+            self._meta_length,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ArchiveError(f"{path} is not a version {VERSION} plan archive")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _read(self, offset, length):
+        blob = self._map[offset : offset + length]
+        if self._flags & FLAG_ZLIB:
+            blob = zlib.decompress(blob)
+        return json.loads(blob)
+
+    def _week_entry(self, week):
+        if not 1 <= week <= self.week_count:
+            raise KeyError(f"week {week} not in archive (1-{self.week_count})")
+        return _WEEK_ENTRY.unpack_from(
+            self._map, self._week_index + (week - 1) * _WEEK_ENTRY.size
+        )
+
+    def meta(self):
+        """Plan-level fields (goal_summary, targets, macros, ...)."""
+        return self._read(self._meta_offset, self._meta_length)
+
+    def day_count(self, week):
+        return self._week_entry(week)[3]
+
+    def week(self, week, with_days=False):
+        offset, length, first_day, day_count = self._week_entry(week)
+        data = self._read(offset, length)
+        if with_days:
+            data["days"] = [self.day(week, d) for d in range(1, day_count + 1)]
+        return data
+
+    def day(self, week, day):
+        _, _, first_day, day_count = self._week_entry(week)
+        if not 1 <= day <= day_count:
+            raise KeyError(f"day {day} not in week {week} (1-{day_count})")
+        offset, length = _DAY_ENTRY.unpack_from(
+            self._map, self._day_index + (first_day + day - 1) * _DAY_ENTRY.size
+        )
+        return self._read(offset, length)
+
+    def plan(self):
+        """Rebuilds the full plan document."""
+        data = self.meta()
+        if self._flags & FLAG_PROMPT_SHAPE:
+            data["weekly_plans"] = [self.week(w) for w in range(1, self.week_count + 1)]
+            if self.day_count(1):
+                data["day_1_tasks"] = self.day(1, 1)
+            return data
+        data["weeks"] = [
+            self.week(w, with_days=True) for w in range(1, self.week_count + 1)
+        ]
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack and query plan archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="convert a plan capture to an archive")
+    pack.add_argument("input")
+    pack.add_argument("output")
+    pack.add_argument("--no-compress", action="store_true")
+    get = commands.add_parser("get", help="print one week or day")
+    get.add_argument("archive")
+    get.add_argument("--week", type=int, required=True)
+    get.add_argument("--day", type=int)
+    unpack = commands.add_parser("unpack", help="write the full plan back as JSON")
+    unpack.add_argument("archive")
+    unpack.add_argument("output")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "pack":
+            days = write_archive(
+                load_capture(args.input), args.output, compress=not args.no_compress
+            )
+            print(f"Packed {days} days from {args.input} into {args.output}")
+        elif args.command == "get":
+            with PlanArchive(args.archive) as archive:
+                if args.day is None:
+                    data = archive.week(args.week)
+                else:
+                    data = archive.day(args.week, args.day)
+            print(json.dumps(data, indent=4, ensure_ascii=False))
+        else:
+            with PlanArchive(args.archive) as archive:
+                data = archive.plan()
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False)
+            print(f"Unpacked {args.archive} to {args.output}")
+    except (ArchiveError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
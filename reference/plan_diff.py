@@ -0,0 +1,429 @@
+"""
+Structural diff between two versions of a roadmap plan.
+
+Both plans are loaded through json_stream (so raw captures, fix_json and
+compress_json output all compare equal) and hashed bottom-up into a Merkle
+tree: every meal, day and week gets a digest of its content and of its
+children. The diff walks both trees from the root and only descends where
+digests differ, so an unchanged week costs one comparison however many
+days it has. Comparison work grows with the number of changed days, not
+the size of the plan.
+
+List items are matched by their natural key instead of position: weeks
+by week_number, days by day_number, meals by meal_type (plus occurrence for
+a second snack). The patch is a list of set/add/remove operations on those
+keyed paths, with per-day macro deltas, and `apply` rebuilds the new plan
+from the old one. Ops carry only the new values; `--with-old` also records
+the replaced and removed values for review.
+
+    python plan_diff.py diff plan.json.bak plan.json --out plan.patch.json
+    python plan_diff.py apply plan.json.bak plan.patch.json rebuilt.json
+    python plan_diff.py check         # round-trip the built-in edge cases
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+
+from json_stream import load_capture
+
+LIST_KEYS = ("week_number", "week", "day_number", "meal_type")
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+
+def _list_key_field(items):
+    if not items or not all(isinstance(item, dict) for item in items):
+        return None
+    for field in LIST_KEYS:
+        if all(field in item for item in items):
+            return field
+    return None
+
+
+def list_keys(items):
+    """Natural keys for list items, positions when there is none."""
+    field = _list_key_field(items)
+    if field is None:
+        return list(range(len(items)))
+    keys = []
+    seen = {}
+    for item in items:
+        value = item[field]
+        n = seen.get(value, 0)
+        seen[value] = n + 1
+        keys.append((field, value, n))
+    return keys
+
+
+def _segment(key):
+    """JSON form of a list key: {"meal_type": "snack"} or {"meal_type": "snack", "#": 1}."""
+    if isinstance(key, tuple):
+        field, value, n = key
+        return {field: value, "#": n} if n else {field: value}
+    return key
+
+
+def _segment_key(segment):
+    if isinstance(segment, dict):
+        n = segment.get("#", 0)
+        (field, value), = ((k, v) for k, v in segment.items() if k != "#")
+        return (field, value, n)
+    return segment
+
+
+class Node:
+    __slots__ = ("digest", "children", "keys")
+
+    def __init__(self, digest, children=None, keys=None):
+        self.digest = digest
+        self.children = children
+        self.keys = keys
+
+
+def build_tree(value):
+    """Merkle tree of a JSON value; dicts and lists get child maps."""
+    if isinstance(value, dict):
+        children = {k: build_tree(v) for k, v in value.items()}
+        parts = [b"{"]
+        for key in sorted(children):
+            parts += [key.encode("utf-8"), b"\0", children[key].digest]
+        return Node(_digest(*parts), children)
+    if isinstance(value, list):
+        keys = list_keys(value)
+        children = {}
+        parts = [b"["]
+        for key, item in zip(keys, value):
+            child = build_tree(item)
+            children[key] = child
+            parts += [repr(key).encode("utf-8"), b"\0", child.digest]
+        return Node(_digest(*parts), children, keys)
+    return Node(_digest(json.dumps(value, sort_keys=True).encode("utf-8")))
+
+
+def _container(value):
+    return isinstance(value, (dict, list))
+
+
+def _op(kind, path, old=None, value=None, with_old=False):
+    op = {"op": kind, "path": path}
+    if with_old:
+        op["old"] = old
+    if kind != "remove":
+        op["value"] = value
+    return op
+
+
+def _diff(old, new, old_tree, new_tree, path, ops, with_old):
+    if old_tree.digest == new_tree.digest:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        same_kind = True
+    elif isinstance(old, list) and isinstance(new, list):
+        old_field, new_field = _list_key_field(old), _list_key_field(new)
+        same_kind = old_field == new_field and (
+            old_field is not None or len(old) == len(new)
+        )
+        if same_kind and old_field is not None:
+            # Keyed ops can't express a reordering, replace the list instead
+            common = set(old_tree.keys) & set(new_tree.keys)
+            same_kind = [k for k in old_tree.keys if k in common] == [
+                k for k in new_tree.keys if k in common
+            ]
+    else:
+        same_kind = False
+    if not same_kind:
+        ops.append(_op("set", path, old, new, with_old))
+        return
+
+    if isinstance(old, dict):
+        old_items, new_items = old, new
+        new_keys = list(new)
+    else:
+        old_items = dict(zip(old_tree.keys, old))
+        new_items = dict(zip(new_tree.keys, new))
+        new_keys = new_tree.keys
+    removed = [key for key in old_items if key not in new_items]
+    if isinstance(old, list):
+        # apply() renumbers repeated keys after each op; only the highest
+        # occurrences are ever removed, so going from the end keeps the
+        # remaining snack#1, snack#2... valid
+        removed.reverse()
+    for key in removed:
+        ops.append(_op("remove", path + [_segment(key)], old_items[key], with_old=with_old))
+    for position, key in enumerate(new_keys):
+        child_path = path + [_segment(key)]
+        if key not in old_items:
+            op = {"op": "add", "path": child_path, "value": new_items[key]}
+            if isinstance(new, list):
+                op["at"] = position
+            ops.append(op)
+            continue
+        old_child, new_child = old_items[key], new_items[key]
+        if _container(old_child) or _container(new_child):
+            _diff(
+                old_child,
+                new_child,
+                old_tree.children[key],
+                new_tree.children[key],
+                child_path,
+                ops,
+                with_old,
+            )
+        elif old_tree.children[key].digest != new_tree.children[key].digest:
+            ops.append(_op("set", child_path, old_child, new_child, with_old))
+
+
+def _day_path(path):
+    """The path of the day containing path, if any."""
+    for i, segment in enumerate(path):
+        if isinstance(segment, dict) and "day_number" in segment:
+            return path[: i + 1]
+    return None
+
+
+def _resolve(doc, path):
+    node = doc
+    for segment in path:
+        if isinstance(segment, dict):
+            key = _segment_key(segment)
+            keys = list_keys(node)
+            if key not in keys:
+                return None
+            node = node[keys.index(key)]
+        else:
+            try:
+                node = node[segment]
+            except (KeyError, IndexError, TypeError):
+                return None
+    return node
+
+
+def _day_totals(day):
+    totals = dict.fromkeys(NUTRIENTS, 0.0)
+    for meal in (day or {}).get("meals") or []:
+        for n in NUTRIENTS:
+            try:
+                totals[n] += float(meal.get(n) or 0)
+            except (TypeError, ValueError):
+                pass
+    return totals
+
+
+def macro_deltas(old, new, ops):
+    """Per-day nutrient deltas for the days touched by ops."""
+    days = []
+    for op in ops:
+        day = _day_path(op["path"])
+        if day is not None and day not in days:
+            days.append(day)
+    deltas = []
+    for day in days:
+        before = _day_totals(_resolve(old, day))
+        after = _day_totals(_resolve(new, day))
+        delta = {n: round(after[n] - before[n], 2) for n in NUTRIENTS}
+        if any(delta.values()):
+            deltas.append({"path": day, **delta})
+    return deltas
+
+
+def diff(old, new, old_tree=None, new_tree=None, with_old=False):
+    """Patch that turns plan `old` into plan `new`."""
+    old_tree = old_tree or build_tree(old)
+    new_tree = new_tree or build_tree(new)
+    ops = []
+    _diff(old, new, old_tree, new_tree, [], ops, with_old)
+    return {
+        "base": old_tree.digest.hex(),
+        "result": new_tree.digest.hex(),
+        "ops": ops,
+        "macro_deltas": macro_deltas(old, new, ops),
+    }
+
+
+def _parent(doc, path):
+    parent = _resolve(doc, path[:-1])
+    if parent is None:
+        raise PatchError(f"Path not found: {format_path(path[:-1])}")
+    return parent
+
+
+def apply(plan, patch, verify=True):
+    """Applies a patch in place and returns the plan."""
+    if verify and build_tree(plan).digest.hex() != patch["base"]:
+        raise PatchError("Patch was made against a different plan")
+    for op in patch["ops"]:
+        path = op["path"]
+        if not path:
+            plan = op["value"]
+            continue
+        parent = _parent(plan, path)
+        last = path[-1]
+        if isinstance(parent, dict):
+            if op["op"] == "remove":
+                parent.pop(last, None)
+            else:
+                parent[last] = op["value"]
+            continue
+        keys = list_keys(parent)
+        key = _segment_key(last)
+        if op["op"] == "add":
+            parent.insert(op.get("at", len(parent)), op["value"])
+        elif key not in keys:
+            raise PatchError(f"Path not found: {format_path(path)}")
+        elif op["op"] == "remove":
+            del parent[keys.index(key)]
+        else:
+            parent[keys.index(key)] = op["value"]
+    if verify and build_tree(plan).digest.hex() != patch["result"]:
+        raise PatchError("Patched plan does not match the recorded result")
+    return plan
+
+
+def round_trip(old, new, with_old=False):
+    """Diffs old -> new and checks the patch rebuilds new; returns the patch."""
+    patch = diff(old, new, with_old=with_old)
+    # apply() verifies the result digest
+    apply(copy.deepcopy(old), json.loads(json.dumps(patch)))
+    return patch
+
+
+def _meals(*types):
+    return [
+        {"meal_type": t, "name": f"{t} {i}", "calories": 100 + i}
+        for i, t in enumerate(types)
+    ]
+
+
+def _plan(*types, days=None):
+    days = days or [{"day_number": 1, "meals": _meals(*types)}]
+    return {"weeks": [{"week_number": 1, "days": days}]}
+
+
+# (name, old, new) pairs for `check`: repeated keys are renumbered by apply
+CHECK_CASES = [
+    ("remove repeated keys", _plan("snack", "snack", "snack", "breakfast"), _plan("breakfast")),
+    ("remove last repeats", _plan("snack", "lunch", "snack", "snack"), _plan("snack", "lunch")),
+    ("add repeated keys", _plan("breakfast"), _plan("snack", "breakfast", "snack", "snack")),
+    ("edit and remove", _plan("snack", "snack", "dinner"), _plan("snack", "dinner", "dinner")),
+    ("reorder", _plan("breakfast", "lunch"), _plan("lunch", "breakfast")),
+    (
+        "remove repeated days",
+        _plan(days=[{"day_number": n, "meals": _meals("snack", "snack")} for n in (1, 1, 2)]),
+        _plan(days=[{"day_number": 2, "meals": []}]),
+    ),
+]
+
+
+def format_path(path):
+    out = ""
+    for segment in path:
+        if isinstance(segment, dict):
+            n = segment.get("#", 0)
+            (field, value), = ((k, v) for k, v in segment.items() if k != "#")
+            out += f"[{field}={value}{'#' + str(n) if n else ''}]"
+        elif isinstance(segment, int):
+            out += f"[{segment}]"
+        else:
+            out += f".{segment}" if out else segment
+    return out or "$"
+
+
+def summarize(patch):
+    counts = {}
+    for op in patch["ops"]:
+        last = op["path"][-1] if op["path"] else None
+        kind = "meal" if isinstance(last, dict) and "meal_type" in last else "field"
+        if isinstance(last, dict) and "day_number" in last:
+            kind = "day"
+        if isinstance(last, dict) and ("week_number" in last or "week" in last):
+            kind = "week"
+        if op["op"] == "set" and kind == "field" and any(
+            isinstance(s, dict) and "meal_type" in s for s in op["path"]
+        ):
+            kind = "meal field"
+        counts[(op["op"], kind)] = counts.get((op["op"], kind), 0) + 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Structural diff for roadmap plans")
+    commands = parser.add_subparsers(dest="command", required=True)
+    d = commands.add_parser("diff")
+    d.add_argument("old")
+    d.add_argument("new")
+    d.add_argument("--out", help="write the patch as JSON")
+    d.add_argument("--show", type=int, default=20, help="operations to print")
+    a = commands.add_parser("apply")
+    a.add_argument("old")
+    a.add_argument("patch")
+    a.add_argument("output")
+    commands.add_parser("check", help="round-trip the built-in edge cases")
+    d.add_argument("--with-old", action="store_true", help="record replaced values")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        failed = 0
+        for name, old, new in CHECK_CASES:
+            try:
+                patch = round_trip(old, new)
+                print(f"   ✅ {name}: {len(patch['ops'])} ops")
+            except PatchError as e:
+                failed += 1
+                print(f"   ❌ {name}: {e}")
+        print(f"{len(CHECK_CASES) - failed}/{len(CHECK_CASES)} cases round-trip")
+        raise SystemExit(1 if failed else 0)
+
+    if args.command == "apply":
+        with open(args.patch, "r", encoding="utf-8") as f:
+            patch = json.load(f)
+        plan = apply(load_capture(args.old), patch)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(plan, f, indent=4, ensure_ascii=False)
+        print(f"Applied {len(patch['ops'])} operations -> {args.output}")
+        return
+
+    old, new = load_capture(args.old), load_capture(args.new)
+    patch = round_trip(old, new, args.with_old)
+    if not patch["ops"]:
+        print("Plans are identical.")
+        return
+    for (op, kind), count in sorted(summarize(patch).items()):
+        print(f"   {op:<7}{kind:<11}{count:>5}")
+    for op in patch["ops"][: args.show]:
+        if op["op"] == "set" and not _container(op["value"]):
+            detail = f"{op['old']!r} -> " if "old" in op else "-> "
+            detail += repr(op["value"])
+        else:
+            detail = ""
+        print(f"   {op['op']:<7}{format_path(op['path'])} {detail}"[:160])
+    if len(patch["ops"]) > args.show:
+        print(f"   ... {len(patch['ops']) - args.show} more")
+    if patch["macro_deltas"]:
+        print("\nMacro deltas per day:")
+        for delta in patch["macro_deltas"]:
+            print(
+                f"   {format_path(delta['path'])}: "
+                + ", ".join(f"{n} {delta[n]:+g}" for n in NUTRIENTS)
+            )
+    encoded = json.dumps(patch, separators=(",", ":"), ensure_ascii=False)
+    plan_size = len(json.dumps(new, separators=(",", ":"), ensure_ascii=False))
+    print(f"\nPatch {len(encoded):,} bytes vs {plan_size:,} for the full plan")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(encoded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Columnar in-memory store for generate_roadmap output.
+
+Every meal of every loaded plan becomes one row in a set of flat NumPy
+columns (plan, week, day, meal_type, nutrients, targets), so audits over
+thousands of plans are a handful of grouped array operations instead of
+nested `.get()` loops. A day without meals gets one zero row with meal_type
+NO_MEAL, so it still shows up in the day totals as a 0 kcal day.
+
+    python plan_store.py plan.json.bak captures/*.json --off-target 10
+"""
+
+import argparse
+from array import array
+
+import numpy as np
+
+from json_stream import load_capture
+
+NUTRIENTS = ("calories", "protein", "carbs", "fat")
+MEAL_TYPES = ("breakfast", "lunch", "snack", "dinner")
+NO_MEAL = -1
+_MAX_MEAL_TYPES = 1 << 15
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def iter_days(plan):
+    """Yields (week_number, day, meals, calorie_target) for a plan.
+
+    Handles the full `weeks[].days[]` roadmap as well as the
+    `weekly_plans` + `day_1_tasks` shape, which only carries Day 1. Days are
+    numbered within their week, captures number `day_number` across the plan.
+    """
+    weeks = plan.get("weeks")
+    if isinstance(weeks, list):
+        for w_index, week in enumerate(weeks, start=1):
+            week_number = int(_number(week.get("week_number", w_index)))
+            for d_index, day in enumerate(week.get("days") or [], start=1):
+                yield (
+                    week_number,
+                    d_index,
+                    day.get("meals") or [],
+                    week.get("calorie_target"),
+                )
+    elif isinstance(plan.get("day_1_tasks"), dict):
+        weekly = plan.get("weekly_plans") or [{}]
+        yield 1, 1, plan["day_1_tasks"].get("meals") or [], weekly[0].get(
+            "calorie_target"
+        )
+
+
+class PlanStore:
+    def __init__(
+        self, plan_ids, plan, week, day, meal_type, values, targets, meal_types=MEAL_TYPES
+    ):
+        self.plan_ids = plan_ids
+        self.meal_types = list(meal_types)
+        self.plan = plan
+        self.week = week
+        self.day = day
+        self.meal_type = meal_type
+        self.values = values
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.plan)
+
+    @property
+    def meals(self):
+        """Number of real meal rows, without the placeholders of empty days."""
+        return int(np.count_nonzero(self.meal_type != NO_MEAL))
+
+    @classmethod
+    def from_plans(cls, plans, plan_ids=None):
+        plan_col = array("i")
+        week_col = array("h")
+        day_col = array("h")
+        meal_col = array("h")
+        values = array("f")
+        targets = array("f")
+        ids = []
+        meal_types = list(MEAL_TYPES)
+        meal_codes = {name: code for code, name in enumerate(meal_types)}
+
+        for index, plan in enumerate(plans):
+            ids.append(plan_ids[index] if plan_ids else index)
+            macros = plan.get("macros") or {}
+            plan_targets = [_number(plan.get("daily_calorie_target"))] + [
+                _number(macros.get(n)) for n in NUTRIENTS[1:]
+            ]
+            for week, day, meals, week_calories in iter_days(plan):
+                row_targets = list(plan_targets)
+                if week_calories is not None:
+                    row_targets[0] = _number(week_calories)
+                if not meals:
+                    plan_col.append(index)
+                    week_col.append(week)
+                    day_col.append(day)
+                    meal_col.append(NO_MEAL)
+                    values.extend([0.0] * len(NUTRIENTS))
+                    targets.extend(row_targets)
+                for meal in meals:
+                    name = str(meal.get("meal_type", "")).lower()
+                    if name not in meal_codes:
+                        if len(meal_types) >= _MAX_MEAL_TYPES:
+                            raise ValueError(
+                                f"More than {_MAX_MEAL_TYPES} distinct meal types"
+                            )
+                        meal_codes[name] = len(meal_types)
+                        meal_types.append(name)
+                    plan_col.append(index)
+                    week_col.append(week)
+                    day_col.append(day)
+                    meal_col.append(meal_codes[name])
+                    values.extend(_number(meal.get(n)) for n in NUTRIENTS)
+                    targets.extend(row_targets)
+
+        width = len(NUTRIENTS)
+        return cls(
+            ids,
+            np.frombuffer(plan_col, dtype=np.int32),
+            np.frombuffer(week_col, dtype=np.int16),
+            np.frombuffer(day_col, dtype=np.int16),
+            np.frombuffer(meal_col, dtype=np.int16),
+            np.frombuffer(values, dtype=np.float32).reshape(-1, width),
+            np.frombuffer(targets, dtype=np.float32).reshape(-1, width),
+            meal_types,
+        )
+
+    @classmethod
+    def from_files(cls, paths):
+        return cls.from_plans([load_capture(p) for p in paths], plan_ids=list(paths))
+
+    def mask(self, plan=None, week=None, day=None, meal_type=None):
+        """Boolean row mask, e.g. `values[store.mask(week=6, day=1)]`.
+
+        An unknown meal_type raises KeyError naming it and the store's types.
+        """
+        selected = np.ones(len(self), dtype=bool)
+        if plan is not None:
+            selected &= self.plan == plan
+        if week is not None:
+            selected &= self.week == week
+        if day is not None:
+            selected &= self.day == day
+        if meal_type is not None:
+            if meal_type not in self.meal_types:
+                raise KeyError(
+                    f"meal type {meal_type!r} not in store ({', '.join(self.meal_types)})"
+                )
+            selected &= self.meal_type == self.meal_types.index(meal_type)
+        return selected
+
+    def _group(self, with_day):
+        key = self.plan.astype(np.int64) << 32 | self.week.astype(np.int64) << 16
+        if with_day:
+            key |= self.day.astype(np.int64)
+        keys, inverse = np.unique(key, return_inverse=True)
+        return keys, inverse
+
+    def _sum(self, inverse, size, columns):
+        out = np.empty((size, columns.shape[1]), dtype=np.float64)
+        for c in range(columns.shape[1]):
+            out[:, c] = np.bincount(inverse, weights=columns[:, c], minlength=size)
+        return out
+
+    def day_totals(self):
+        """Per (plan, week, day) nutrient totals and targets."""
+        keys, inverse = self._group(with_day=True)
+        size = len(keys)
+        rows = np.bincount(inverse, minlength=size)
+        meals = np.bincount(inverse, weights=self.meal_type != NO_MEAL, minlength=size)
+        return {
+            "plan": (keys >> 32).astype(np.int32),
+            "week": ((keys >> 16) & 0xFFFF).astype(np.int16),
+            "day": (keys & 0xFFFF).astype(np.int16),
+            "meals": meals.astype(np.int64),
+            "totals": self._sum(inverse, size, self.values),
+            # Every row of a day carries the same target, so the mean is exact
+            "targets": self._sum(inverse, size, self.targets) / rows[:, None],
+        }
+
+    def week_totals(self):
+        """Per (plan, week) totals, with targets scaled by the number of days."""
+        days = self.day_totals()
+        key = days["plan"].astype(np.int64) << 32 | days["week"].astype(np.int64) << 16
+        keys, inverse = np.unique(key, return_inverse=True)
+        size = len(keys)
+        return {
+            "plan": (keys >> 32).astype(np.int32),
+            "week": ((keys >> 16) & 0xFFFF).astype(np.int16),
+            "days": np.bincount(inverse, minlength=size),
+            "totals": self._sum(inverse, size, days["totals"]),
+            "targets": self._sum(inverse, size, days["targets"]),
+        }
+
+    def meal_type_totals(self):
+        """Totals per meal_type across all loaded plans."""
+        size = len(self.meal_types)
+        real = self.meal_type != NO_MEAL
+        codes = self.meal_type[real].astype(np.intp)
+        counts = np.bincount(codes, minlength=size)
+        totals = self._sum(codes, size, self.values[real])
+        return {
+            name: dict(zip(NUTRIENTS, totals[i]), meals=int(counts[i]))
+            for i, name in enumerate(self.meal_types)
+            if counts[i]
+        }
+
+    @staticmethod
+    def deviation(aggregate):
+        """Fractional deviation (total - target) / target, NaN without a target."""
+        targets = aggregate["targets"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(
+                targets > 0, (aggregate["totals"] - targets) / targets, np.nan
+            )
+
+    def days_off_target(self, pct, nutrients=("calories",)):
+        """Days whose total misses the target by more than pct percent."""
+        days = self.day_totals()
+        columns = [NUTRIENTS.index(n) for n in nutrients]
+        deviation = self.deviation(days)[:, columns]
+        mask = np.any(np.abs(deviation) > pct / 100.0, axis=1)
+        selected = {key: value[mask] for key, value in days.items()}
+        selected["deviation"] = deviation[mask]
+        return selected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit nutrition in roadmap plans")
+    parser.add_argument("paths", nargs="+", help="plan captures or JSON files")
+    parser.add_argument("--off-target", type=float, default=10.0, metavar="PCT")
+    parser.add_argument("--nutrients", default="calories")
+    args = parser.parse_args()
+
+    store = PlanStore.from_files(args.paths)
+    days = store.day_totals()
+    weeks = store.week_totals()
+    print(
+        f"Loaded {len(store.plan_ids)} plans, {len(weeks['week'])} weeks, "
+        f"{len(days['day'])} days, {store.meals} meals"
+    )
+
+    deviation = store.deviation(days)
+    for i, name in enumerate(NUTRIENTS):
+        column = deviation[:, i]
+        column = column[~np.isnan(column)]
+        if column.size:
+            print(
+                f"   {name:<9} mean dev {100 * column.mean():+6.1f}%  "
+                f"worst {100 * column[np.abs(column).argmax()]:+6.1f}%"
+            )
+
+    nutrients = tuple(n.strip() for n in args.nutrients.split(","))
+    off = store.days_off_target(args.off_target, nutrients)
+    print(
+        f"\nDays off target by >{args.off_target:g}% ({', '.join(nutrients)}): "
+        f"{len(off['day'])}"
+    )
+    for i in range(len(off["day"])):
+        plan_id = store.plan_ids[off["plan"][i]]
+        devs = ", ".join(f"{100 * d:+.1f}%" for d in off["deviation"][i])
+        print(f"   - {plan_id} | Week {off['week'][i]} Day {off['day'][i]} | {devs}")
+
+
+if __name__ == "__main__":
+    main()